@@ -0,0 +1,92 @@
+"""
+Benchmark: adaptive single-call mode / speculative mode vs routing three-node path
+
+Usage (dari folder langchain/):
+    python -m benchmarks.adaptive_mode
+    python -m benchmarks.adaptive_mode --scale 4 --runs 5 --threshold 1500
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from benchmarks.fixtures import FixtureCacheManager, ScriptedLLM, fixture_snapshot_info
+from core.agents import create_menu_agent
+from core.metrics import SpeculationStats, summarize
+from core.retrieval import MenuRetriever
+
+QUESTIONS = [
+    "ayam geprek jumbo masih ada?",
+    "berapa harga ikan bakar?",
+    "ada es teh sama kopi?",
+    ".menu",
+    "soto ayam ready kak?",
+    "paket hemat apa aja?",
+    "tahu tempe masih ada gak",
+    "minuman dingin apa aja",
+]
+
+
+MODES = ["routing", "adaptive", "speculative"]
+
+
+async def run_mode(mode: str, scale: int, runs: int, threshold: int) -> dict:
+    cache_manager = FixtureCacheManager(scale=scale)
+    llm = ScriptedLLM()
+    speculation_stats = SpeculationStats()
+    graph = create_menu_agent(
+        llm, cache_manager,
+        adaptive=mode == "adaptive",
+        adaptive_threshold_tokens=threshold,
+        retriever=MenuRetriever(cache_manager),
+        speculative=mode == "speculative",
+        speculation_stats=speculation_stats
+    )
+
+    latencies = []
+    for _ in range(runs):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            await graph.ainvoke({"input": question})
+            latencies.append(time.perf_counter() - start)
+
+    requests = runs * len(QUESTIONS)
+    report = {
+        "mode": mode,
+        "snapshot": fixture_snapshot_info(cache_manager),
+        "latency_s": summarize(latencies),
+        "llm_calls_per_request": round(llm.calls / requests, 2),
+        "prompt_tokens_per_request": round(llm.prompt_tokens / requests, 1),
+        "completion_tokens_per_request": round(llm.completion_tokens / requests, 1),
+    }
+    if mode == "speculative":
+        report["speculation"] = speculation_stats.summary()
+    return report
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Adaptive vs routing menu agent benchmark")
+    parser.add_argument("--scale", type=int, default=1, help="Gandakan fixture menu N kali")
+    parser.add_argument("--runs", type=int, default=3, help="Berapa kali corpus diulang")
+    parser.add_argument("--threshold", type=int, default=1500, help="adaptive_threshold_tokens")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    report = []
+    for mode in args.modes:
+        report.append(await run_mode(mode, args.scale, args.runs, args.threshold))
+
+    print(f"{'mode':<12} {'p50':>8} {'p95':>8} {'calls':>6} {'prompt_tok':>11}")
+    for row in report:
+        lat = row["latency_s"]
+        print(f"{row['mode']:<12} {lat['p50']:>8.3f} {lat['p95']:>8.3f} "
+              f"{row['llm_calls_per_request']:>6} {row['prompt_tokens_per_request']:>11}")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,256 @@
+"""
+Offline evaluation harness: replay corpus pertanyaan customer/owner lewat
+create_menu_agent & create_crud_agent, laporkan akurasi + latency per stage
+
+Usage (dari folder langchain/):
+    python -m benchmarks.evaluate
+    python -m benchmarks.evaluate --runs 3 --output eval_report.json
+    python -m benchmarks.evaluate --llm deepseek        # pakai API_DEEPSEEK dari env
+    python -m benchmarks.evaluate --adaptive --speculative
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.llms import LLM
+
+from benchmarks.fixtures import FixtureCacheManager, ScriptedLLM, fixture_snapshot_info
+from core.agents import create_crud_agent, create_menu_agent
+from core.structured import StructuredOutputStats
+from core.metrics import summarize
+from core.retrieval import MenuRetriever
+from core.routing import RoutingCache
+from core.utils import estimate_tokens
+
+CORPUS_PATH = Path(__file__).resolve().parent / "eval_corpus.json"
+
+# Node menu agent yang mengambil keputusan routing
+ROUTING_NODES = {"route", "speculate"}
+
+
+class CountingLLM(LLM):
+    """Bungkus LLM apa pun untuk menghitung call & token (estimasi)"""
+    inner: Any = None
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def __init__(self, inner, **kwargs):
+        super().__init__(inner=inner, **kwargs)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"counting_{self.inner._llm_type}"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs) -> str:
+        raise NotImplementedError("Use ainvoke()")
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> str:
+        answer = await self.inner.ainvoke(prompt, stop=stop, **kwargs)
+        self.calls += 1
+        self.prompt_tokens += estimate_tokens(prompt)
+        self.completion_tokens += estimate_tokens(answer)
+        return answer
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"calls": self.calls, "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+
+def build_llm(name: str):
+    if name == "scripted":
+        return ScriptedLLM()
+    if name == "deepseek":
+        from core.deepseek_llm import DeepSeekCustomLLM
+        return DeepSeekCustomLLM(api_key=os.environ["API_DEEPSEEK"])
+    raise ValueError(f"Unknown llm: {name}")
+
+
+class StageRecorder:
+    """Kumpulkan latency + LLM usage per node LangGraph"""
+
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.calls = defaultdict(int)
+        self.prompt_tokens = defaultdict(int)
+        self.totals: List[float] = []
+
+    async def run(self, graph, payload: dict, llm: CountingLLM):
+        """
+        Stream update per node; durasi = selisih waktu antar update (node berjalan sekuensial)
+        Return (state akhir, daftar node yang dilewati)
+        """
+        state = dict(payload)
+        nodes = []
+        start = last = time.perf_counter()
+        usage = llm.snapshot()
+        async for update in graph.astream(payload, stream_mode="updates"):
+            now = time.perf_counter()
+            current = llm.snapshot()
+            for node, values in update.items():
+                self.latency[node].append(now - last)
+                self.calls[node] += current["calls"] - usage["calls"]
+                self.prompt_tokens[node] += current["prompt_tokens"] - usage["prompt_tokens"]
+                state.update(values or {})
+                nodes.append(node)
+            last, usage = now, current
+        self.totals.append(time.perf_counter() - start)
+        return state, nodes
+
+    def report(self, requests: int) -> Dict[str, Any]:
+        return {
+            "latency_s": summarize(self.totals),
+            "stages": {
+                node: {
+                    "latency_s": summarize(samples),
+                    "llm_calls": self.calls[node],
+                    "prompt_tokens_per_call": round(self.prompt_tokens[node] / self.calls[node], 1) if self.calls[node] else 0,
+                }
+                for node, samples in sorted(self.latency.items())
+            },
+        }
+
+
+def same_categories(got: List[str], expected: List[str]) -> bool:
+    return set(got or ["all"]) == set(expected)
+
+
+async def evaluate_menu(corpus: List[dict], llm: CountingLLM, args) -> Dict[str, Any]:
+    cache_manager = FixtureCacheManager(scale=args.scale)
+    output_stats = StructuredOutputStats()
+    graph = create_menu_agent(
+        llm, cache_manager,
+        routing_cache=RoutingCache() if args.routing_cache else None,
+        adaptive=args.adaptive,
+        retriever=MenuRetriever(cache_manager),
+        speculative=args.speculative,
+        output_stats=output_stats
+    )
+    recorder = StageRecorder()
+    before = llm.snapshot()
+    routed = correct = 0
+    failures = []
+
+    for _ in range(args.runs):
+        for case in corpus:
+            state, nodes = await recorder.run(graph, {"input": case["question"]}, llm)
+            if not ROUTING_NODES & set(nodes):
+                continue  # Adaptive direct path: tidak ada keputusan routing untuk dinilai
+            routed += 1
+            got = state.get("categories", [])
+            if same_categories(got, case["expected_categories"]):
+                correct += 1
+            elif case["question"] not in {f["question"] for f in failures}:
+                failures.append({"question": case["question"], "expected": case["expected_categories"], "got": got})
+
+    requests = args.runs * len(corpus)
+    after = llm.snapshot()
+    return {
+        "questions": len(corpus),
+        "routed_requests": routed,
+        "routing_accuracy": round(correct / routed, 3) if routed else None,
+        "llm_calls_per_request": round((after["calls"] - before["calls"]) / requests, 2),
+        "prompt_tokens_per_request": round((after["prompt_tokens"] - before["prompt_tokens"]) / requests, 1),
+        **recorder.report(requests),
+        "structured_output": output_stats.summary(),
+        "failures": failures,
+    }
+
+
+def crud_outcome(state: dict, case: dict) -> Dict[str, bool]:
+    if case.get("expect_clarify"):
+        clarified = state.get("error") == "need_clarification"
+        return {"ids": clarified, "status": clarified}
+    ids = sorted(state.get("parsed_ids") or [])
+    return {
+        "ids": ids == sorted(case["expected_ids"]),
+        "status": state.get("target_status") == case["expected_status"],
+    }
+
+
+async def evaluate_crud(corpus: List[dict], llm: CountingLLM, args) -> Dict[str, Any]:
+    recorder = StageRecorder()
+    output_stats = StructuredOutputStats()
+    before = llm.snapshot()
+    ids_correct = status_correct = 0
+    failures = []
+
+    for _ in range(args.runs):
+        for case in corpus:
+            # Fixture baru per perintah supaya update sebelumnya tidak mempengaruhi kasus berikutnya
+            cache_manager = FixtureCacheManager(scale=args.scale)
+            graph = create_crud_agent(llm, cache_manager, output_stats=output_stats)
+            state, _ = await recorder.run(graph, {"input": case["question"], "session_id": None}, llm)
+            outcome = crud_outcome(state, case)
+            ids_correct += outcome["ids"]
+            status_correct += outcome["status"]
+            if not all(outcome.values()) and case["question"] not in {f["question"] for f in failures}:
+                failures.append({
+                    "question": case["question"],
+                    "expected": "clarify" if case.get("expect_clarify") else [case["expected_ids"], case["expected_status"]],
+                    "got": [state.get("parsed_ids"), state.get("target_status"), state.get("error")],
+                })
+
+    requests = args.runs * len(corpus)
+    after = llm.snapshot()
+    return {
+        "questions": len(corpus),
+        "id_accuracy": round(ids_correct / requests, 3),
+        "status_accuracy": round(status_correct / requests, 3),
+        "llm_calls_per_request": round((after["calls"] - before["calls"]) / requests, 2),
+        "prompt_tokens_per_request": round((after["prompt_tokens"] - before["prompt_tokens"]) / requests, 1),
+        **recorder.report(requests),
+        "structured_output": output_stats.summary(),
+        "failures": failures,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline agent evaluation harness")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--llm", choices=["scripted", "deepseek"], default="scripted")
+    parser.add_argument("--runs", type=int, default=1, help="Berapa kali corpus diulang")
+    parser.add_argument("--scale", type=int, default=1, help="Gandakan fixture menu N kali")
+    parser.add_argument("--seed", type=int, default=22, help="Seed jitter ScriptedLLM")
+    parser.add_argument("--adaptive", action="store_true")
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument("--routing-cache", action="store_true")
+    parser.add_argument("--agents", nargs="+", choices=["menu", "crud"], default=["menu", "crud"])
+    parser.add_argument("--output", type=Path, help="Tulis laporan JSON ke file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    random.seed(args.seed)
+
+    corpus = json.loads(args.corpus.read_text(encoding="utf-8"))
+    llm = CountingLLM(build_llm(args.llm))
+
+    snapshot = fixture_snapshot_info(FixtureCacheManager(scale=args.scale))
+    snapshot.pop("generated_at")  # supaya laporan bisa di-diff antar run
+    report = {
+        "config": {
+            "llm": args.llm, "runs": args.runs, "scale": args.scale, "seed": args.seed,
+            "adaptive": args.adaptive, "speculative": args.speculative, "routing_cache": args.routing_cache,
+        },
+        "snapshot": snapshot,
+    }
+    if "menu" in args.agents:
+        report["menu"] = await evaluate_menu(corpus["menu"], llm, args)
+    if "crud" in args.agents:
+        report["crud"] = await evaluate_crud(corpus["crud"], llm, args)
+
+    text = json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,321 @@
+"""
+Fake LLM servers untuk load test lokal (tidak memakai kuota DeepSeek/Perplexity)
+
+- deepseek   : OpenAI-compatible POST /chat/completions (stream & non-stream),
+               termasuk simulasi context caching (prompt_cache_hit/miss_tokens)
+- perplexity : GET /api/auth/session + POST /rest/sse/perplexity_ask (format SSE
+               yang di-parse perplexity_async.Client.search), plus upload attachment
+               (create_upload_url + bucket S3 palsu)
+
+Jawaban dibuat oleh ScriptedLLM (routing JSON, CRUD extract, jawaban menu).
+
+Usage (dari folder langchain/):
+    python -m benchmarks.fake_servers deepseek --port 9001 --latency lognormal:0.8,0.4 --error-rate 0.02
+    python -m benchmarks.fake_servers perplexity --port 9002 --latency uniform:1,3 --chunks 8
+
+Lalu jalankan API dengan:
+    DEEPSEEK_BASE_URL=http://127.0.0.1:9001 PERPLEXITY_BASE_URL=http://127.0.0.1:9002 python main.py api
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from collections import OrderedDict
+from typing import Callable
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from benchmarks.fixtures import ScriptedLLM
+from core.utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Distribusi latency (detik):
+    - fixed:0.5
+    - uniform:0.2,1.5
+    - lognormal:median,sigma   (tail panjang, mirip latency LLM asli)
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda: random.lognormvariate(mu, sigma)
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class FaultInjector:
+    """Tentukan nasib tiap request: normal, error HTTP, atau hang (timeout di client)"""
+
+    def __init__(self, latency: str, error_rate: float = 0.0, error_status: int = 500, hang_rate: float = 0.0, hang_seconds: float = 120.0):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.requests = 0
+        self.errors = 0
+        self.hangs = 0
+
+    def decide(self) -> str:
+        self.requests += 1
+        roll = random.random()
+        if roll < self.error_rate:
+            self.errors += 1
+            return "error"
+        if roll < self.error_rate + self.hang_rate:
+            self.hangs += 1
+            return "hang"
+        return "ok"
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors, "hangs": self.hangs}
+
+
+class PrefixCacheSimulator:
+    """
+    Tiru context caching DeepSeek: prefix prompt yang pernah dikirim dihitung cache hit
+    Granularitas per blok karakter (~64 token), LRU terbatas
+    """
+
+    def __init__(self, block_chars: int = 256, max_entries: int = 50_000):
+        self.block_chars = block_chars
+        self.max_entries = max_entries
+        self._seen: OrderedDict = OrderedDict()
+
+    def lookup(self, prompt: str):
+        """Return (hit_tokens, miss_tokens) lalu simpan semua prefix blok prompt ini"""
+        hit_chars = 0
+        for end in range(self.block_chars, len(prompt) + 1, self.block_chars):
+            key = hash(prompt[:end])
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                if hit_chars == end - self.block_chars:
+                    hit_chars = end
+            else:
+                self._seen[key] = True
+                if len(self._seen) > self.max_entries:
+                    self._seen.popitem(last=False)
+        hit_tokens = estimate_tokens(prompt[:hit_chars]) if hit_chars else 0
+        return hit_tokens, max(estimate_tokens(prompt) - hit_tokens, 0)
+
+
+def split_chunks(text: str, chunks: int):
+    """Pecah jawaban jadi N potongan untuk simulasi streaming"""
+    size = max(math.ceil(len(text) / max(chunks, 1)), 1)
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def create_deepseek_app(faults: FaultInjector, chunks: int = 6) -> FastAPI:
+    """OpenAI-compatible fake untuk DeepSeekCustomLLM (AsyncOpenAI base_url)"""
+    app = FastAPI(title="Fake DeepSeek")
+    scripted = ScriptedLLM()
+    prefix_cache = PrefixCacheSimulator()
+
+    @app.get("/stats")
+    async def stats():
+        return faults.stats()
+
+    @app.get("/models")
+    async def models():
+        # Dipakai DeepSeekCustomLLM.ping() (readiness /ready)
+        return {"object": "list", "data": [{"id": "deepseek-chat", "object": "model", "owned_by": "deepseek"}]}
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        outcome = faults.decide()
+        latency = faults.sample_latency()
+
+        if outcome == "error":
+            await asyncio.sleep(latency * random.random())
+            return JSONResponse(
+                status_code=faults.error_status,
+                content={"error": {"message": "Injected failure", "type": "server_error", "code": faults.error_status}}
+            )
+        if outcome == "hang":
+            await asyncio.sleep(faults.hang_seconds)
+
+        answer = scripted._respond(prompt)
+        completion_id = f"chatcmpl-{uuid4().hex[:12]}"
+        created = int(time.time())
+        hit_tokens, miss_tokens = prefix_cache.lookup(prompt)
+        usage = {
+            "prompt_tokens": hit_tokens + miss_tokens,
+            "completion_tokens": estimate_tokens(answer),
+            "total_tokens": hit_tokens + miss_tokens + estimate_tokens(answer),
+            "prompt_cache_hit_tokens": hit_tokens,
+            "prompt_cache_miss_tokens": miss_tokens,
+        }
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model", "deepseek-chat"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        async def stream():
+            pieces = split_chunks(answer, chunks)
+            for i, piece in enumerate(pieces):
+                await asyncio.sleep(latency / len(pieces))
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body.get("model", "deepseek-chat"),
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": piece} if i == 0 else {"content": piece},
+                        "finish_reason": "stop" if i == len(pieces) - 1 else None,
+                    }],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def perplexity_frame(answer_so_far: str, final: bool, backend_uuid: str, attachments: list = None) -> str:
+    """Satu frame `event: message` dengan field `text` berisi JSON steps (sesuai extract_answer_from_response)"""
+    steps = [{"step_type": "INITIAL_QUERY", "content": {}}]
+    if final:
+        steps.append({"step_type": "FINAL", "content": {"answer": json.dumps({"answer": answer_so_far})}})
+    payload = {
+        "backend_uuid": backend_uuid,
+        "status": "COMPLETED" if final else "PENDING",
+        "final": final,
+        "text": json.dumps(steps),
+        "answer": answer_so_far,
+        "attachments": attachments or [],
+    }
+    return f"event: message\r\ndata: {json.dumps(payload)}\r\n\r\n"
+
+
+def create_perplexity_app(faults: FaultInjector, chunks: int = 6) -> FastAPI:
+    """SSE fake untuk perplexity_async.Client (base_url)"""
+    app = FastAPI(title="Fake Perplexity")
+    scripted = ScriptedLLM()
+
+    @app.get("/stats")
+    async def stats():
+        return faults.stats()
+
+    @app.get("/api/auth/session")
+    async def session():
+        return {}
+
+    uploads = {"requests": 0, "bytes": 0, "inflight": 0, "max_inflight": 0}
+
+    @app.get("/uploads/stats")
+    async def upload_stats():
+        return uploads
+
+    @app.post("/rest/uploads/create_upload_url")
+    async def create_upload_url(request: Request):
+        body = await request.json()
+        await asyncio.sleep(faults.sample_latency() / 4)
+        base = str(request.base_url).rstrip("/")
+        key = f"{uuid4().hex[:8]}/{body.get('filename')}"
+        return {
+            "fields": {"key": key, "Content-Type": body.get("content_type") or "application/octet-stream"},
+            "s3_bucket_url": f"{base}/fake-s3/upload",
+            "s3_object_url": f"{base}/fake-s3/objects/{key}",
+        }
+
+    @app.post("/fake-s3/upload")
+    async def s3_upload(request: Request):
+        """Bucket palsu: terima body multipart mentah (tanpa parsing), latency + fault injection"""
+        uploads["inflight"] += 1
+        uploads["max_inflight"] = max(uploads["max_inflight"], uploads["inflight"])
+        try:
+            size = 0
+            async for chunk in request.stream():
+                size += len(chunk)
+            outcome = faults.decide()
+            await asyncio.sleep(faults.sample_latency())
+            if outcome == "error":
+                return JSONResponse(status_code=faults.error_status, content={"detail": "Injected upload failure"})
+            uploads["requests"] += 1
+            uploads["bytes"] += size
+            return Response(status_code=204)
+        finally:
+            uploads["inflight"] -= 1
+
+    @app.post("/rest/sse/perplexity_ask")
+    async def perplexity_ask(request: Request):
+        body = await request.json()
+        outcome = faults.decide()
+        latency = faults.sample_latency()
+
+        if outcome == "error":
+            await asyncio.sleep(latency * random.random())
+            return JSONResponse(status_code=faults.error_status, content={"detail": "Injected failure"})
+
+        answer = scripted._respond(body.get("query_str", ""))
+        backend_uuid = str(uuid4())
+        attachments = body.get("params", {}).get("attachments", [])
+
+        async def stream():
+            if outcome == "hang":
+                await asyncio.sleep(faults.hang_seconds)
+            pieces = split_chunks(answer, chunks)
+            answer_so_far = ""
+            for i, piece in enumerate(pieces):
+                await asyncio.sleep(latency / len(pieces))
+                answer_so_far += piece
+                yield perplexity_frame(answer_so_far, final=i == len(pieces) - 1, backend_uuid=backend_uuid, attachments=attachments)
+            yield "event: end_of_stream\r\ndata: {}\r\n\r\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake DeepSeek / Perplexity server")
+    parser.add_argument("provider", choices=["deepseek", "perplexity"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency", default="lognormal:0.8,0.4", help="fixed:S | uniform:A,B | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--chunks", type=int, default=6, help="Jumlah frame streaming per jawaban")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraksi request yang menggantung")
+    parser.add_argument("--hang-seconds", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    faults = FaultInjector(args.latency, args.error_rate, args.error_status, args.hang_rate, args.hang_seconds)
+    factory = create_deepseek_app if args.provider == "deepseek" else create_perplexity_app
+    uvicorn.run(factory(faults, chunks=args.chunks), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark fixtures - fixture menu, offline cache manager & scripted LLM
+Tidak butuh Supabase / API key, jadi bisa dijalankan di mana saja
+"""
+
+import asyncio
+import json
+import logging
+import random
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.llms import LLM
+
+from config.database import MenuCacheManager
+from core.token_usage import record_usage
+from core.utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_MENU_PATH = Path(__file__).resolve().parent / "fixture_menu.json"
+
+# Keyword sederhana untuk meniru keputusan routing LLM
+SCRIPTED_ROUTES = {
+    "ayam": "protein_ayam", "geprek": "protein_ayam", "crispy": "protein_ayam",
+    "ati": "ati_ampela", "ampela": "ati_ampela",
+    "ikan": "protein_ikan", "lele": "protein_ikan",
+    "tahu": "protein_ringan", "tempe": "protein_ringan", "telur": "protein_ringan",
+    "nasi": "karbo", "kwetiaw": "karbo", "batagor": "karbo", "pempek": "karbo", "ketoprak": "karbo",
+    "paket": "paket_hemat",
+    "soto": "menu_kuah", "sop": "menu_kuah", "kuah": "menu_kuah", "bakso": "menu_kuah",
+    "makaroni": "jajanan", "donat": "jajanan", "piscok": "jajanan",
+    "es": "minum_cold", "dingin": "minum_cold",
+    "hangat": "minum_hot", "panas": "minum_hot", "kopi": "minum_hot", "jahe": "minum_hot",
+}
+
+SCRIPTED_SOLD_OUT = {"habis", "kosong", "abis"}
+SCRIPTED_STATUS_WORDS = SCRIPTED_SOLD_OUT | {"ada", "ready", "tersedia", "lagi", "masih", "udah", "sudah"}
+
+
+
+def load_fixture_menu(path: Path = FIXTURE_MENU_PATH, scale: int = 1) -> List[dict]:
+    """Load fixture menu; scale > 1 menggandakan item untuk simulasi menu besar"""
+    items = json.loads(Path(path).read_text(encoding="utf-8"))
+    if scale <= 1:
+        return items
+
+    scaled = []
+    next_id = 1
+    for copy in range(scale):
+        for item in items:
+            suffix = f" V{copy + 1}" if copy else ""
+            scaled.append({**item, "id": next_id, "name": f"{item['name']}{suffix}"})
+            next_id += 1
+    return scaled
+
+
+class _FixtureResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class _FixtureTable:
+    """Tiruan minimal query builder supabase (select/update/in_/eq/execute)"""
+
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+        self._update: Optional[dict] = None
+        self._ids: Optional[List[int]] = None
+
+    def select(self, *args):
+        return self
+
+    def order(self, *args):
+        return self
+
+    def update(self, data: dict):
+        self._update = data
+        return self
+
+    def in_(self, column: str, values: List[int]):
+        self._ids = list(values)
+        return self
+
+    def eq(self, column: str, value: int):
+        self._ids = [value]
+        return self
+
+    def execute(self):
+        if self._update is None:
+            return _FixtureResponse([dict(row) for row in self.rows])
+
+        updated = []
+        for row in self.rows:
+            if self._ids is None or row["id"] in self._ids:
+                row.update(self._update)
+                updated.append(dict(row))
+        return _FixtureResponse(updated)
+
+
+class FixtureSupabase:
+    """In-memory pengganti supabase client untuk benchmark/evaluasi"""
+
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+
+    def table(self, name: str):
+        return _FixtureTable(self.rows)
+
+
+class FixtureCacheManager(MenuCacheManager):
+    """MenuCacheManager yang membaca fixture menu, bukan Supabase"""
+
+    def __init__(self, items: Optional[List[dict]] = None, scale: int = 1):
+        rows = [dict(item) for item in (items or load_fixture_menu(scale=scale))]
+        super().__init__(FixtureSupabase(rows))
+        self.initialize_cache()
+
+
+class ScriptedLLM(LLM):
+    """
+    LLM offline yang meniru perilaku agent prompts
+    - Latency = base + per-token * prompt tokens (+ jitter)
+    - Menghitung jumlah call & token untuk laporan benchmark
+    """
+    base_latency: float = 0.25
+    latency_per_1k_tokens: float = 0.4
+    jitter: float = 0.1
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs) -> str:
+        raise NotImplementedError("Use ainvoke()")
+
+    def reset(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> str:
+        prompt_tokens = estimate_tokens(prompt)
+        latency = self.base_latency + self.latency_per_1k_tokens * prompt_tokens / 1000
+        latency *= 1 + random.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(latency, 0))
+
+        answer = self._respond(prompt)
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += estimate_tokens(answer)
+        record_usage("scripted", prompt_tokens, estimate_tokens(answer), source="estimate")
+        return answer
+
+    def _respond(self, prompt: str) -> str:
+        question = prompt.rsplit("PERTANYAAN", 1)[-1] if "PERTANYAAN" in prompt else prompt
+        if "KATEGORI:" in prompt:
+            return json.dumps({"categories": self._route(question)})
+        if "REQUEST:" in prompt:
+            return self._extract(prompt)
+        return "Baik kak, berikut info menunya sesuai data yang tersedia."
+
+    @staticmethod
+    def _extract(prompt: str) -> str:
+        """Tiru CRUD extract: cocokkan kata request ke listing `id,name` di DATA"""
+        data, request = prompt.rsplit("REQUEST:", 1)
+        items = re.findall(r"^\s*(\d+),(.+)$", data.rsplit("DATA:", 1)[-1], re.MULTILINE)
+        words = re.findall(r"\w+", request.lower())
+        status = "false" if any(w in SCRIPTED_SOLD_OUT for w in words) else "true"
+        keywords = [w for w in words if w not in SCRIPTED_STATUS_WORDS and w != "semua"]
+
+        matches = [item_id for item_id, name in items
+                   if keywords and all(k in name.lower().split() for k in keywords)]
+        if not matches and "semua" not in words:
+            return json.dumps({"clarify": "Menu yang mana kak?"})
+        if len(matches) > 1 and "semua" not in words:
+            return json.dumps({"clarify": f"{keywords[0].title()} apa?"})
+        if not matches:
+            matches = [item_id for item_id, _ in items]
+        return json.dumps({"ids": [int(item_id) for item_id in matches], "available": status == "true"})
+
+    @staticmethod
+    def _route(question: str) -> List[str]:
+        words = re.findall(r"\w+", question.lower())
+        if "semua" in words or "menu" in words:
+            return ["all"]
+        categories = []
+        for word in words:
+            category = SCRIPTED_ROUTES.get(word)
+            if category and category not in categories:
+                categories.append(category)
+        return categories or ["all"]
+
+
+def fixture_snapshot_info(cache_manager: MenuCacheManager) -> Dict[str, Any]:
+    """Info ringkas fixture untuk header laporan"""
+    menu = cache_manager.get_menu_data()
+    return {
+        "categories": len(menu),
+        "items": sum(len(items) for items in menu.values()),
+        "menu_toon_tokens": estimate_tokens(cache_manager.get_menu_toon()),
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+    }
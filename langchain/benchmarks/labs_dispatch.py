@@ -0,0 +1,144 @@
+"""
+Benchmark: LabsClient - polling lama (asyncio.sleep(0.01) + satu last_answer bersama)
+vs event-driven (call_soon_threadsafe ke antrian per request)
+
+Websocket diganti FakeSocket: thread terpisah (seperti thread WebSocketApp) yang
+memanggil client._on_message dengan frame socket.io "42[<model>_query_progress, {...}]".
+Polling lama hanya bisa satu pertanyaan per client, jadi dijalankan berurutan;
+event-driven dijalankan bersamaan (satu model per request).
+
+Usage (dari folder langchain/):
+    python -m benchmarks.labs_dispatch
+    python -m benchmarks.labs_dispatch --requests 5 --latency 0.5 --chunks 20
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from typing import List
+
+from core.metrics import summarize
+from perplexity_async.labs import LabsClient
+
+MODELS = ["r1-1776", "sonar-pro", "sonar", "sonar-reasoning-pro", "sonar-reasoning"]
+
+
+class FakeSocket:
+    """ws.send() → thread 'server' mengirim progress frame setelah latency"""
+
+    def __init__(self, client, latency: float, chunks: int):
+        self.client = client
+        self.latency = latency
+        self.chunks = chunks
+        self.sends = 0
+
+    def send(self, message: str):
+        if not message.startswith("42"):
+            return
+        payload = json.loads(message[2:])[1]
+        self.sends += 1
+        threading.Thread(target=self._reply, args=(payload,), daemon=True).start()
+
+    def _reply(self, payload: dict):
+        model = payload["model"]
+        query = payload["messages"][-1]["content"]
+        step = self.latency / self.chunks
+        for i in range(1, self.chunks + 1):
+            time.sleep(step)
+            frame = {"output": f"{query} → {i}", "final": i == self.chunks, "model": model}
+            self.client._on_message(self, "42" + json.dumps([f"{model}_query_progress", frame]))
+
+
+class PollingLabsClient:
+    """Implementasi sebelumnya (ask + _on_message), tanpa koneksi"""
+
+    def __init__(self):
+        self.last_answer = None
+        self.history = []
+
+    def _on_message(self, ws, message):
+        if message.startswith("42"):
+            response = json.loads(message[2:])[1]
+            if "final" in response:
+                self.last_answer = response
+
+    async def ask(self, query, model="r1-1776"):
+        self.last_answer = None
+        self.history.append({"role": "user", "content": query})
+        self.ws.send("42" + json.dumps(["perplexity_labs", {"messages": self.history, "model": model}]))
+        while True:
+            if self.last_answer and self.last_answer["final"]:
+                answer = self.last_answer
+                self.last_answer = None
+                self.history.append({"role": "assistant", "content": answer["output"], "priority": 0})
+                return answer
+            await asyncio.sleep(0.01)
+
+
+async def timed_ask(client, query: str, model: str, latency: float) -> dict:
+    start = time.perf_counter()
+    answer = await client.ask(query, model=model)
+    elapsed = time.perf_counter() - start
+    return {"ok": answer["output"].startswith(query), "latency": elapsed, "overhead": elapsed - latency}
+
+
+def report(results: List[dict], wall: float, cpu: float) -> dict:
+    return {
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 4),
+        "correlated": sum(r["ok"] for r in results),
+        "latency_s": summarize([r["latency"] for r in results]),
+        "overhead_ms": {k: round(v * 1000, 2) for k, v in summarize([r["overhead"] for r in results]).items() if k != "count"},
+    }
+
+
+async def run_polling(args) -> dict:
+    client = PollingLabsClient()
+    client.ws = FakeSocket(client, args.latency, args.chunks)
+    wall, cpu = time.perf_counter(), time.process_time()
+    results = []
+    for i in range(args.requests):
+        results.append(await timed_ask(client, f"q{i}", MODELS[i % len(MODELS)], args.latency))
+    return report(results, time.perf_counter() - wall, time.process_time() - cpu)
+
+
+async def run_event_driven(args) -> dict:
+    client = LabsClient.__new__(LabsClient)
+    client._setup_dispatch()
+    client.ws = FakeSocket(client, args.latency, args.chunks)
+    wall, cpu = time.perf_counter(), time.process_time()
+    results = await asyncio.gather(*[
+        timed_ask(client, f"q{i}", MODELS[i % len(MODELS)], args.latency)
+        for i in range(args.requests)
+    ])
+    return report(results, time.perf_counter() - wall, time.process_time() - cpu)
+
+
+async def run(args) -> dict:
+    polling = await run_polling(args)
+    event_driven = await run_event_driven(args)
+    return {
+        "requests": args.requests,
+        "server_latency_s": args.latency,
+        "chunks": args.chunks,
+        "polling_sequential": polling,
+        "event_driven_concurrent": event_driven,
+        "cpu_reduction": round(polling["cpu_s"] / event_driven["cpu_s"], 1) if event_driven["cpu_s"] else None,
+        "wall_speedup": round(polling["wall_s"] / event_driven["wall_s"], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LabsClient dispatch")
+    parser.add_argument("--requests", type=int, default=5, help="Jumlah pertanyaan (model dirotasi)")
+    parser.add_argument("--latency", type=float, default=1.0, help="Waktu jawaban server (detik)")
+    parser.add_argument("--chunks", type=int, default=20, help="Progress frame per jawaban")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Latency routing per model Perplexity Labs (LabsCustomLLM sebagai routing_llm)
+
+Setiap pertanyaan menu di eval_corpus.json dikirim ke node route MenuAgent,
+satu kali per model; laporkan latency p50/p95/p99 dan routing accuracy per model.
+Answer tidak dijalankan (ScriptedLLM hanya placeholder).
+
+Usage (dari folder langchain/):
+    python -m benchmarks.labs_latency --models sonar,sonar-pro
+    python -m benchmarks.labs_latency --offline 0.3     # tanpa network (FakeSocket)
+    python -m benchmarks.labs_latency --offline 0.3 --connections 3 --concurrency 6
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from benchmarks.evaluate import CORPUS_PATH, same_categories
+from benchmarks.fixtures import FixtureCacheManager, ScriptedLLM
+from benchmarks.labs_dispatch import FakeSocket
+from core.agents import MenuAgent
+from core.labs_llm import LabsCustomLLM
+from core.metrics import summarize
+from core.structured import StructuredOutputStats
+from perplexity_async import LabsClient
+
+
+class OfflineLabsSocket(FakeSocket):
+    """FakeSocket yang menjawab routing JSON {"categories": ["all"]}"""
+
+    def _reply(self, payload: dict):
+        model = payload["model"]
+        time.sleep(self.latency)
+        frame = {"output": '{"categories": ["all"]}', "final": True, "model": model}
+        self.client._on_message(self, "42" + json.dumps([f"{model}_query_progress", frame]))
+
+
+async def build_client(args):
+    if args.offline is None:
+        return await LabsClient()
+    client = LabsClient.__new__(LabsClient)
+    client._setup_dispatch(max_turns=1)
+    client.ws = OfflineLabsSocket(client, args.offline, 1)
+    return client
+
+
+async def measure_model(clients: list, model: str, questions: list, args) -> dict:
+    routing_llm = LabsCustomLLM(clients, model=model, timeout=args.timeout)
+    output_stats = StructuredOutputStats()
+    agent = MenuAgent(ScriptedLLM(), FixtureCacheManager(), routing_llm=routing_llm, output_stats=output_stats)
+
+    correct, latencies = 0, []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def route(case):
+        nonlocal correct
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                routed = await agent._route_with_llm({"input": case["question"], "deadline": None}, time.time())
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"⚠️ {model}: {e}")
+                return
+            latencies.append(time.perf_counter() - start)
+            correct += same_categories(routed["categories"], case["expected_categories"])
+
+    await asyncio.gather(*[route(case) for case in questions])
+
+    return {
+        "latency_s": summarize(latencies),
+        "routing_accuracy": round(correct / len(questions), 3) if questions else None,
+        "errors": len(questions) - len(latencies),
+        "parse": output_stats.summary().get("route"),
+    }
+
+
+async def run(args) -> dict:
+    corpus = json.loads(CORPUS_PATH.read_text())
+    questions = corpus["menu"][: args.limit] if args.limit else corpus["menu"]
+    clients = await asyncio.gather(*[build_client(args) for _ in range(args.connections)])
+    models = {}
+    for model in args.models.split(","):
+        models[model] = await measure_model(list(clients), model.strip(), questions, args)
+    return {
+        "questions": len(questions),
+        "offline": args.offline is not None,
+        "connections": args.connections,
+        "concurrency": args.concurrency,
+        "models": models,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency routing per model Perplexity Labs")
+    parser.add_argument("--models", default="sonar,sonar-pro", help="Model Labs dipisah koma")
+    parser.add_argument("--limit", type=int, default=0, help="Maksimal pertanyaan (0 = semua)")
+    parser.add_argument("--timeout", type=float, default=20.0)
+    parser.add_argument("--connections", type=int, default=1, help="Jumlah websocket LabsClient")
+    parser.add_argument("--concurrency", type=int, default=1, help="Pertanyaan routing bersamaan")
+    parser.add_argument("--offline", type=float, metavar="LATENCY", help="Pakai FakeSocket dengan latency tetap (detik)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Load generator untuk FastAPI app - open-loop pada target RPS
+
+Request dikirim sesuai jadwal (tidak menunggu response sebelumnya), jadi
+antrian di server terlihat di latency, bukan disembunyikan oleh client.
+
+Usage (dari folder langchain/, API sudah jalan):
+    python -m benchmarks.loadgen --rps 5 --duration 30
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --endpoint edit-menu --rps 2 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+from benchmarks.evaluate import CORPUS_PATH
+from core.metrics import summarize
+
+
+class LoadResult:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.sent = 0
+        self.dropped = 0  # Melebihi max in-flight
+
+
+async def fire(client: httpx.AsyncClient, path: str, payload: dict, result: LoadResult, timeout: float):
+    start = time.perf_counter()
+    try:
+        resp = await client.post(path, json=payload, timeout=timeout)
+        status = str(resp.status_code)
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    elapsed = time.perf_counter() - start
+    result.statuses[status] += 1
+    if status == "200":
+        result.latencies.append(elapsed)
+
+
+async def run_load(args, questions: List[str]) -> Dict[str, Any]:
+    result = LoadResult()
+    path = f"/{args.endpoint}"
+    headers = {"X-API-Key": args.api_key}
+    interval = 1.0 / args.rps
+    inflight = set()
+
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits) as client:
+        start = time.perf_counter()
+        next_send = start
+        while next_send - start < args.duration:
+            await asyncio.sleep(max(next_send - time.perf_counter(), 0))
+            next_send += interval
+
+            if len(inflight) >= args.max_inflight:
+                result.dropped += 1
+                continue
+
+            payload = {"question": random.choice(questions)}
+            if args.endpoint == "edit-menu":
+                payload["session_id"] = f"loadgen-{result.sent}"
+            task = asyncio.create_task(fire(client, path, payload, result, args.timeout))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+            result.sent += 1
+
+        send_window = time.perf_counter() - start
+        if inflight:
+            await asyncio.wait(inflight)
+        wall = time.perf_counter() - start
+
+    completed = sum(result.statuses.values())
+    ok = result.statuses.get("200", 0)
+    return {
+        "endpoint": path,
+        "target_rps": args.rps,
+        "offered_rps": round(result.sent / send_window, 2) if send_window else 0.0,
+        "throughput_rps": round(ok / wall, 2) if wall else 0.0,
+        "sent": result.sent,
+        "dropped": result.dropped,
+        "completed": completed,
+        "error_rate": round((completed - ok) / completed, 3) if completed else 0.0,
+        "statuses": dict(sorted(result.statuses.items())),
+        "latency_s": summarize(result.latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator untuk Warung22 API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--api-key", default=os.getenv("API_KEY", "default-insecure-key"))
+    parser.add_argument("--endpoint", choices=["ask", "edit-menu"], default="ask")
+    parser.add_argument("--rps", type=float, default=2.0, help="Target request per detik")
+    parser.add_argument("--duration", type=float, default=20.0, help="Lama pengiriman (detik)")
+    parser.add_argument("--max-inflight", type=int, default=200, help="Batas request bersamaan (sisanya di-drop)")
+    parser.add_argument("--timeout", type=float, default=50.0, help="Timeout client (WA bot: 50s)")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH)
+    parser.add_argument("--seed", type=int, default=22)
+    parser.add_argument("--output", type=Path, help="Tulis laporan JSON ke file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    corpus = json.loads(args.corpus.read_text(encoding="utf-8"))
+    key = "menu" if args.endpoint == "ask" else "crud"
+    questions = [case["question"] for case in corpus[key]]
+
+    report = asyncio.run(run_load(args, questions))
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
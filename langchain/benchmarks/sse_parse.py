@@ -0,0 +1,119 @@
+"""
+Benchmark: parsing SSE non-stream Perplexity - lama (decode semua frame) vs baru
+(simpan frame mentah terakhir, decode sekali)
+
+Stream direkam dari format fake server (frame kumulatif seperti Perplexity asli):
+setiap frame berisi jawaban sejauh ini, jadi ukuran frame tumbuh linear.
+
+Usage (dari folder langchain/):
+    python -m benchmarks.sse_parse
+    python -m benchmarks.sse_parse --chunks 800 --answer-chars 12000 --runs 5
+    python -m benchmarks.sse_parse --record stream.sse      # simpan stream
+    python -m benchmarks.sse_parse --replay stream.sse      # pakai stream rekaman
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+from benchmarks.fake_servers import perplexity_frame, split_chunks
+from core.metrics import summarize
+from perplexity_async.client import json_loads, read_final_message
+
+DELIMITER = b"\r\n\r\n"
+
+
+def record_stream(chunks: int, answer_chars: int) -> List[bytes]:
+    """Frame SSE (tanpa delimiter) seperti yang dihasilkan resp.aiter_lines()"""
+    sentence = "Geprek Jumbo tersedia dengan harga 90 EGP, Es Teh 15 EGP. "
+    answer = (sentence * (answer_chars // len(sentence) + 1))[:answer_chars]
+    pieces = split_chunks(answer, chunks)
+    frames, so_far = [], ""
+    for i, piece in enumerate(pieces):
+        so_far += piece
+        frame = perplexity_frame(so_far, final=i == len(pieces) - 1, backend_uuid="bench")
+        frames.append(frame.encode("utf-8").rstrip(DELIMITER))
+    frames.append(b"event: end_of_stream\r\ndata: {}")
+    return frames
+
+
+async def aiter_frames(frames: List[bytes]):
+    for frame in frames:
+        yield frame
+
+
+async def legacy_read(lines):
+    """Implementasi sebelumnya: json.loads setiap frame + field text, simpan semua chunk"""
+    chunks = []
+    async for chunk in lines:
+        content = chunk.decode("utf-8")
+        if content.startswith("event: message\r\n"):
+            content_json = json.loads(content[len("event: message\r\ndata: "):])
+            try:
+                if content_json.get("text"):
+                    content_json["text"] = json.loads(content_json["text"])
+            except (json.JSONDecodeError, TypeError):
+                pass
+            chunks.append(content_json)
+        elif content.startswith("event: end_of_stream\r\n"):
+            return chunks[-1] if chunks else {}
+
+
+async def measure(reader, frames: List[bytes], runs: int) -> dict:
+    cpu = []
+    for _ in range(runs):
+        start = time.process_time()
+        result = await reader(aiter_frames(frames))
+        cpu.append(time.process_time() - start)
+
+    tracemalloc.start()
+    await reader(aiter_frames(frames))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cpu_s": summarize(cpu), "peak_memory_kb": round(peak / 1024, 1), "result": result}
+
+
+async def run(args) -> dict:
+    if args.replay:
+        frames = [f for f in args.replay.read_bytes().split(DELIMITER) if f]
+    else:
+        frames = record_stream(args.chunks, args.answer_chars)
+    if args.record:
+        args.record.write_bytes(DELIMITER.join(frames) + DELIMITER)
+
+    legacy = await measure(legacy_read, frames, args.runs)
+    current = await measure(read_final_message, frames, args.runs)
+    assert legacy.pop("result") == current.pop("result"), "Parsed final frame differs"
+
+    return {
+        "stream": {
+            "frames": len(frames),
+            "bytes": sum(len(f) for f in frames),
+            "decoder": f"{json_loads.__module__}.{json_loads.__name__}",
+        },
+        "legacy": legacy,
+        "last_frame_only": current,
+        "cpu_speedup": round(legacy["cpu_s"]["p50"] / current["cpu_s"]["p50"], 1) if current["cpu_s"]["p50"] else None,
+        "memory_reduction": round(legacy["peak_memory_kb"] / current["peak_memory_kb"], 1) if current["peak_memory_kb"] else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE non-stream parsing")
+    parser.add_argument("--chunks", type=int, default=400, help="Jumlah frame message")
+    parser.add_argument("--answer-chars", type=int, default=8000, help="Panjang jawaban akhir")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--record", type=Path, help="Simpan stream ke file")
+    parser.add_argument("--replay", type=Path, help="Pakai stream rekaman (frame dipisah \\r\\n\\r\\n)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,15 @@
 perplexity_cookies = { 
     
-}
\ No newline at end of file
+}
+
+# Opsional: beberapa akun untuk ClientPool (satu dict cookies per akun).
+# Jika kosong, hanya perplexity_cookies yang dipakai.
+perplexity_cookie_sets = [
+    # {...}, {...}
+]
+
+# Opsional: cookies emailnator.com untuk membuat akun Perplexity baru di background
+# (PERPLEXITY_WARM_ACCOUNTS > 0). Jika kosong, provisioner tidak dijalankan.
+emailnator_cookies = {
+
+}
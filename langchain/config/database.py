@@ -5,11 +5,17 @@ Handles connection, caching, and realtime updates
 
 import logging
 import time
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 from datetime import datetime
-from supabase import create_client, Client as SupabaseClient
 import os
 
+from config.errors import ConfigError
+from core.toon_cache import ToonFragmentCache
+
+if TYPE_CHECKING:
+    # supabase berat (~0.25s import): hanya di-import saat client dibuat
+    from supabase import Client as SupabaseClient
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,11 +26,13 @@ class MenuCacheManager:
     - Listen realtime changes untuk update cache (sync client - simplified)
     """
     
-    def __init__(self, supabase_client: SupabaseClient):
+    def __init__(self, supabase_client: "SupabaseClient"):
         self.supabase = supabase_client
         self.cache: Dict[str, List[dict]] = {}
         self.last_updated: Optional[datetime] = None
+        self.version = 0  # Naik setiap snapshot menu baru dimuat
         self.channel = None
+        self.toon = ToonFragmentCache()
         logger.info("✅ MenuCacheManager initialized")
     
     def initialize_cache(self) -> Dict[str, List[dict]]:
@@ -36,14 +44,14 @@ class MenuCacheManager:
             # Fetch semua data menu dari Supabase
             response = self.supabase.table('menu_items').select('*').execute()
             
-            # Grouping data berdasarkan kategori
-            self.cache.clear()
+            # Grouping data berdasarkan kategori (snapshot baru, lalu swap)
+            snapshot: Dict[str, List[dict]] = {}
             for item in response.data:
                 category = item.get('category')
-                if category not in self.cache:
-                    self.cache[category] = []
+                if category not in snapshot:
+                    snapshot[category] = []
                 
-                self.cache[category].append({
+                snapshot[category].append({
                     'id': item.get('id'),
                     'category': item.get('category'),
                     'name': item.get('name'),
@@ -53,7 +61,8 @@ class MenuCacheManager:
                     'updated_at': item.get('updated_at')
                 })
             
-            self.last_updated = datetime.now()
+            # Render ulang TOON hanya untuk kategori yang berubah
+            self.toon.sync(snapshot, on_commit=lambda: self._commit_snapshot(snapshot))
             elapsed = time.time() - start_time
             total_items = sum(len(items) for items in self.cache.values())
             
@@ -64,6 +73,12 @@ class MenuCacheManager:
             logger.error(f"❌ Error loading cache from Supabase: {e}")
             raise
     
+    def _commit_snapshot(self, snapshot: Dict[str, List[dict]]):
+        """Swap dict cache + version di dalam lock ToonFragmentCache (atomic dengan fragment)"""
+        self.cache = snapshot
+        self.last_updated = datetime.now()
+        self.version += 1
+    
     def setup_realtime_listener(self):
         """
         Setup listener untuk realtime updates dari Supabase
@@ -86,17 +101,36 @@ class MenuCacheManager:
         """Ambil data menu untuk kategori tertentu"""
         return self.cache.get(category, [])
     
+    def get_menu_toon(self) -> str:
+        """Full menu dalam format TOON, di-render sekali per snapshot"""
+        return self.toon.menu()
+    
+    def get_category_toon(self, category: str) -> Optional[str]:
+        """TOON satu kategori dari cache fragment (None jika kategori kosong/tidak ada)"""
+        if not self.cache.get(category):
+            return None
+        return self.toon.category(category)
+    
+    def get_categories_toon(self, categories: List[str]) -> str:
+        """TOON beberapa kategori, urutan kanonik snapshot (stabil untuk prompt caching)"""
+        return self.toon.categories(categories)
+    
+    def get_id_name_listing(self, categories: Optional[List[str]] = None) -> str:
+        """Listing `id,name` untuk CRUD agent (None = semua kategori)"""
+        return self.toon.id_names(categories)
+    
     def cleanup(self):
         """Cleanup resources"""
         logger.info("🧹 Cache cleanup completed")
 
 
-def get_supabase_client() -> SupabaseClient:
+def get_supabase_client() -> "SupabaseClient":
     """
     Initialize and return Supabase client
     Reads credentials from environment variables
     """
     from dotenv import load_dotenv
+    from supabase import create_client
     
     # Load .env from root directory
     load_dotenv()
@@ -105,13 +139,13 @@ def get_supabase_client() -> SupabaseClient:
     supabase_key = os.getenv("SUPABASE_KEY")
     
     if not supabase_url or not supabase_key:
-        raise ValueError(
+        raise ConfigError(
             "Missing Supabase credentials. "
             "Please set SUPABASE_URL and SUPABASE_KEY in .env file"
         )
     
     if supabase_url == "your-supabase-url":
-        raise ValueError(
+        raise ConfigError(
             "Please update SUPABASE_URL in .env with your actual Supabase URL"
         )
     
@@ -0,0 +1,7 @@
+"""
+Error konfigurasi - env/credential kosong atau tidak valid, tidak sembuh dengan retry
+"""
+
+
+class ConfigError(ValueError):
+    """Konfigurasi (env, credential, file cookies) kosong atau tidak valid"""
@@ -5,53 +5,157 @@ CRUD Agent - Natural language to menu availability updates
 
 import logging
 import time
-import json
-import re
-from typing import TypedDict, List, Dict, Any, Optional, Union
+import operator
+from typing import Annotated, TypedDict, List, Dict, Any, Optional, Union
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langgraph.graph import StateGraph, START, END
 
 from core.llm import PerplexityCustomLLM
 from core.deepseek_llm import DeepSeekCustomLLM
-from core.utils import menu_to_toon, category_to_toon
-from config.database import MenuCacheManager, get_supabase_client
+from core.errors import LLMError, DeadlineExceededError
+from core.deadline import Deadline, run_with_deadline
+from core.token_usage import tracked_usage
+from core.structured import EXTRACT_GENERATION, ROUTE_GENERATION, StructuredOutputStats, parse_extract_output, parse_route_output
+from core.routing import RoutingCache, VALID_CATEGORIES
+from core.resolver import MenuResolver
+from core.sessions import ClarificationStore
+from config.database import MenuCacheManager
 from services.menu_service import MenuService
 
 logger = logging.getLogger(__name__)
 
+# Budget share per LLM step; sisanya dicadangkan untuk step berikutnya (DB update)
+ROUTE_BUDGET_SHARE = 0.3
+EXTRACT_BUDGET_SHARE = 0.6
+
 
 class CRUDState(TypedDict):
     """LangGraph state for CRUD operations"""
     input: str
+    session_id: Optional[str]
     categories: List[str]
     menu_data: str
+    candidates: Optional[List[int]]
     parsed_ids: Optional[List[int]]
     target_status: Optional[bool]
     updated_items: Optional[List[Dict[str, Any]]]
     error: Optional[str]
     result: str
+    deadline: Optional[Deadline]  # Budget waktu request (None = tanpa timeout)
+    # Usage LLM per request (di-reduce dengan operator.add antar node)
+    llm_input_tokens: Annotated[int, operator.add]
+    llm_output_tokens: Annotated[int, operator.add]
+    token_usage: Annotated[List[dict], operator.add]
 
 
 class CRUDAgent:
     """AI agent for menu CRUD operations"""
     
-    def __init__(self, llm: Union[PerplexityCustomLLM, DeepSeekCustomLLM], cache_manager: MenuCacheManager, temperature_routing: float = 1.0, temperature_answer: float = 1.3):
+    def __init__(self, llm: Union[PerplexityCustomLLM, DeepSeekCustomLLM], cache_manager: MenuCacheManager, temperature_routing: float = 1.0, temperature_answer: float = 1.3, routing_cache: Optional[RoutingCache] = None, resolver: Optional[MenuResolver] = None, session_store: Optional[ClarificationStore] = None, output_stats: Optional[StructuredOutputStats] = None, routing_llm: Optional[Any] = None):
         self.llm = llm
+        # LLM node route (default sama dengan llm); extract & message tetap memakai llm
+        self.routing_llm = routing_llm or llm
         self.cache_manager = cache_manager
+        self.routing_cache = routing_cache
+        self.resolver = resolver or MenuResolver(cache_manager)
+        self.session_store = session_store
+        self.output_stats = output_stats or StructuredOutputStats()
         # Temperatur Config
         self.temperature_routing, self.temperature_answer = temperature_routing, temperature_answer
         logger.info("✅ CRUDAgent initialized")
     
+    def entry(self, state: CRUDState) -> str:
+        """Lanjutkan klarifikasi tertunda, atau mulai dari resolve lokal"""
+        session_id = state.get("session_id")
+        if not self.session_store or not self.session_store.has_pending(session_id):
+            return "resolve"
+        
+        # Perintah baru yang lengkap (bukan jawaban klarifikasi) → buang sesi lama
+        if self.resolver.resolve(state["input"], record=False)["ids"]:
+            logger.info(f"🗑️ [CRUD-RESUME] New complete command, discarding pending clarification")
+            self.session_store.discard(session_id)
+            return "resolve"
+        return "resume"
+    
+    def resume_clarification(self, state: CRUDState):
+        """Node 0b: Jawaban klarifikasi → gabung dengan perintah awal + kandidat yang sudah dipersempit"""
+        logger.info("=" * 60)
+        pending = self.session_store.pop(state["session_id"])
+        if pending is None:
+            # Expired di antara entry() dan node ini
+            return self.resolve_locally(state)
+        
+        command = f"{pending['input']} {state['input']}"
+        logger.info(f"🔁 [CRUD-RESUME] '{pending['input']}' + '{state['input']}' ({len(pending['candidates'])} candidates)")
+        
+        # Coba resolve lokal dulu, hanya terima jika masih di dalam kandidat
+        resolution = self.resolver.resolve(command)
+        candidates = set(pending["candidates"])
+        if resolution["ids"] and (not candidates or set(resolution["ids"]) <= candidates):
+            logger.info(f"✅ [CRUD-RESUME] Resolved locally: {resolution['ids']} (0 LLM calls)")
+            return {
+                "input": command,
+                "categories": pending["categories"],
+                "candidates": pending["candidates"],
+                "parsed_ids": resolution["ids"],
+                "target_status": resolution["status"]
+            }
+        
+        return {
+            "input": command,
+            "categories": pending["categories"],
+            "menu_data": pending["menu_data"],
+            "candidates": pending["candidates"],
+            "parsed_ids": None,
+            "target_status": None
+        }
+    
+    def after_resume(self, state: CRUDState) -> str:
+        """Execute jika sudah resolved, selain itu langsung ke extract"""
+        if state.get("parsed_ids"):
+            return "execute"
+        return "extract" if state.get("menu_data") else "route"
+    
+    def resolve_locally(self, state: CRUDState):
+        """Node 0: Resolve nama → ID tanpa LLM untuk perintah yang jelas"""
+        logger.info("=" * 60)
+        logger.info(f"📥 [CRUD-RESOLVE] Input: '{state['input']}'")
+        start_time = time.time()
+        
+        resolution = self.resolver.resolve(state["input"])
+        elapsed = time.time() - start_time
+        
+        if resolution["ids"] is None:
+            logger.info(f"🤔 [CRUD-RESOLVE] Needs LLM ({resolution['reason']}, {len(resolution['candidates'])} candidates, {elapsed:.4f}s)")
+            return {"candidates": resolution["candidates"], "parsed_ids": None, "target_status": None}
+        
+        logger.info(f"✅ [CRUD-RESOLVE] {len(resolution['ids'])} items, Status: {'TERSEDIA' if resolution['status'] else 'HABIS'} (0 LLM calls, {elapsed:.4f}s)")
+        return {
+            "candidates": resolution["candidates"],
+            "parsed_ids": resolution["ids"],
+            "target_status": resolution["status"]
+        }
+    
+    def after_resolve(self, state: CRUDState) -> str:
+        """Langsung execute jika resolve lokal berhasil, selain itu pakai LLM"""
+        return "execute" if state.get("parsed_ids") else "route"
+    
+    @tracked_usage("crud-route")
     async def route_categories(self, state: CRUDState):
         """Node 1: Detect category"""
-        logger.info("=" * 60)
         logger.info(f"📥 [CRUD-ROUTE] Input: '{state['input']}'")
         start_time = time.time()
 
+        if self.routing_cache:
+            cached = self.routing_cache.get(state["input"])
+            if cached:
+                logger.info(f"✅ [CRUD-ROUTE] Cached categories: {cached} (0 LLM calls)")
+                return {"categories": cached}
+
         # ✅ FIXED: from_messages dengan bracket []
         routing_prompt = ChatPromptTemplate.from_messages([
-            ("system", """Deteksi kategori. Return JSON array.
+            ("system", """Deteksi kategori. Return JSON.
 
     MAPPING:
     - ayam/chicken/geprek/crispy/bakar/rica/goreng/jumbo → protein_ayam
@@ -67,42 +171,42 @@ class CRUDAgent:
     - .menu/semua/all/lengkap → all
 
     ATURAN OUTPUT:
-    - Jawab HANYA JSON array, tanpa penjelasan
-    - Contoh valid: ["protein_ayam"], ["menu_kuah", "minum_cold"], ["all"]
-    - Jika tidak yakin, return ["all"]"""),
+    - Jawab HANYA JSON object {{"categories": [...]}}, tanpa penjelasan
+    - Contoh valid: {{"categories": ["protein_ayam"]}}, {{"categories": ["menu_kuah", "minum_cold"]}}, {{"categories": ["all"]}}
+    - Jika tidak yakin, return {{"categories": ["all"]}}"""),
 
             ("user", "PERTANYAAN: {input}\n\nKATEGORI:")
         ])
 
         try:
-            chain = routing_prompt | self.llm | StrOutputParser()
-            try:
-                response = await chain.ainvoke(
-                    {"input": state["input"]},
-                    config={"temperature": self.temperature_routing}
-                )
-            except (TypeError, KeyError, AttributeError):
-                logger.debug("Temperature not supported, using default")
-                response = await chain.ainvoke({"input": state["input"]})
-
-            cleaned = response.strip()
-            if cleaned.startswith("```"):
-                cleaned = cleaned.split("```")[1].split("\n", 1)[-1]
-
-            categories = json.loads(cleaned.strip())
-            if not isinstance(categories, list):
-                categories = ["all"]
+            routing_llm = self.routing_llm.bind(temperature=self.temperature_routing, **ROUTE_GENERATION)
+            chain = routing_prompt | routing_llm | StrOutputParser()
+            response = await run_with_deadline(
+                lambda: chain.ainvoke({"input": state["input"]}),
+                state.get("deadline"), "crud-route", share=ROUTE_BUDGET_SHARE
+            )
 
-            valid = ["protein_ayam", "ati_ampela", "protein_ikan", "protein_ringan",
-                    "karbo", "paket_hemat", "menu_kuah", 'jajanan', "minum_cold", "minum_hot", "all"]
+            try:
+                categories = parse_route_output(response)
+                parsed = True
+            except ValueError as e:
+                logger.warning(f"⚠️ [CRUD-ROUTE] Parse failed ({e}), fallback to 'all'")
+                categories, parsed = ["all"], False
 
-            categories = [c for c in categories if c in valid] or ["all"]
+            categories = [c for c in categories if c in VALID_CATEGORIES]
+            self.output_stats.record("crud-route", parsed=parsed, fallback=not parsed or not categories)
+            if parsed and categories and self.routing_cache:
+                self.routing_cache.set(state["input"], categories)
+            categories = categories or ["all"]
 
             elapsed = time.time() - start_time
             logger.info(f"✅ [CRUD-ROUTE] Categories: {categories} ({elapsed:.2f}s)")
 
             return {"categories": categories}
 
+        except (LLMError, DeadlineExceededError):
+            # Provider down / deadline habis → typed error ke API (bukan extract kedua dengan full menu)
+            raise
         except Exception as e:
             logger.error(f"❌ [CRUD-ROUTE] Error: {e}, fallback to 'all'")
             return {"categories": ["all"]}
@@ -118,27 +222,24 @@ class CRUDAgent:
         
         # Jika "all", kirim semua data
         if "all" in categories:
-            all_items = [item for items in menu_data.values() for item in items]
+            simple_toon = self.cache_manager.get_id_name_listing()
+            item_count = sum(len(items) for items in menu_data.values())
         else:
-            all_items = []
-            for cat in categories:
-                items = self.cache_manager.get_category_data(cat)
-                if items:
-                    all_items.extend(items)
+            simple_toon = self.cache_manager.get_id_name_listing(categories)
+            item_count = sum(len(self.cache_manager.get_category_data(cat)) for cat in categories)
             
             # Fallback ke ALL jika kategori kosong
-            if not all_items:
+            if not simple_toon:
                 logger.warning(f"⚠️ No data for {categories}, loading ALL")
-                all_items = [item for items in menu_data.values() for item in items]
-        
-        # Format simple: ID,Name
-        simple_toon = "\n".join([f"{item['id']},{item['name']}" for item in all_items])
+                simple_toon = self.cache_manager.get_id_name_listing()
+                item_count = sum(len(items) for items in menu_data.values())
         
         elapsed = time.time() - start_time
-        logger.info(f"✅ [CRUD-LOAD] Loaded {len(all_items)} items ({elapsed:.4f}s)")
+        logger.info(f"✅ [CRUD-LOAD] Loaded {item_count} items from cached listing ({elapsed:.4f}s)")
         
         return {"menu_data": simple_toon}
     
+    @tracked_usage("crud-extract")
     async def extract_ids(self, state: CRUDState):
         """Node 3: Extract IDs with clarification check"""
         logger.info(f"🤖 [CRUD-EXTRACT] Extracting IDs...")
@@ -153,34 +254,47 @@ Logic:
 - + "semua" → Return ALL matching
 - "semua" alone → Return ALL
 
-Format: "id1,id2,status" OR "CLARIFY:Question?"
-Status: habis/kosong=false, ada/ready/tersedia=true"""),
+Output HANYA JSON object:
+- {{"ids": [id1, id2], "available": false}}
+- {{"clarify": "Question?"}}
+available: habis/kosong=false, ada/ready/tersedia=true
+
+DATA: {menu_data}"""),
     
-    ("user", "DATA: {menu_data}\nREQUEST: {input}")
+    # Prefix stabil (instruksi + listing) dulu, request per-user paling akhir
+    ("user", "REQUEST: {input}")
 ])
         
         try:
-            chain = extract_prompt | self.llm | StrOutputParser()
-            try:
-                response = await chain.ainvoke(
-                    {
-                        "menu_data": state["menu_data"],
-                        "input": state["input"]
-                    },
-                    config={"temperature": self.temperature_routing} 
-                )
-            except (TypeError, KeyError, AttributeError):
-                logger.debug("Temperature not supported, using default")
-                response = await chain.ainvoke({
+            extract_llm = self.llm.bind(temperature=self.temperature_routing, **EXTRACT_GENERATION)
+            chain = extract_prompt | extract_llm | StrOutputParser()
+            response = await run_with_deadline(
+                lambda: chain.ainvoke({
                     "menu_data": state["menu_data"],
                     "input": state["input"]
-                })
+                }),
+                state.get("deadline"), "crud-extract", share=EXTRACT_BUDGET_SHARE
+            )
             
             logger.info(f"📤 [CRUD-EXTRACT] Response: '{response}'")
             
+            try:
+                extracted = parse_extract_output(response)
+            except ValueError as e:
+                logger.warning(f"⚠️ [CRUD-EXTRACT] Parse failed: {e}")
+                self.output_stats.record("crud-extract", parsed=False, fallback=True)
+                return {
+                    "parsed_ids": None,
+                    "target_status": None,
+                    "error": "parse_failed",
+                    "result": f"❌ Parse gagal: {response[:100]}"
+                }
+            self.output_stats.record("crud-extract", parsed=True)
+            
             # Check if AI asks for clarification
-            if response.startswith("CLARIFY:"):
-                clarification = response.replace("CLARIFY:", "").strip()
+            if "clarify" in extracted:
+                clarification = extracted["clarify"]
+                self._save_clarification(state, clarification)
                 return {
                     "parsed_ids": None,
                     "target_status": None,
@@ -188,22 +302,17 @@ Status: habis/kosong=false, ada/ready/tersedia=true"""),
                     "result": f"❓ {clarification}"
                 }
             
-            # Parse IDs
-            pattern = r'(\d+(?:,\d+)*),(true|false)'
-            match = re.search(pattern, response, re.IGNORECASE)
+            item_ids = self.resolver.validate_ids(extracted["ids"])
+            is_available = extracted["available"]
             
-            if not match:
+            if not item_ids:
                 return {
                     "parsed_ids": None,
                     "target_status": None,
-                    "error": "parse_failed",
-                    "result": f"❌ Parse gagal: {response[:100]}"
+                    "error": "unknown_ids",
+                    "result": f"❌ ID tidak ditemukan di menu: {extracted['ids']}"
                 }
             
-            ids_str, status_str = match.groups()
-            item_ids = [int(x.strip()) for x in ids_str.split(',')]
-            is_available = (status_str.lower() == 'true')
-            
             logger.info(f"✅ [CRUD-EXTRACT] {len(item_ids)} items, Status: {'TERSEDIA' if is_available else 'HABIS'}")
             
             return {
@@ -211,6 +320,9 @@ Status: habis/kosong=false, ada/ready/tersedia=true"""),
                 "target_status": is_available
             }
             
+        except (LLMError, DeadlineExceededError):
+            # Provider down / budget habis → biarkan endpoint yang menangani (503/504)
+            raise
         except Exception as e:
             logger.error(f"❌ [CRUD-EXTRACT] Error: {e}")
             return {
@@ -220,6 +332,22 @@ Status: habis/kosong=false, ada/ready/tersedia=true"""),
                 "result": f"❌ Error: {str(e)}"
             }
     
+    def _save_clarification(self, state: CRUDState, clarification: str):
+        """Checkpoint klarifikasi supaya jawaban berikutnya lanjut langsung ke extract"""
+        session_id = state.get("session_id")
+        if not self.session_store or not session_id:
+            return
+        
+        candidates = state.get("candidates") or []
+        menu_data = self.resolver.listing(candidates) if candidates else ""
+        self.session_store.save(session_id, {
+            "input": state["input"],
+            "question": clarification,
+            "categories": state.get("categories", ["all"]),
+            "menu_data": menu_data or state["menu_data"],
+            "candidates": candidates
+        })
+    
     async def execute_update(self, state: CRUDState):
         """Node 4: Update database"""
         logger.info(f"⚙️ [CRUD-EXECUTE] Updating database...")
@@ -230,12 +358,17 @@ Status: habis/kosong=false, ada/ready/tersedia=true"""),
             return {"result": error_msg}
         
         try:
-            supabase = get_supabase_client()
-            service = MenuService(supabase, cache_manager=self.cache_manager)
+            # Pakai client yang sama dengan cache manager (bisa di-swap fixture saat evaluasi)
+            service = MenuService(self.cache_manager.supabase, cache_manager=self.cache_manager)
             
-            updated_items = await service.bulk_update_availability(
-                state["parsed_ids"],
-                state["target_status"]
+            # Update idempotent (set status) → aman di-retry
+            updated_items = await run_with_deadline(
+                lambda: service.bulk_update_availability(
+                    state["parsed_ids"],
+                    state["target_status"]
+                ),
+                state.get("deadline"), "crud-execute",
+                retry_on=(Exception,), timeout_error=TimeoutError
             )
             
             if not updated_items:
@@ -252,6 +385,8 @@ Status: habis/kosong=false, ada/ready/tersedia=true"""),
             
             return {"updated_items": updated_items}
             
+        except DeadlineExceededError:
+            raise
         except Exception as e:
             logger.error(f"❌ [CRUD-EXECUTE] Error: {e}")
             return {
@@ -275,20 +410,30 @@ Status: habis/kosong=false, ada/ready/tersedia=true"""),
         return {"result": msg}
 
 
-def create_crud_agent(llm: PerplexityCustomLLM, cache_manager: MenuCacheManager):
-    """Build CRUD workflow"""
+def create_crud_agent(llm: PerplexityCustomLLM, cache_manager: MenuCacheManager, routing_cache: Optional[RoutingCache] = None, resolver: Optional[MenuResolver] = None, session_store: Optional[ClarificationStore] = None, output_stats: Optional[StructuredOutputStats] = None, routing_llm: Optional[Any] = None):
+    """
+    Build CRUD workflow
+    
+    session_store: jika diisi, klarifikasi ({"clarify": ...}) disimpan per session_id
+    dan jawaban berikutnya lanjut langsung ke extract dengan kandidat yang sama
+    routing_llm: LLM khusus node route (mis. Labs sonar)
+    """
     logger.info("🔧 Building CRUD Agent...")
     
-    agent = CRUDAgent(llm, cache_manager)
+    agent = CRUDAgent(llm, cache_manager, routing_cache=routing_cache, resolver=resolver, session_store=session_store, output_stats=output_stats, routing_llm=routing_llm)
     workflow = StateGraph(CRUDState)
     
+    workflow.add_node("resume", agent.resume_clarification)
+    workflow.add_node("resolve", agent.resolve_locally)
     workflow.add_node("route", agent.route_categories)
     workflow.add_node("load", agent.load_menu_data)
     workflow.add_node("extract", agent.extract_ids)
     workflow.add_node("execute", agent.execute_update)
     workflow.add_node("message", agent.generate_message)
     
-    workflow.add_edge(START, "route")
+    workflow.add_conditional_edges(START, agent.entry, {"resume": "resume", "resolve": "resolve"})
+    workflow.add_conditional_edges("resume", agent.after_resume, {"execute": "execute", "extract": "extract", "route": "route"})
+    workflow.add_conditional_edges("resolve", agent.after_resolve, {"execute": "execute", "route": "route"})
     workflow.add_edge("route", "load")
     workflow.add_edge("load", "extract")
     workflow.add_edge("extract", "execute")
@@ -2,40 +2,61 @@
 Core Menu Agent - LangGraph workflow orchestrator
 """
 
+import asyncio
+import contextlib
 import logging
 import time
-import json
-from typing import TypedDict, List, Union
+import operator
+from typing import Annotated, Any, TypedDict, List, Union, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langgraph.graph import StateGraph, START, END
 
 from core.llm import PerplexityCustomLLM
 from core.deepseek_llm import DeepSeekCustomLLM
-from core.utils import menu_to_toon, category_to_toon
+from core.utils import estimate_tokens
+from core.routing import RoutingCache, VALID_CATEGORIES, guess_categories
+from core.metrics import SpeculationStats
+from core.structured import ANSWER_GENERATION, ROUTE_GENERATION, StructuredOutputStats, parse_route_output
+from core.deadline import Deadline, run_with_deadline
+from core.token_usage import combine_usage, tracked_usage
+from core.retrieval import MenuRetriever, is_browse_query
 from config.database import MenuCacheManager
 
 logger = logging.getLogger(__name__)
 
+# Routing boleh pakai maksimal 40% sisa budget, sisanya untuk answer
+ROUTE_BUDGET_SHARE = 0.4
+
 
 class State(TypedDict):
     """LangGraph state definition"""
     input: str
     categories: List[str]  # ✅ CHANGED: singular -> plural
     relevant_data: str
+    tokens_saved: int
     answer: str
-    llm_input_tokens: int
-    llm_output_tokens: int
+    # Usage LLM per request (di-reduce dengan operator.add antar node)
+    llm_input_tokens: Annotated[int, operator.add]
+    llm_output_tokens: Annotated[int, operator.add]
+    token_usage: Annotated[List[dict], operator.add]
+    deadline: Optional[Deadline]  # Budget waktu request (None = tanpa timeout)
 
 
 class MenuAgent:
     """Main agent orchestrator"""
     
-    def __init__(self, llm: Union[PerplexityCustomLLM, DeepSeekCustomLLM], cache_manager: MenuCacheManager, temperature_routing: float = 1.0, temperature_answer: float = 1.3):
+    def __init__(self, llm: Union[PerplexityCustomLLM, DeepSeekCustomLLM], cache_manager: MenuCacheManager, temperature_routing: float = 1.0, temperature_answer: float = 1.3, routing_cache: Optional[RoutingCache] = None, adaptive_threshold_tokens: int = 1500, retriever: Optional[MenuRetriever] = None, speculation_stats: Optional[SpeculationStats] = None, speculative: bool = False, output_stats: Optional[StructuredOutputStats] = None, routing_llm: Optional[Any] = None):
         self.llm = llm
+        # Routing boleh pakai model lain yang lebih cepat (mis. LabsCustomLLM), default sama dengan answer
+        self.routing_llm = routing_llm or llm
         self.cache_manager = cache_manager
-        self.current_input_tokens = 0
-        self.current_output_tokens = 0
+        self.routing_cache = routing_cache
+        self.retriever = retriever
+        self.speculation_stats = speculation_stats or SpeculationStats()
+        self.output_stats = output_stats or StructuredOutputStats()
+        self.adaptive_threshold_tokens = adaptive_threshold_tokens
+        self.speculative = speculative
         self.temperature_routing, self.temperature_answer = temperature_routing, temperature_answer
         logger.info("✅ MenuAgent initialized")
     
@@ -45,9 +66,20 @@ class MenuAgent:
         logger.info(f"📥 [ROUTE] Input: '{state['input']}'")
         start_time = time.time()
         
+        if self.routing_cache:
+            cached = self.routing_cache.get(state["input"])
+            if cached:
+                logger.info(f"✅ [ROUTE] Cached categories: {cached} (0 LLM calls)")
+                return {"categories": cached}
+        
+        return await self._route_with_llm(state, start_time)
+    
+    @tracked_usage("route")
+    async def _route_with_llm(self, state: State, start_time: float):
+        """Routing via LLM (tanpa cek routing cache)"""
         routing_prompt = ChatPromptTemplate.from_messages([
     ("system", """Anda adalah sistem routing untuk menu Warung22.
-Tugas Anda: Identifikasi SEMUA kategori menu dari pertanyaan user dan return JSON array.
+Tugas Anda: Identifikasi SEMUA kategori menu dari pertanyaan user dan return JSON.
 
 MAPPING KATA KUNCI:
 - ayam/chicken/geprek/crispy/bakar/rica/goreng/jumbo → protein_ayam
@@ -63,60 +95,40 @@ MAPPING KATA KUNCI:
 - .menu/semua/all/lengkap → all
 
 ATURAN OUTPUT:
-- Jawab HANYA JSON array, tanpa penjelasan
-- Contoh valid: ["protein_ayam"], ["menu_kuah", "minum_cold"], ["all"]
-- Jika tidak yakin, return ["all"]"""),
+- Jawab HANYA JSON object {{"categories": [...]}}, tanpa penjelasan
+- Contoh valid: {{"categories": ["protein_ayam"]}}, {{"categories": ["menu_kuah", "minum_cold"]}}, {{"categories": ["all"]}}
+- Jika tidak yakin, return {{"categories": ["all"]}}"""),
     
     ("user", "PERTANYAAN: {input}\n\nKATEGORI:")
 ])
 
         
-        chain = routing_prompt | self.llm | StrOutputParser()
-        try:
-            response = await chain.ainvoke(
-                {"input": state["input"]},
-                config={"temperature": self.temperature_routing}
-            )
-        except (TypeError, KeyError):
-            logger.debug("Temperature not supported, using default")
-            response = await chain.ainvoke({"input": state["input"]})
-        
-        # Parse JSON with error handling
+        # JSON mode + max_tokens kecil: output routing cukup {"categories": [...]}
+        routing_llm = self.routing_llm.bind(temperature=self.temperature_routing, **ROUTE_GENERATION)
+        chain = routing_prompt | routing_llm | StrOutputParser()
+        response = await run_with_deadline(
+            lambda: chain.ainvoke({"input": state["input"]}),
+            state.get("deadline"), "route", share=ROUTE_BUDGET_SHARE
+        )
+        
         try:
-            # Clean response (remove markdown code blocks if any)
-            cleaned = response.strip()
-
-            if cleaned.startswith("```"):
-                parts = cleaned.split("```")
-                if len(parts) >= 3:
-                    cleaned = parts[1]
-                    lines = cleaned.strip().split("\n")
-                    if lines[0].strip().lower() in ["json", "python", "text"]:
-                        cleaned = "\n".join(lines[1:])
-
-            cleaned = cleaned.strip()
-            categories = json.loads(cleaned)
-            
-            if not isinstance(categories, list):
-                logger.warning(f"⚠️ Response not a list: {response}")
-                categories = ["all"]
-                
-        except (json.JSONDecodeError, IndexError) as e:
-            logger.warning(f"⚠️ JSON parse failed ({e}), fallback to 'all'")
+            categories = parse_route_output(response)
+            parsed = True
+        except ValueError as e:
+            logger.warning(f"⚠️ Routing output parse failed ({e}), fallback to 'all'")
             logger.debug(f"Raw response: {response}")
-            categories = ["all"]
+            categories, parsed = ["all"], False
         
         # Validate categories
-        valid_categories = [
-            "protein_ayam", "ati_ampela", "protein_ikan", "protein_ringan",
-            "karbo", "paket_hemat", "menu_kuah", "jajanan", "minum_cold", "minum_hot", "all"
-        ]
-        
-        categories = [c for c in categories if c in valid_categories]
+        categories = [c for c in categories if c in VALID_CATEGORIES]
         
+        self.output_stats.record("route", parsed=parsed, fallback=not parsed or not categories)
         if not categories:
             logger.warning(f"⚠️ No valid categories found, fallback to 'all'")
             categories = ["all"]
+        elif parsed and self.routing_cache:
+            # Hanya hasil parse yang valid yang di-cache, bukan fallback
+            self.routing_cache.set(state["input"], categories)
         
         elapsed = time.time() - start_time
         logger.info(f"✅ [ROUTE] Detected {len(categories)} categories: {categories} ({elapsed:.2f}s)")
@@ -133,38 +145,145 @@ ATURAN OUTPUT:
         menu_data = self.cache_manager.get_menu_data()
         
         if "all" in categories:
-            toon_data = menu_to_toon(menu_data)
+            toon_data = self.cache_manager.get_menu_toon()
             total_items = sum(len(items) for items in menu_data.values())
             logger.info(f"📊 [FILTER] ALL menu ({total_items} items) from cache")
         else:
-            # Aggregate data from multiple categories
-            aggregated_data = {}
+            # Fragment TOON dari cache, digabung dalam urutan kanonik snapshot
+            # (["minum_cold", "protein_ayam"] dan sebaliknya → block identik untuk prefix cache)
             total_items = 0
-            
             for category in categories:
-                items = self.cache_manager.get_category_data(category)
-                if items:
-                    aggregated_data[category] = items
-                    total_items += len(items)
-                    logger.info(f"  ├─ {category}: {len(items)} items")
+                count = len(self.cache_manager.get_category_data(category))
+                if count:
+                    total_items += count
+                    logger.info(f"  ├─ {category}: {count} items")
             
-            if not aggregated_data:
+            toon_data = self.cache_manager.get_categories_toon(categories)
+            if not toon_data:
                 logger.warning(f"⚠️ No data found for categories: {categories}")
                 toon_data = "# No menu data available"
             else:
-                # Convert each category to TOON and combine
-                toon_parts = []
-                for category, items in aggregated_data.items():
-                    toon_parts.append(category_to_toon(category, items))
-                
-                toon_data = "\n\n".join(toon_parts)
                 logger.info(f"📊 [FILTER] Aggregated {total_items} items from {len(categories)} categories")
         
+        toon_data, tokens_saved = self._narrow_to_relevant_items(state["input"], toon_data, categories)
+        
         elapsed = time.time() - start_time
-        logger.info(f"✅ [FILTER] Converted to TOON ({elapsed:.4f}s)")
+        logger.info(f"✅ [FILTER] TOON from cached fragments ({elapsed:.4f}s)")
+        
+        return {"relevant_data": toon_data, "tokens_saved": tokens_saved}
+    
+    def _narrow_to_relevant_items(self, question: str, toon_data: str, categories: List[str]):
+        """Ganti kategori penuh dengan item yang disebut di pertanyaan (hanya di kategori hasil routing)"""
+        if not self.retriever or is_browse_query(question):
+            return toon_data, 0
+        
+        items = self.retriever.retrieve(question, categories)
+        if not items:
+            self.retriever.record(False, 0)
+            return toon_data, 0
+        
+        narrowed = self.retriever.render(items)
+        tokens_saved = estimate_tokens(toon_data) - estimate_tokens(narrowed)
+        if tokens_saved <= 0:
+            self.retriever.record(False, 0)
+            return toon_data, 0
+        
+        self.retriever.record(True, tokens_saved)
+        logger.info(f"🎯 [FILTER] {len(items)} relevant items, ~{tokens_saved} tokens saved")
+        return narrowed, tokens_saved
+    
+    def guess_context(self, question: str) -> List[str]:
+        """Kandidat kategori lokal untuk spekulasi: keyword → kategori, lalu retrieval nama item"""
+        categories = guess_categories(question)
+        if not categories and self.retriever:
+            for item in self.retriever.retrieve(question):
+                if item["category"] not in categories:
+                    categories.append(item["category"])
+        return categories
+    
+    async def speculate(self, state: State):
+        """
+        Node (speculative): jalankan routing LLM dan answer secara paralel
+        - Answer dimulai dengan konteks tebakan lokal selagi routing berjalan
+        - Jika routing mengkonfirmasi tebakan → pakai answer tersebut
+        - Jika tidak → batalkan, generate ulang dengan konteks hasil routing
+        """
+        logger.info("=" * 60)
+        logger.info(f"📥 [SPECULATE] Input: '{state['input']}'")
+        start_time = time.time()
+        
+        # Routing cache hit → tidak perlu spekulasi
+        cached = self.routing_cache.get(state["input"]) if self.routing_cache else None
+        guess = cached or self.guess_context(state["input"])
+        if cached or not guess:
+            if not cached:
+                self.speculation_stats.record_skip()
+            routed = {"categories": cached} if cached else await self._route_with_llm(state, start_time)
+            routed_state = {**state, **routed}
+            filtered = self.filter_data(routed_state)
+            answered = await self.generate_answer({**routed_state, **filtered})
+            return {**routed, **filtered, **answered, **combine_usage(routed, answered)}
         
-        return {"relevant_data": toon_data}
+        spec_state = {**state, "categories": guess}
+        spec_filtered = self.filter_data(spec_state)
+        spec_started = time.time()
+        answer_task = asyncio.create_task(self.generate_answer({**spec_state, **spec_filtered}))
+        # Waktu selesai answer yang sebenarnya (bisa jauh sebelum routing selesai)
+        answer_finished = []
+        answer_task.add_done_callback(lambda task: answer_finished.append(time.time()))
+        
+        try:
+            routed = await self._route_with_llm(state, start_time)
+        except BaseException:
+            await self._discard(answer_task)
+            raise
+        route_elapsed = time.time() - start_time
+        categories = routed["categories"]
+        
+        confirmed = "all" in guess or ("all" not in categories and set(categories) <= set(guess))
+        if confirmed:
+            answered = await answer_task
+            answer_elapsed = answer_finished[0] - spec_started
+            # Berurutan = route + answer; paralel menghemat bagian yang tumpang tindih
+            saved = max(min(route_elapsed, answer_elapsed), 0.0)
+            self.speculation_stats.record_hit(saved)
+            logger.info(f"🎯 [SPECULATE] HIT guess={guess} routed={categories}, saved ~{saved:.2f}s")
+            return {"categories": categories, **spec_filtered, **answered, **combine_usage(routed, answered)}
+        
+        await self._discard(answer_task)
+        self.speculation_stats.record_miss()
+        logger.info(f"↩️ [SPECULATE] MISS guess={guess} routed={categories}, regenerating answer")
+        routed_state = {**state, "categories": categories}
+        filtered = self.filter_data(routed_state)
+        answered = await self.generate_answer({**routed_state, **filtered})
+        return {"categories": categories, **filtered, **answered, **combine_usage(routed, answered)}
     
+    @staticmethod
+    async def _discard(task: asyncio.Task):
+        """Cancel answer spekulatif dan ambil hasilnya (exception task yang sudah gagal tidak dilaporkan ulang)"""
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await task
+    
+    def choose_path(self, state: State) -> str:
+        """Adaptive router: skip LLM routing jika full menu cukup kecil"""
+        full_toon = self.cache_manager.get_menu_toon()
+        estimated = estimate_tokens(full_toon) + estimate_tokens(state["input"])
+        
+        if estimated <= self.adaptive_threshold_tokens:
+            logger.info(f"⚡ [ADAPTIVE] Prompt ~{estimated} tokens <= {self.adaptive_threshold_tokens}, skip routing")
+            return "direct"
+        
+        logger.info(f"🔀 [ADAPTIVE] Prompt ~{estimated} tokens > {self.adaptive_threshold_tokens}, using routing")
+        return "speculate" if self.speculative else "route"
+    
+    def load_full_menu(self, state: State):
+        """Node 1 (adaptive): Kirim full menu TOON langsung tanpa routing"""
+        toon_data = self.cache_manager.get_menu_toon()
+        logger.info(f"📊 [DIRECT] Full menu from cache (~{estimate_tokens(toon_data)} tokens)")
+        return {"categories": ["all"], "relevant_data": toon_data}
+    
+    @tracked_usage("answer")
     async def generate_answer(self, state: State):
         """Node 3: Generate natural language answer for multiple items"""
         categories = state["categories"]  # ✅ FIXED: Access plural key
@@ -192,31 +311,26 @@ CONTOH JAWABAN BENAR:
 "Telur Ceplok sedang habis saat ini."
 
 CONTOH JAWABAN SALAH:
-"Geprek Jumbo tersedia dengan harga Rp90." ❌"""),
-    
-    ("user", """DATA MENU (FORMAT TOON):
-{menu_data}
+"Geprek Jumbo tersedia dengan harga Rp90." ❌
 
-PERTANYAAN USER: {input}
+DATA MENU (FORMAT TOON):
+{menu_data}"""),
+    
+    # Prefix stabil (instruksi + menu) dulu, pertanyaan per-request paling akhir
+    ("user", """PERTANYAAN USER: {input}
 
 JAWABAN:""")
 ])
         
-        chain = prompt | self.llm | StrOutputParser()
-        try:
-            answer = await chain.ainvoke(
-                {
-                    "menu_data": state["relevant_data"],
-                    "input": state["input"]
-                },
-                config={"temperature": self.temperature_answer}  # ✅ Pakai temperature_answer!
-            )
-        except (TypeError, KeyError, AttributeError):
-            logger.debug("Temperature not supported, using default")
-            answer = await chain.ainvoke({
+        answer_llm = self.llm.bind(temperature=self.temperature_answer, **ANSWER_GENERATION)
+        chain = prompt | answer_llm | StrOutputParser()
+        answer = await run_with_deadline(
+            lambda: chain.ainvoke({
                 "menu_data": state["relevant_data"],
                 "input": state["input"]
-            })
+            }),
+            state.get("deadline"), "answer"
+        )
         
         elapsed = time.time() - start_time
         logger.info(f"✅ [ANSWER] Response generated ({elapsed:.2f}s)")
@@ -224,18 +338,56 @@ JAWABAN:""")
         return {"answer": answer}
 
 
-def create_menu_agent(llm: PerplexityCustomLLM, cache_manager: MenuCacheManager):
-    """Build and compile LangGraph workflow"""
+def create_menu_agent(
+    llm: PerplexityCustomLLM,
+    cache_manager: MenuCacheManager,
+    routing_cache: Optional[RoutingCache] = None,
+    adaptive: bool = False,
+    adaptive_threshold_tokens: int = 1500,
+    retriever: Optional[MenuRetriever] = None,
+    speculative: bool = False,
+    speculation_stats: Optional[SpeculationStats] = None,
+    output_stats: Optional[StructuredOutputStats] = None,
+    routing_llm: Optional[Any] = None,
+):
+    """
+    Build and compile LangGraph workflow
+    
+    adaptive=True: jika full menu + pertanyaan <= adaptive_threshold_tokens,
+    routing dilewati dan full TOON langsung dikirim ke answer (1 LLM call)
+    retriever: jika diisi, pertanyaan spesifik hanya mengirim item yang disebut
+    speculative=True: answer dimulai paralel dengan routing memakai tebakan lokal
+    routing_llm: LLM khusus node route (mis. Labs sonar), answer tetap memakai llm
+    """
     logger.info("🔧 Building LangGraph workflow...")
     
-    agent = MenuAgent(llm, cache_manager)
+    agent = MenuAgent(
+        llm, cache_manager,
+        routing_cache=routing_cache,
+        adaptive_threshold_tokens=adaptive_threshold_tokens,
+        retriever=retriever,
+        speculation_stats=speculation_stats,
+        speculative=speculative,
+        output_stats=output_stats,
+        routing_llm=routing_llm
+    )
     workflow = StateGraph(State)
     
     workflow.add_node("route", agent.route_query)
     workflow.add_node("filter", agent.filter_data)
     workflow.add_node("answer", agent.generate_answer)
     
-    workflow.add_edge(START, "route")
+    entry = "speculate" if speculative else "route"
+    if speculative:
+        workflow.add_node("speculate", agent.speculate)
+        workflow.add_edge("speculate", END)
+    
+    if adaptive:
+        workflow.add_node("direct", agent.load_full_menu)
+        workflow.add_conditional_edges(START, agent.choose_path, {"direct": "direct", entry: entry})
+        workflow.add_edge("direct", "answer")
+    else:
+        workflow.add_edge(START, entry)
     workflow.add_edge("route", "filter")
     workflow.add_edge("filter", "answer")
     workflow.add_edge("answer", END)
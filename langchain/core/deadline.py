@@ -0,0 +1,131 @@
+"""
+Request deadline - budget waktu end-to-end yang dibawa lewat state LangGraph
+"""
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+from core.errors import DeadlineExceededError, LLMProviderError, LLMTimeoutError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Error yang layak di-retry selama budget masih ada
+RETRYABLE_LLM_ERRORS: Tuple[Type[BaseException], ...] = (LLMProviderError, LLMTimeoutError)
+
+
+class StepTimeout:
+    """Penanda per step: True jika cancel berasal dari step timeout (bukan speculation miss / disconnect)"""
+
+    def __init__(self):
+        self.expired = False
+
+
+_current_step: ContextVar[Optional[StepTimeout]] = ContextVar("deadline_step", default=None)
+
+
+def step_timed_out() -> bool:
+    """Dipanggil saat menangani CancelledError: apakah cancel ini karena step timeout?"""
+    step = _current_step.get()
+    return step is not None and step.expired
+
+
+async def _run_step(func: Callable[[], Awaitable[T]], timeout: float) -> T:
+    """
+    Seperti asyncio.wait_for, tapi step ditandai expired SEBELUM task di-cancel,
+    supaya kode di dalamnya (mis. circuit breaker) bisa membedakan timeout dari cancel lain
+    """
+    step = StepTimeout()
+    token = _current_step.set(step)
+    try:
+        task = asyncio.ensure_future(func())  # task mewarisi context berisi step
+    finally:
+        _current_step.reset(token)
+
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if done:
+        return task.result()
+
+    step.expired = True
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    raise asyncio.TimeoutError
+
+
+class Deadline:
+    """Titik waktu absolut (monotonic) kapan request harus selesai"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def step_timeout(self, share: float = 1.0, step: str = "step") -> float:
+        """Timeout untuk satu step: share x sisa budget (raise jika budget habis)"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceededError(f"Deadline exceeded before {step} ({self.budget:.0f}s budget)")
+        return remaining * share
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.2f}s)"
+
+
+async def run_with_deadline(
+    func: Callable[[], Awaitable[T]],
+    deadline: Optional[Deadline],
+    step: str,
+    share: float = 1.0,
+    retries: int = 1,
+    retry_on: Tuple[Type[BaseException], ...] = RETRYABLE_LLM_ERRORS,
+    base_delay: float = 0.25,
+    timeout_error: Type[Exception] = LLMTimeoutError,
+) -> T:
+    """
+    Jalankan func() dengan timeout dari sisa budget + retry terbatas (full jitter)
+    - Tanpa deadline → dipanggil langsung, tanpa timeout/retry (perilaku lama)
+    - Step timeout saat budget masih ada → timeout_error (default LLMTimeoutError)
+    - Budget habis → DeadlineExceededError (tidak di-retry)
+    """
+    if deadline is None:
+        return await func()
+
+    attempt = 0
+    while True:
+        timeout = deadline.step_timeout(share, step)
+        try:
+            return await _run_step(func, timeout)
+        except DeadlineExceededError:
+            raise
+        except asyncio.TimeoutError:
+            if deadline.expired:
+                raise DeadlineExceededError(f"Deadline exceeded during {step} ({deadline.budget:.0f}s budget)")
+            error: BaseException = timeout_error(f"{step} timed out after {timeout:.1f}s")
+        except retry_on as e:
+            error = e
+
+        if attempt >= retries:
+            raise error
+        attempt += 1
+
+        # Full jitter, tidak boleh melewati sisa budget
+        delay = min(random.uniform(0, base_delay * 2 ** attempt), deadline.remaining())
+        logger.warning(f"🔁 [DEADLINE] {step} failed ({error}), retry {attempt}/{retries} in {delay:.2f}s")
+        await asyncio.sleep(delay)
@@ -1,12 +1,17 @@
 """
-DeepSeek LLM - Support system role & dynamic temperature
+DeepSeek LLM - Support system role & parameter generate per call
+(temperature, max_tokens, stop, response_format via llm.bind)
 """
 
 import logging
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from langchain_core.language_models.llms import LLM
 from openai import AsyncOpenAI
 
+from core.errors import LLMProviderError
+from core.token_usage import record_usage
+from core.utils import estimate_tokens
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,13 +19,22 @@ class DeepSeekCustomLLM(LLM):
     client: object = None
     api_key: str = ""
     default_temperature: float = 1.0
+    request_timeout: float = 60.0
+    max_tokens: int = 2000
+    base_url: str = "https://api.deepseek.com"
+    # Context caching DeepSeek: token prompt yang prefix-nya sudah di-cache server
+    prompt_cache_hit_tokens: int = 0
+    prompt_cache_miss_tokens: int = 0
     
-    def __init__(self, api_key: str, default_temperature: float = 1.0, **kwargs):
+    def __init__(self, api_key: str, default_temperature: float = 1.0, request_timeout: float = 60.0, base_url: str = "https://api.deepseek.com", **kwargs):
         super().__init__(**kwargs)
         self.api_key = api_key
         self.default_temperature = default_temperature
-        self.client = AsyncOpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-        logger.info(f"✅ DeepSeek initialized (default temp: {default_temperature})")
+        self.request_timeout = request_timeout
+        self.base_url = base_url
+        # Retry ditangani di level pipeline (core/deadline.py) supaya tidak melewati budget request
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=request_timeout, max_retries=0)
+        logger.info(f"✅ DeepSeek initialized (default temp: {default_temperature}, base_url: {base_url})")
     
     @property
     def _llm_type(self) -> str:
@@ -31,8 +45,9 @@ class DeepSeekCustomLLM(LLM):
     
     async def _acall(self, prompt: str, stop: Optional[List[str]] = None, **kwargs) -> str:
         try:
-            # ✅ Get temperature dari kwargs atau pakai default
+            # ✅ Parameter per call dari llm.bind(...) atau pakai default
             temperature = kwargs.get('temperature', self.default_temperature)
+            max_tokens = kwargs.get('max_tokens', self.max_tokens)
             
             # Handle format prompt
             if isinstance(prompt, list):
@@ -44,16 +59,65 @@ class DeepSeekCustomLLM(LLM):
             else:
                 messages = [{"role": "user", "content": str(prompt)}]
             
-            logger.debug(f"🌡️  Using temperature: {temperature}")
+            logger.debug(f"🌡️  Using temperature: {temperature}, max_tokens: {max_tokens}")
+            
+            request = {
+                "model": "deepseek-chat",
+                "messages": messages,
+                "temperature": temperature,  # ✅ Dynamic temperature dari kwargs
+                "max_tokens": max_tokens,
+            }
+            if stop:
+                request["stop"] = stop
+            if kwargs.get('response_format'):
+                # JSON mode: {"type": "json_object"} (prompt wajib menyebut "json")
+                request["response_format"] = kwargs['response_format']
             
             # Kirim ke DeepSeek
-            resp = await self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=messages,
-                temperature=temperature,  # ✅ Dynamic temperature dari kwargs
-                max_tokens=2000
-            )
-            return resp.choices[0].message.content
+            resp = await self.client.chat.completions.create(**request)
         except Exception as e:
             logger.error(f"DeepSeek error: {e}")
-            return f"Error: {e}"
+            raise LLMProviderError(str(e), provider="deepseek") from e
+
+        content = resp.choices[0].message.content if resp.choices else None
+        if not content:
+            raise LLMProviderError("Empty completion", provider="deepseek")
+        
+        # Usage dari API; fallback ke tokenizer lokal jika tidak dikirim
+        usage = getattr(resp, "usage", None)
+        if usage:
+            hit = getattr(usage, "prompt_cache_hit_tokens", None)
+            miss = getattr(usage, "prompt_cache_miss_tokens", None)
+            if hit is not None and miss is not None:
+                self.prompt_cache_hit_tokens += hit
+                self.prompt_cache_miss_tokens += miss
+                record_usage("deepseek", usage.prompt_tokens, usage.completion_tokens,
+                             cache_hit_tokens=hit, cache_miss_tokens=miss)
+            else:
+                record_usage("deepseek", usage.prompt_tokens, usage.completion_tokens)
+        else:
+            prompt_text = "\n".join(str(m.get("content", "")) for m in messages)
+            record_usage("deepseek", estimate_tokens(prompt_text), estimate_tokens(content), source="estimate")
+        return content
+    
+    async def ping(self, timeout: float = 5.0) -> bool:
+        """Cek DeepSeek bisa dijangkau (GET /models, tanpa token) untuk /ready"""
+        try:
+            await self.client.with_options(timeout=timeout).models.list()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ DeepSeek unreachable: {e}")
+            return False
+    
+    def prefix_cache_stats(self) -> Dict[str, Any]:
+        """Hit rate prefix cache DeepSeek (dari usage.prompt_cache_hit/miss_tokens)"""
+        total = self.prompt_cache_hit_tokens + self.prompt_cache_miss_tokens
+        return {
+            "hit_tokens": self.prompt_cache_hit_tokens,
+            "miss_tokens": self.prompt_cache_miss_tokens,
+            "hit_rate": round(self.prompt_cache_hit_tokens / total, 3) if total else 0.0,
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        """Stats untuk /llm/stats (strategy deepseek tunggal)"""
+        return {"strategy": "deepseek", "provider": "deepseek", "prefix_cache": self.prefix_cache_stats()}
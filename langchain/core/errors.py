@@ -0,0 +1,37 @@
+"""
+Typed LLM errors - supaya outage tidak lolos sebagai jawaban "Error: ..."
+"""
+
+from typing import Optional
+
+
+class LLMError(Exception):
+    """Base error untuk semua kegagalan LLM"""
+
+    def __init__(self, message: str, provider: Optional[str] = None):
+        super().__init__(message)
+        self.provider = provider
+
+    def __str__(self) -> str:
+        message = super().__str__()
+        return f"[{self.provider}] {message}" if self.provider else message
+
+
+class LLMProviderError(LLMError):
+    """Provider gagal (network, HTTP error, response kosong/tidak bisa di-parse)"""
+
+
+class LLMTimeoutError(LLMError):
+    """Provider tidak menjawab dalam batas waktu"""
+
+
+class CircuitOpenError(LLMError):
+    """Circuit breaker provider sedang open, request tidak dikirim"""
+
+
+class LLMUnavailableError(LLMError):
+    """Semua provider gagal atau circuit-nya open"""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Budget waktu request habis - hentikan pipeline, jangan retry"""
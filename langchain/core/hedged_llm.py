@@ -0,0 +1,155 @@
+"""
+Hedged LLM - kirim ke primary, fire hedge ke secondary jika primary lambat
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.llms import LLM
+
+from core.metrics import LatencyTracker
+from core.token_usage import prefix_cache_stats
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Latency & counter per provider"""
+
+    def __init__(self, window: int = 500):
+        self.latency = LatencyTracker(window)
+        self.calls = 0
+        self.errors = 0
+        self.wins = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def incr(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "wins": self.wins,
+            "cancelled": self.cancelled,
+            "latency_s": self.latency.summary(),
+        }
+
+
+class HedgedLLM(LLM):
+    """
+    Composite LLM untuk memotong tail latency
+    - Request dikirim ke primary
+    - Jika belum ada jawaban setelah hedge delay (percentile latency primary),
+      hedge request dikirim ke secondary
+    - Jawaban pertama yang sukses dipakai, request lainnya dibatalkan
+    """
+    primary: Any = None
+    secondary: Any = None
+    primary_name: str = "primary"
+    secondary_name: str = "secondary"
+    hedge_percentile: float = 90.0
+    min_hedge_delay: float = 1.0
+    max_hedge_delay: float = 15.0
+    default_hedge_delay: float = 4.0
+    min_samples: int = 20
+    provider_stats: Dict[str, Any] = {}
+    hedges: int = 0
+
+    def __init__(self, primary, secondary, primary_name: str = "primary", secondary_name: str = "secondary", **kwargs):
+        super().__init__(
+            primary=primary,
+            secondary=secondary,
+            primary_name=primary_name,
+            secondary_name=secondary_name,
+            **kwargs
+        )
+        self.provider_stats = {primary_name: ProviderStats(), secondary_name: ProviderStats()}
+        logger.info(f"✅ HedgedLLM initialized ({primary_name} → {secondary_name} @ p{self.hedge_percentile:g})")
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs) -> str:
+        raise NotImplementedError("Use ainvoke()")
+
+    def hedge_delay(self) -> float:
+        """Delay sebelum hedge: percentile latency primary, dibatasi min/max"""
+        tracker = self.provider_stats[self.primary_name].latency
+        if len(tracker.samples()) < self.min_samples:
+            return self.default_hedge_delay
+        delay = tracker.percentile(self.hedge_percentile)
+        return min(max(delay, self.min_hedge_delay), self.max_hedge_delay)
+
+    async def _timed_call(self, name: str, llm, prompt: str, stop: Optional[List[str]], **kwargs) -> str:
+        stats = self.provider_stats[name]
+        stats.incr("calls")
+        start = time.time()
+        try:
+            result = await llm.ainvoke(prompt, stop=stop, **kwargs)
+        except asyncio.CancelledError:
+            # Dibatalkan karena kalah hedge: latency sebenarnya >= elapsed.
+            # Tetap dicatat (lower bound) supaya percentile tidak hanya berisi jawaban cepat
+            stats.latency.record(time.time() - start)
+            stats.incr("cancelled")
+            raise
+        except Exception:
+            stats.incr("errors")
+            raise
+
+        stats.latency.record(time.time() - start)
+        return result
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> str:
+        delay = self.hedge_delay()
+        tasks = {
+            asyncio.create_task(self._timed_call(self.primary_name, self.primary, prompt, stop, **kwargs)): self.primary_name
+        }
+
+        last_error: Optional[BaseException] = None
+        pending = set(tasks)
+        # try dimulai sebelum wait pertama: caller di-cancel selama hedge delay → primary ikut di-cancel
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done or next(iter(done)).exception() is not None:
+                reason = "timeout" if not done else "primary error"
+                self.hedges += 1
+                logger.info(f"🪝 [HEDGE] {reason} after {delay:.2f}s → firing {self.secondary_name}")
+                hedge = asyncio.create_task(
+                    self._timed_call(self.secondary_name, self.secondary, prompt, stop, **kwargs)
+                )
+                tasks[hedge] = self.secondary_name
+                pending.add(hedge)
+            pending |= done
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = tasks[task]
+                        self.provider_stats[winner].incr("wins")
+                        logger.debug(f"🏁 [HEDGE] Winner: {winner}")
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"⚠️ [HEDGE] {tasks[task]} failed: {last_error}")
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency per provider + jumlah hedge"""
+        return {
+            "strategy": "hedged",
+            "hedges": self.hedges,
+            "hedge_delay_s": round(self.hedge_delay(), 3),
+            "providers": {name: stats.summary() for name, stats in self.provider_stats.items()},
+            "prefix_cache": prefix_cache_stats([(self.primary_name, self.primary), (self.secondary_name, self.secondary)]),
+        }
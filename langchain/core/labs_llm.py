@@ -0,0 +1,114 @@
+"""
+Custom LLM wrapper for Perplexity Labs (LabsClient) - model cepat untuk routing
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, List, Union
+from langchain_core.language_models.llms import LLM
+from langchain_core.callbacks.manager import CallbackManagerForLLMRun
+
+from core.errors import LLMProviderError, LLMTimeoutError
+from core.metrics import LatencyTracker
+from core.token_usage import record_usage
+from core.utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LABS_MODELS = ("sonar", "sonar-pro", "sonar-reasoning", "sonar-reasoning-pro", "r1-1776")
+
+
+class LabsCustomLLM(LLM):
+    """
+    LangChain wrapper untuk perplexity_async.LabsClient
+    - Stateless: setiap call memakai history baru (tidak ada history bersama antar request)
+    - model bisa di-override per call: llm.bind(model="sonar-pro")
+    - Beberapa koneksi (list LabsClient): ask model sama di satu socket berjalan serial,
+      jadi call dikirim ke koneksi dengan antrian model paling pendek
+    - Timeout dihitung setelah lock model didapat (waktu antri tidak ikut)
+    - Latency dicatat per model (stats() → /llm/stats)
+    Parameter temperature / max_tokens / response_format diabaikan (Labs tidak mendukung)
+    """
+    client: Any = None
+    clients: List[Any] = []
+    model: str = "sonar"
+    timeout: Optional[float] = 20.0  # Batas waktu per ask (detik)
+    model_latency: Dict[str, Any] = {}
+    model_errors: Dict[str, int] = {}
+
+    def __init__(self, client: Union[Any, List[Any]], **kwargs):
+        super().__init__(**kwargs)
+        assert self.model in LABS_MODELS, f"Labs models -> {list(LABS_MODELS)}"
+        self.clients = list(client) if isinstance(client, (list, tuple)) else [client]
+        assert self.clients, "LabsCustomLLM needs at least one LabsClient"
+        self.client = self.clients[0]
+        self.model_latency = {}
+        self.model_errors = {}
+        logger.info(f"✅ LabsCustomLLM initialized ({self.model}, {len(self.clients)} connections)")
+
+    @property
+    def _llm_type(self) -> str:
+        return "perplexity_labs"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs) -> str:
+        raise NotImplementedError("Gunakan method async (ainvoke).")
+
+    def _pick_client(self, model: str):
+        """Koneksi dengan ask model ini paling sedikit (yang pertama jika seri)"""
+        return min(self.clients, key=lambda client: client.load(model))
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs
+    ) -> str:
+        model = kwargs.get("model") or self.model
+        start_time = time.time()
+        input_tokens = estimate_tokens(prompt)
+        logger.info(f"📤 [LABS INPUT - {model}] {len(prompt)} chars | ~{input_tokens} tokens")
+
+        client = self._pick_client(model)
+        try:
+            resp = await client.ask(prompt, model=model, history=client.conversation(max_turns=1), timeout=self.timeout)
+            result = resp["output"]
+        except asyncio.TimeoutError as e:
+            self.model_errors[model] = self.model_errors.get(model, 0) + 1
+            logger.error(f"❌ Labs timeout ({model}, {self.timeout}s)")
+            raise LLMTimeoutError(f"No answer within {self.timeout}s", provider="labs") from e
+        except Exception as e:
+            elapsed = time.time() - start_time
+            self.model_errors[model] = self.model_errors.get(model, 0) + 1
+            logger.error(f"❌ Labs API error ({model}, {elapsed:.2f}s): {e!r}")
+            raise LLMProviderError(str(e) or type(e).__name__, provider="labs") from e
+
+        elapsed = time.time() - start_time
+        self.model_latency.setdefault(model, LatencyTracker()).record(elapsed)
+
+        # Labs tidak punya parameter stop → potong stop sequence di sini
+        for token in stop or []:
+            result = result.split(token, 1)[0]
+
+        output_tokens = estimate_tokens(result)
+        # Labs tidak mengirim usage → pakai tokenizer lokal
+        record_usage("labs", input_tokens, output_tokens, source="estimate")
+        logger.info(f"📥 [LABS OUTPUT - {model}] {len(result)} chars | ~{output_tokens} tokens | {elapsed:.2f}s")
+
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency per model Labs"""
+        models = set(self.model_latency) | set(self.model_errors)
+        return {
+            "provider": "labs",
+            "model": self.model,
+            "models": {
+                model: {
+                    "errors": self.model_errors.get(model, 0),
+                    "latency_s": self.model_latency[model].summary() if model in self.model_latency else None,
+                }
+                for model in sorted(models)
+            },
+        }
@@ -8,22 +8,38 @@ from typing import Any, Optional, List
 from langchain_core.language_models.llms import LLM
 from langchain_core.callbacks.manager import CallbackManagerForLLMRun
 
+from core.errors import LLMProviderError
+from core.token_usage import record_usage
 from core.utils import estimate_tokens, extract_answer_from_response
+from perplexity_async import PoolExhaustedError, is_quota_error
 
 logger = logging.getLogger(__name__)
 
 
 class PerplexityCustomLLM(LLM):
-    """LangChain wrapper for Perplexity API with auto-fallback"""
+    """
+    LangChain wrapper for Perplexity API with auto-fallback
+    client: perplexity_async.Client (satu akun) atau ClientPool (banyak akun)
+    """
     client: Any = None
-    use_pro_mode: bool = True  # Track if pro mode is available
+    use_pro_mode: bool = True  # Coba pro mode selama kuota tersedia
+    search_timeout: Optional[float] = 60.0  # Batas waktu per search (detik)
+    pro_reprobe_seconds: float = 600.0  # Client tunggal: coba pro lagi setelah kuota habis
+    pro_retry_at: float = 0.0
     
     def __init__(self, client, **kwargs):
         super().__init__(**kwargs)
         self.client = client
-        self.use_pro_mode = True
         logger.info("✅ PerplexityCustomLLM initialized")
     
+    def _pro_available(self) -> bool:
+        """Pool: kuota dicek per akun; Client tunggal: pro diblok sementara setelah kuota habis"""
+        if not self.use_pro_mode:
+            return False
+        if hasattr(self.client, "pro_available"):
+            return self.client.pro_available()
+        return time.monotonic() >= self.pro_retry_at
+    
     @property
     def _llm_type(self) -> str:
         return "perplexity_custom_auto"
@@ -62,7 +78,8 @@ class PerplexityCustomLLM(LLM):
         logger.debug(f"📝 Prompt preview: {prompt[:200]}...")
         
         # Try Pro mode first if still available
-        if self.use_pro_mode:
+        pro_attempted = self._pro_available()
+        if pro_attempted:
             try:
                 logger.debug("🔷 Attempting Pro mode (grok-4)...")
                 resp = await self.client.search(
@@ -72,38 +89,30 @@ class PerplexityCustomLLM(LLM):
                     sources=['web'],
                     stream=False,
                     follow_up=None,
-                    incognito=True
+                    incognito=True,
+                    timeout=self.search_timeout
                 )
                 
-                elapsed = time.time() - start_time
-                result = extract_answer_from_response(resp)
-                output_chars = len(result)
-                output_tokens = estimate_tokens(result)
-                
-                logger.info(f"📥 [LLM OUTPUT - PRO] {output_chars} chars | ~{output_tokens} tokens | {elapsed:.2f}s")
-                logger.debug(f"💬 Answer preview: {result[:150]}...")
-                
-                return result
-            
             except Exception as e:
-                error_msg = str(e).lower()
-                
-                # Check if error is about quota/pro queries
-                if 'enhanced' in error_msg or 'pro' in error_msg or 'quota' in error_msg or 'limit' in error_msg:
+                # Kuota pro habis (semua akun di pool, atau akun tunggal) → auto untuk request ini
+                if isinstance(e, PoolExhaustedError) or is_quota_error(e):
                     logger.warning(f"⚠️ Pro mode quota exhausted: {str(e)}")
-                    logger.info("🔄 Switching to Auto mode permanently for this session")
-                    self.use_pro_mode = False  # Disable pro mode for remaining requests
+                    if not hasattr(self.client, "pro_available"):
+                        self.pro_retry_at = time.monotonic() + self.pro_reprobe_seconds
+                        logger.info(f"🔄 Using Auto mode, re-probing Pro in {self.pro_reprobe_seconds:.0f}s")
                     
                     # Fall through to auto mode below
                 else:
-                    # Other errors, return error message
+                    # Other errors, surface sebagai typed error
                     elapsed = time.time() - start_time
                     logger.error(f"❌ Perplexity API error in Pro mode ({elapsed:.2f}s): {str(e)}")
-                    return f"Error from Perplexity: {str(e)}"
+                    raise LLMProviderError(str(e), provider="perplexity") from e
+            else:
+                return self._finish(resp, "PRO", start_time, input_tokens, stop)
         
         # Use Auto mode (fallback or default after pro exhausted)
         try:
-            mode_label = "AUTO (fallback)" if not self.use_pro_mode else "AUTO"
+            mode_label = "AUTO (fallback)" if self.use_pro_mode else "AUTO"
             logger.debug(f"🔶 Using Auto mode...")
             
             resp = await self.client.search(
@@ -113,20 +122,36 @@ class PerplexityCustomLLM(LLM):
                 sources=['web'],
                 stream=False,
                 follow_up=None,
-                incognito=True
+                incognito=True,
+                timeout=self.search_timeout
             )
-            
-            elapsed = time.time() - start_time
-            result = extract_answer_from_response(resp)
-            output_chars = len(result)
-            output_tokens = estimate_tokens(result)
-            
-            logger.info(f"📥 [LLM OUTPUT - {mode_label}] {output_chars} chars | ~{output_tokens} tokens | {elapsed:.2f}s")
-            logger.debug(f"💬 Answer preview: {result[:150]}...")
-            
-            return result
         
         except Exception as e:
             elapsed = time.time() - start_time
             logger.error(f"❌ Perplexity API error in Auto mode ({elapsed:.2f}s): {str(e)}")
-            return f"Error from Perplexity: {str(e)}"
+            raise LLMProviderError(str(e), provider="perplexity") from e
+
+        return self._finish(resp, mode_label, start_time, input_tokens, stop)
+
+    def _finish(self, resp, mode_label: str, start_time: float, input_tokens: int, stop: Optional[List[str]] = None) -> str:
+        """Extract jawaban + log output (raise LLMProviderError jika response tidak valid)"""
+        elapsed = time.time() - start_time
+        try:
+            result = extract_answer_from_response(resp)
+        except ValueError as e:
+            logger.error(f"❌ Invalid Perplexity response ({elapsed:.2f}s): {e}")
+            raise LLMProviderError(str(e), provider="perplexity") from e
+
+        # Perplexity web tidak punya parameter stop/max_tokens → potong stop sequence di sini
+        for token in stop or []:
+            result = result.split(token, 1)[0]
+
+        output_chars = len(result)
+        output_tokens = estimate_tokens(result)
+        # Perplexity web tidak mengirim usage → pakai tokenizer lokal
+        record_usage("perplexity", input_tokens, output_tokens, source="estimate")
+        
+        logger.info(f"📥 [LLM OUTPUT - {mode_label}] {output_chars} chars | ~{output_tokens} tokens | {elapsed:.2f}s")
+        logger.debug(f"💬 Answer preview: {result[:150]}...")
+        
+        return result
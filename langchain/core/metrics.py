@@ -0,0 +1,95 @@
+"""
+Latency metrics helpers - percentile summary untuk monitoring & benchmark
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Iterable, List
+
+
+def percentile(values: Iterable[float], pct: float) -> float:
+    """Percentile dengan interpolasi linear (pct: 0-100)"""
+    data = sorted(values)
+    if not data:
+        return 0.0
+    if len(data) == 1:
+        return data[0]
+    rank = (len(data) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(data) - 1)
+    return data[lower] + (data[upper] - data[lower]) * (rank - lower)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Ringkasan count/mean/p50/p95/p99"""
+    if not values:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+    }
+
+
+class LatencyTracker:
+    """Simpan N sampel latency terakhir (detik) secara thread-safe"""
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.total += 1
+
+    def percentile(self, pct: float) -> float:
+        with self._lock:
+            samples = list(self._samples)
+        return percentile(samples, pct)
+
+    def samples(self) -> List[float]:
+        with self._lock:
+            return list(self._samples)
+
+    def summary(self) -> Dict[str, float]:
+        return summarize(self.samples())
+
+
+class SpeculationStats:
+    """Hit rate spekulasi + latency yang dihemat (hanya untuk hit)"""
+
+    def __init__(self, window: int = 500):
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.saved = LatencyTracker(window)
+        self._lock = threading.Lock()
+
+    def record_hit(self, saved_seconds: float):
+        with self._lock:
+            self.hits += 1
+        self.saved.record(saved_seconds)
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def record_skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def summary(self) -> Dict[str, float]:
+        speculated = self.hits + self.misses
+        saved = self.saved.summary()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round(self.hits / speculated, 3) if speculated else 0.0,
+            "latency_saved_p50_s": saved["p50"],
+            "latency_saved_p95_s": saved["p95"],
+        }
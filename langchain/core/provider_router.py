@@ -0,0 +1,240 @@
+"""
+Provider router - failover antar backend LLM dengan circuit breaker per provider
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.language_models.llms import LLM
+
+from core.deadline import step_timed_out
+from core.errors import CircuitOpenError, LLMError, LLMProviderError, LLMUnavailableError
+from core.metrics import LatencyTracker
+from core.token_usage import prefix_cache_stats
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker berbasis sliding window
+    - closed → open: error rate atau slow-call rate melewati threshold
+    - open → half_open: setelah open_seconds, izinkan beberapa probe request
+    - half_open → closed: semua probe sukses; → open lagi jika probe gagal
+    - Request yang di-cancel karena step timeout (run_with_deadline) dihitung gagal;
+      cancel lain (speculation miss, disconnect, hedge) hanya melepas slot probe
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        self.latency = LatencyTracker()
+        # Outcome per call: (failed, slow)
+        self._outcomes = deque(maxlen=window)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """True jika request boleh dikirim ke provider ini"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.time() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self._transition(HALF_OPEN)
+
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self.rejected += 1
+                    return False
+                self._probes_in_flight += 1
+
+            return True
+
+    def record_success(self, seconds: float):
+        self.latency.record(seconds)
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if slow:
+                    self._transition(OPEN)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._transition(CLOSED)
+                return
+            self._outcomes.append((False, slow))
+            self._evaluate()
+
+    def release(self):
+        """Request dibatalkan sebelum selesai (mis. hedge/cancel) - lepas slot probe"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def record_cancelled(self, timed_out: bool, seconds: float):
+        """
+        Request di-cancel dari luar
+        - Step timeout → provider tidak menjawab dalam budget, hitung gagal
+        - Cancel lain (speculation miss, disconnect) → bukan salah provider, lepas slot probe
+        """
+        if timed_out:
+            logger.warning(f"⏱️ [BREAKER] {self.name} step timeout after {seconds:.1f}s, counted as failure")
+            self.record_failure()
+        else:
+            self.release()
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                self._transition(OPEN)
+                return
+            self._outcomes.append((True, False))
+            self._evaluate()
+
+    def _evaluate(self):
+        if self.state != CLOSED or len(self._outcomes) < self.min_calls:
+            return
+        total = len(self._outcomes)
+        error_rate = sum(1 for failed, _ in self._outcomes if failed) / total
+        slow_rate = sum(1 for _, slow in self._outcomes if slow) / total
+        if error_rate >= self.error_rate_threshold or slow_rate >= self.slow_rate_threshold:
+            logger.warning(
+                f"🔴 [BREAKER] {self.name} tripped (error rate {error_rate:.0%}, slow rate {slow_rate:.0%})"
+            )
+            self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if state == self.state:
+            return
+        logger.info(f"⚡ [BREAKER] {self.name}: {self.state} → {state}")
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.time()
+            self.times_opened += 1
+        elif state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        elif state == CLOSED:
+            self._outcomes.clear()
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot state breaker untuk endpoint status"""
+        with self._lock:
+            total = len(self._outcomes)
+            failed = sum(1 for f, _ in self._outcomes if f)
+            slow = sum(1 for _, s in self._outcomes if s)
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(self.open_seconds - (time.time() - self.opened_at), 0.0), 1)
+            return {
+                "state": self.state,
+                "window_calls": total,
+                "error_rate": round(failed / total, 3) if total else 0.0,
+                "slow_rate": round(slow / total, 3) if total else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "retry_in_s": retry_in,
+                "latency_s": self.latency.summary(),
+            }
+
+
+class ProviderRouterLLM(LLM):
+    """
+    Kirim request ke provider sehat pertama (urutan = prioritas)
+    Provider yang gagal dilewati ke provider berikutnya; jika semua gagal/open,
+    raise LLMUnavailableError
+    """
+    providers: List[Any] = []
+    breakers: Dict[str, Any] = {}
+    failovers: int = 0
+
+    def __init__(self, providers: List[Tuple[str, Any]], **breaker_kwargs):
+        super().__init__()
+        self.providers = list(providers)
+        self.breakers = {name: CircuitBreaker(name, **breaker_kwargs) for name, _ in providers}
+        names = " → ".join(name for name, _ in providers)
+        logger.info(f"✅ ProviderRouterLLM initialized ({names})")
+
+    @property
+    def _llm_type(self) -> str:
+        return "provider_router"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs) -> str:
+        raise NotImplementedError("Use ainvoke()")
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> str:
+        errors: List[LLMError] = []
+        for index, (name, llm) in enumerate(self.providers):
+            breaker = self.breakers[name]
+            if not breaker.allow_request():
+                errors.append(CircuitOpenError("circuit open", provider=name))
+                continue
+
+            if index > 0:
+                self.failovers += 1
+                logger.info(f"🔀 [ROUTER] Failover to {name}")
+
+            start = time.time()
+            try:
+                result = await llm.ainvoke(prompt, stop=stop, **kwargs)
+            except asyncio.CancelledError:
+                # Hanya step timeout yang tercatat gagal di breaker
+                breaker.record_cancelled(step_timed_out(), time.time() - start)
+                raise
+            except LLMError as e:
+                breaker.record_failure()
+                errors.append(e)
+                logger.warning(f"⚠️ [ROUTER] {name} failed: {e}")
+                continue
+            except Exception as e:
+                breaker.record_failure()
+                errors.append(LLMProviderError(str(e), provider=name))
+                logger.warning(f"⚠️ [ROUTER] {name} failed: {e}")
+                continue
+
+            breaker.record_success(time.time() - start)
+            return result
+
+        summary = "; ".join(str(e) for e in errors)
+        raise LLMUnavailableError(f"No healthy LLM provider ({summary})")
+
+    def stats(self) -> Dict[str, Any]:
+        """State breaker per provider"""
+        return {
+            "strategy": "failover",
+            "failovers": self.failovers,
+            "providers": {name: self.breakers[name].status() for name, _ in self.providers},
+            "prefix_cache": prefix_cache_stats(self.providers),
+        }
@@ -0,0 +1,165 @@
+"""
+Local name → ID resolver untuk CRUD agent (tanpa LLM untuk perintah yang jelas)
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Set, TypedDict
+
+from core.retrieval import NEGATIONS, MenuRetriever, tokenize
+from core.routing import guess_categories
+
+logger = logging.getLogger(__name__)
+
+# Lexicon status: habis/kosong = false, ada/ready/tersedia = true
+STATUS_WORDS = {
+    "habis": False, "abis": False, "kosong": False, "sold": False, "soldout": False, "out": False,
+    "ada": True, "ready": True, "redi": True, "tersedia": True, "available": True, "on": True,
+}
+ALL_WORDS = {"semua", "semuanya", "all"}
+FILLER_WORDS = {"yang", "yg", "udah", "sudah", "lagi", "sekarang", "hari", "ini", "menu", "jadi", "nya", "kak", "min"}
+_SEPARATORS = re.compile(r",|\+|&|\bdan\b|\bsama\b|\bserta\b", re.IGNORECASE)
+
+
+class Resolution(TypedDict):
+    """Hasil resolve lokal"""
+    ids: Optional[List[int]]      # None = butuh LLM
+    status: Optional[bool]
+    candidates: List[int]         # Kandidat item (untuk klarifikasi)
+    reason: str
+
+
+def detect_status(text: str) -> Optional[bool]:
+    """Status target dari lexicon; None jika tidak ada atau bertentangan"""
+    tokens = tokenize(text)
+    found: Set[bool] = set()
+    for i, token in enumerate(tokens):
+        if token not in STATUS_WORDS:
+            continue
+        status = STATUS_WORDS[token]
+        if i > 0 and tokens[i - 1] in NEGATIONS:
+            status = not status
+        found.add(status)
+    return found.pop() if len(found) == 1 else None
+
+
+class MenuResolver:
+    """
+    Resolve perintah seperti "batagor habis" / "semua jumbo ready" secara lokal
+    - Pakai index nama dari MenuRetriever (trigram + idf)
+    - Perintah ambigu ("ikan habis") dikembalikan ke LLM beserta kandidatnya
+    """
+
+    def __init__(self, cache_manager, retriever: Optional[MenuRetriever] = None, min_score: float = 0.75, margin: float = 0.2):
+        self.cache_manager = cache_manager
+        self.retriever = retriever or MenuRetriever(cache_manager)
+        self.min_score = min_score
+        self.margin = margin
+        self.local_resolved = 0
+        self.llm_fallback = 0
+        self.rejected_ids = 0
+        logger.info("✅ MenuResolver initialized")
+
+    def known_ids(self) -> Set[int]:
+        """Semua ID di snapshot cache saat ini"""
+        return set(self.retriever.index.items)
+
+    def validate_ids(self, ids: List[int]) -> List[int]:
+        """Buang ID yang tidak ada di cache (hasil LLM tidak dipercaya mentah-mentah)"""
+        known = self.known_ids()
+        unknown = [i for i in ids if i not in known]
+        if unknown:
+            self.rejected_ids += len(unknown)
+            logger.warning(f"⚠️ [RESOLVER] Rejected {len(unknown)} unknown IDs: {unknown}")
+        return list(dict.fromkeys(i for i in ids if i in known))
+
+    def listing(self, ids: List[int]) -> str:
+        """Listing `id,name` untuk sebagian item (kandidat klarifikasi)"""
+        items = self.retriever.index.items
+        return "\n".join(f"{i},{items[i]['name']}" for i in ids if i in items)
+
+    def resolve(self, command: str, record: bool = True) -> Resolution:
+        """Coba resolve perintah jadi (ids, status) tanpa LLM (record=False: tanpa update stats)"""
+        status = detect_status(command)
+        if status is None:
+            return self._fallback([], "status tidak jelas", record)
+
+        ids: List[int] = []
+        candidates: List[int] = []
+        for segment in _SEPARATORS.split(command):
+            words = [t for t in tokenize(segment) if t not in STATUS_WORDS and t not in NEGATIONS and t not in FILLER_WORDS]
+            if not words:
+                continue
+
+            segment_ids, segment_candidates = self._resolve_segment(words)
+            candidates.extend(segment_candidates)
+            if segment_ids is None:
+                return self._fallback(candidates, f"'{' '.join(words)}' ambigu", record)
+            ids.extend(segment_ids)
+
+        if not ids:
+            return self._fallback(candidates, "item tidak ditemukan", record)
+
+        if record:
+            self.local_resolved += 1
+        return {"ids": list(dict.fromkeys(ids)), "status": status, "candidates": candidates, "reason": "local"}
+
+    def _resolve_segment(self, words: List[str]):
+        """Resolve satu potongan perintah → (ids | None, kandidat)"""
+        index = self.retriever.index
+        wants_all = any(w in ALL_WORDS for w in words)
+        words = [w for w in words if w not in ALL_WORDS]
+
+        if wants_all and not words:
+            return sorted(index.items), []
+
+        # Item yang namanya memuat setiap kata
+        covering = [
+            item_id for item_id, tokens in index.item_tokens.items()
+            if all(any(index.match_token(w, 0.8).get(t) for t in tokens) for w in words)
+        ]
+
+        if wants_all:
+            # "semua jumbo" → semua item yang cocok, asal masih dalam satu kategori
+            matched = covering
+            if not matched:
+                categories = [c for c in guess_categories(" ".join(words)) if c != "all"]
+                matched = [item["id"] for c in categories for item in self.cache_manager.get_category_data(c)]
+            if len({index.items[i]["category"] for i in matched}) > 1:
+                return None, sorted(matched)
+            return (sorted(matched) or None), sorted(matched)
+
+        if len(covering) == 1:
+            return covering, covering
+
+        # Nama item persis sama dengan kata-kata perintah ("ikan goreng" vs "paket hemat ikan goreng")
+        exact = [i for i in covering if len(index.item_tokens[i]) == len(set(words))]
+        if len(exact) == 1:
+            return exact, sorted(covering)
+
+        scored = index.search(" ".join(words))
+        if not scored:
+            return None, []
+
+        top_score = scored[0][0]
+        candidates = [item["id"] for score, item in scored if score >= top_score * 0.5][:10]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if not covering and top_score >= self.min_score and top_score - runner_up >= self.margin:
+            return [scored[0][1]["id"]], candidates
+        return None, sorted(covering) or candidates
+
+    def _fallback(self, candidates: List[int], reason: str, record: bool = True) -> Resolution:
+        if record:
+            self.llm_fallback += 1
+            logger.info(f"🤔 [RESOLVER] Fallback to LLM: {reason}")
+        return {"ids": None, "status": None, "candidates": list(dict.fromkeys(candidates)), "reason": reason}
+
+    def stats(self) -> Dict[str, float]:
+        """Statistik resolver untuk endpoint monitoring"""
+        total = self.local_resolved + self.llm_fallback
+        return {
+            "local_resolved": self.local_resolved,
+            "llm_fallback": self.llm_fallback,
+            "local_rate": round(self.local_resolved / total, 3) if total else 0.0,
+            "rejected_ids": self.rejected_ids,
+        }
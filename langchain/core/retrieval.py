@@ -0,0 +1,215 @@
+"""
+Local lexical/fuzzy retrieval - pilih item yang disebut di pertanyaan untuk memperkecil prompt answer
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.routing import PHRASES, SLANG
+from core.utils import category_to_toon
+
+logger = logging.getLogger(__name__)
+
+# Penanda pertanyaan "lihat-lihat" yang butuh kategori penuh
+BROWSE_MARKERS = [
+    "menu", "semua", "semuanya", "apa aja", "apa saja", "daftar", "list", "pilihan",
+    "rekomendasi", "rekomen", "saran", "yang ada", "lengkap", "all", "macam", "jenis",
+]
+
+# Kata negasi: "ayam yang ga pedas" tidak bisa dijawab dari item yang cocok saja
+NEGATIONS = {"tidak", "gak", "ga", "nggak", "enggak", "belum", "blm", "gk", "tdk", "not"}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Token gabungan (nasgor, esteh) dipecah lagi supaya cocok dengan nama item
+_EXPANSIONS: Dict[str, List[str]] = {}
+for _phrase, _joined in PHRASES.items():
+    _EXPANSIONS.setdefault(_joined, _phrase.split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase token + normalisasi slang/typo"""
+    tokens = []
+    for token in _WORD.findall(text.lower().replace("_", " ")):
+        token = SLANG.get(token, token)
+        if token in _EXPANSIONS:
+            tokens.extend(_EXPANSIONS[token])
+        elif token:
+            tokens.append(token)
+    return tokens
+
+
+def trigrams(token: str) -> Set[str]:
+    """Character trigram dengan padding"""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_browse_query(question: str) -> bool:
+    """True jika user ingin melihat daftar/kategori, bukan item spesifik"""
+    text = " ".join(tokenize(question))
+    return any(re.search(rf"\b{re.escape(marker)}\b", text) for marker in BROWSE_MARKERS)
+
+
+class NameIndex:
+    """Index token + trigram atas nama item menu (dibangun per snapshot)"""
+
+    def __init__(self, items: List[dict]):
+        self.items = {item["id"]: item for item in items}
+        self.position = {item["id"]: index for index, item in enumerate(items)}
+        self.item_tokens: Dict[int, List[str]] = {}
+        self.token_trigrams: Dict[str, Set[str]] = {}
+        self.trigram_tokens: Dict[str, Set[str]] = defaultdict(set)
+        df: Counter = Counter()
+
+        for item in items:
+            tokens = list(dict.fromkeys(tokenize(item["name"])))
+            self.item_tokens[item["id"]] = tokens
+            df.update(tokens)
+            for token in tokens:
+                if token not in self.token_trigrams:
+                    grams = trigrams(token)
+                    self.token_trigrams[token] = grams
+                    for gram in grams:
+                        self.trigram_tokens[gram].add(token)
+
+        total = max(len(items), 1)
+        self.idf = {token: math.log(1 + total / count) for token, count in df.items()}
+
+    def match_token(self, query_token: str, min_similarity: float = 0.45) -> Dict[str, float]:
+        """Token nama yang mirip dengan query_token → similarity (1.0 = exact)"""
+        if query_token in self.token_trigrams:
+            return {query_token: 1.0}
+
+        grams = trigrams(query_token)
+        candidates: Set[str] = set()
+        for gram in grams:
+            candidates |= self.trigram_tokens.get(gram, set())
+
+        matches = {}
+        for token in candidates:
+            other = self.token_trigrams[token]
+            similarity = len(grams & other) / len(grams | other)
+            if similarity >= min_similarity:
+                matches[token] = similarity
+        return matches
+
+    def search(self, text: str) -> List[Tuple[float, dict]]:
+        """Skor semua item terhadap text, urut dari yang paling relevan"""
+        best: Dict[str, float] = {}
+        for query_token in tokenize(text):
+            for token, similarity in self.match_token(query_token).items():
+                best[token] = max(best.get(token, 0.0), similarity)
+
+        if not best:
+            return []
+
+        scored = []
+        for item_id, tokens in self.item_tokens.items():
+            if not tokens:
+                continue
+            weight = sum(self.idf[t] for t in tokens)
+            matched = sum(self.idf[t] * best.get(t, 0.0) for t in tokens)
+            if matched:
+                scored.append((matched / weight, self.items[item_id]))
+
+        scored.sort(key=lambda pair: (-pair[0], pair[1]["id"]))
+        return scored
+
+
+class MenuRetriever:
+    """
+    Retrieval item yang disebut di pertanyaan, di dalam kategori hasil routing
+    - Index dibangun ulang hanya saat snapshot menu berubah
+    - Skor = jumlah kata query yang cocok dengan nama item (nama panjang tidak dirugikan)
+    - top_k: batas jumlah item (urut relevansi) supaya prompt tetap kecil; None = tanpa batas
+    - Tidak yakin (tidak ada kata spesifik / ada negasi) → list kosong = kategori penuh
+    """
+
+    def __init__(self, cache_manager, top_k: Optional[int] = 12, min_similarity: float = 0.6, generic_ratio: float = 0.5):
+        self.cache_manager = cache_manager
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.generic_ratio = generic_ratio
+        self._index: Optional[NameIndex] = None
+        self._index_version = -1
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retrieved = 0
+        self.tokens_saved = 0
+        logger.info(f"✅ MenuRetriever initialized (top_k: {top_k}, min_similarity: {min_similarity})")
+
+    @property
+    def index(self) -> NameIndex:
+        """Index nama item untuk snapshot menu saat ini"""
+        with self._lock:
+            if self._index_version != self.cache_manager.version:
+                items = [item for items in self.cache_manager.get_menu_data().values() for item in items]
+                self._index = NameIndex(items)
+                self._index_version = self.cache_manager.version
+            return self._index
+
+    def retrieve(self, question: str, categories: Optional[List[str]] = None) -> List[dict]:
+        """
+        Item yang disebut di pertanyaan (list kosong = tidak cukup yakin, pakai kategori penuh)
+        categories: hasil routing; None / "all" = seluruh menu
+        """
+        index = self.index
+        scope = None if not categories or "all" in categories else set(categories)
+        candidates = [item_id for item_id, item in index.items.items() if scope is None or item["category"] in scope]
+        if not candidates:
+            return []
+
+        hits: Counter = Counter()
+        tokens = tokenize(question)
+        for i, query_token in enumerate(tokens):
+            if len(query_token) < 2 or query_token in NEGATIONS:
+                continue
+            similar = index.match_token(query_token, self.min_similarity)
+            if not similar:
+                continue
+            matched = [item_id for item_id in candidates if any(t in similar for t in index.item_tokens[item_id])]
+            if not matched:
+                continue
+            if i > 0 and tokens[i - 1] in NEGATIONS:
+                # "yang ga pedas" → jawabannya justru item yang TIDAK cocok
+                return []
+            if len(matched) > len(candidates) * self.generic_ratio:
+                # Kata umum di scope ini ("ayam" di protein_ayam) tidak mempersempit apa-apa
+                continue
+            hits.update(matched)
+
+        if not hits:
+            return []
+
+        ranked = sorted(hits, key=lambda item_id: (-hits[item_id], index.position[item_id]))
+        return [index.items[item_id] for item_id in ranked[:self.top_k]]
+
+    def render(self, items: List[dict]) -> str:
+        """TOON dari item terpilih, dikelompokkan per kategori (urutan menu, bukan urutan skor)"""
+        position = self.index.position
+        grouped: Dict[str, List[dict]] = {}
+        for item in sorted(items, key=lambda item: position.get(item["id"], 0)):
+            grouped.setdefault(item["category"], []).append(item)
+        # Header [N] = jumlah baris yang benar-benar dikirim
+        return "\n".join(category_to_toon(category, rows) for category, rows in grouped.items())
+
+    def record(self, retrieved: bool, tokens_saved: int):
+        self.requests += 1
+        if retrieved:
+            self.retrieved += 1
+            self.tokens_saved += tokens_saved
+
+    def stats(self) -> Dict[str, float]:
+        """Statistik retrieval untuk endpoint monitoring"""
+        return {
+            "requests": self.requests,
+            "retrieved": self.retrieved,
+            "retrieval_rate": round(self.retrieved / self.requests, 3) if self.requests else 0.0,
+            "tokens_saved_total": self.tokens_saved,
+            "tokens_saved_avg": round(self.tokens_saved / self.retrieved, 1) if self.retrieved else 0.0,
+        }
@@ -0,0 +1,166 @@
+"""
+Routing helpers - query normalization and routing decision cache
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+VALID_CATEGORIES = [
+    "protein_ayam", "ati_ampela", "protein_ikan", "protein_ringan",
+    "karbo", "paket_hemat", "menu_kuah", "jajanan", "minum_cold", "minum_hot", "all"
+]
+
+# Frasa multi-kata yang disatukan jadi satu token sebelum tokenisasi
+PHRASES = {
+    "es teh": "esteh",
+    "ice tea": "esteh",
+    "iced tea": "esteh",
+    "teh es": "esteh",
+    "es jeruk": "esjeruk",
+    "nasi goreng": "nasgor",
+    "nasi uduk": "nasduk",
+    "ati ampela": "atiampela",
+    "paket hemat": "paket",
+}
+
+# Slang & typo umum → bentuk baku
+SLANG = {
+    "gprek": "geprek", "geprk": "geprek", "gepreg": "geprek", "geprak": "geprek",
+    "ayem": "ayam", "aym": "ayam", "ayang": "ayam",
+    "crispi": "crispy", "krispi": "crispy", "krispy": "crispy",
+    "jumbo2": "jumbo", "jmbo": "jumbo",
+    "ikn": "ikan", "iwak": "ikan",
+    "nasgoreng": "nasgor", "nasgr": "nasgor",
+    "tehes": "esteh", "estea": "esteh", "estee": "esteh",
+    "tahuu": "tahu", "tempeh": "tempe", "telor": "telur", "tlr": "telur",
+    "minuman": "minum", "mnm": "minum", "mimum": "minum",
+    "sotoo": "soto", "kwetiau": "kwetiaw", "kwetiauw": "kwetiaw",
+    "empek": "pempek", "mpek": "pempek",
+    "donut": "donat", "macaroni": "makaroni",
+    "semuanya": "semua", "smua": "semua", "smw": "semua",
+}
+
+# Kata pengisi yang tidak mempengaruhi kategori
+STOPWORDS = {
+    "ada", "apa", "apakah", "aja", "saja", "ya", "yah", "yg", "yang", "kak", "ka", "min",
+    "mas", "mbak", "bang", "dong", "deh", "sih", "nih", "kah", "gak", "ga", "nggak", "tidak",
+    "masih", "udah", "sudah", "berapa", "harga", "harganya", "mau", "pesan", "pesen", "order",
+    "boleh", "bisa", "tolong", "di", "ke", "dan", "atau", "sama", "dengan", "the", "is",
+    "please", "do", "you", "have", "hari", "ini", "sekarang", "tersedia", "ready",
+}
+
+# Kata kunci → kategori (sama dengan MAPPING di prompt routing)
+CATEGORY_KEYWORDS = {
+    "ayam": "protein_ayam", "chicken": "protein_ayam", "geprek": "protein_ayam",
+    "crispy": "protein_ayam", "rica": "protein_ayam", "jumbo": "protein_ayam",
+    "ati": "ati_ampela", "ampela": "ati_ampela", "atiampela": "ati_ampela", "jeroan": "ati_ampela",
+    "ikan": "protein_ikan", "fish": "protein_ikan", "lele": "protein_ikan",
+    "tahu": "protein_ringan", "tempe": "protein_ringan", "telur": "protein_ringan", "egg": "protein_ringan",
+    "nasgor": "karbo", "kwetiaw": "karbo", "pempek": "karbo", "batagor": "karbo",
+    "ketoprak": "karbo", "nasi": "karbo", "nasduk": "karbo",
+    "paket": "paket_hemat",
+    "soto": "menu_kuah", "sop": "menu_kuah", "kuah": "menu_kuah",
+    "makaroni": "jajanan", "donat": "jajanan", "piscok": "jajanan",
+    "esteh": "minum_cold", "esjeruk": "minum_cold", "dingin": "minum_cold",
+    "cold": "minum_cold", "es": "minum_cold", "ice": "minum_cold",
+    "hangat": "minum_hot", "hot": "minum_hot", "panas": "minum_hot",
+}
+
+_EMOJI_AND_PUNCT = re.compile(r"[^\w\s]|_", re.UNICODE)
+_REPEATED_CHARS = re.compile(r"(.)\1{2,}")
+_REDUPLICATION = re.compile(r"\b(\w+)2\b")
+
+
+def normalize_query(text: str) -> str:
+    """Normalize question jadi cache key: lowercase, tanpa tanda baca/emoji, slang baku, token diurutkan"""
+    text = text.lower()
+    text = _EMOJI_AND_PUNCT.sub(" ", text)
+    text = _REPEATED_CHARS.sub(r"\1\1", text)
+    text = _REDUPLICATION.sub(r"\1", text)
+    text = " ".join(text.split())
+
+    for phrase, replacement in PHRASES.items():
+        text = re.sub(rf"\b{phrase}\b", replacement, text)
+
+    tokens = set()
+    for token in text.split():
+        token = SLANG.get(token, token)
+        if token and token not in STOPWORDS:
+            tokens.add(token)
+
+    return " ".join(sorted(tokens))
+
+
+def guess_categories(question: str) -> List[str]:
+    """Tebakan kategori lokal dari kata kunci (tanpa LLM), [] jika tidak ada yang cocok"""
+    tokens = normalize_query(question).split()
+    if "menu" in tokens or tokens == ["semua"]:
+        return ["all"]
+
+    categories = []
+    for token in tokens:
+        category = CATEGORY_KEYWORDS.get(token)
+        if category and category not in categories:
+            categories.append(category)
+    return categories
+
+
+class RoutingCache:
+    """
+    Cache hasil routing (question → categories)
+    - Key = normalize_query(question), jadi banyak variasi kalimat berbagi satu entry
+    - Tidak bergantung availability, jadi tidak perlu di-invalidate saat menu berubah
+    """
+
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        logger.info(f"✅ RoutingCache initialized (max_size: {max_size})")
+
+    def get(self, question: str) -> Optional[List[str]]:
+        """Ambil categories dari cache, None jika miss"""
+        key = normalize_query(question)
+        with self._lock:
+            categories = self._entries.get(key)
+            if categories is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        logger.info(f"⚡ [ROUTE-CACHE] HIT '{key}' → {categories}")
+        return list(categories)
+
+    def set(self, question: str, categories: List[str]):
+        """Simpan hasil routing yang valid"""
+        key = normalize_query(question)
+        if not key:
+            return
+        with self._lock:
+            self._entries[key] = list(categories)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Kosongkan cache (mis. setelah prompt routing berubah)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Statistik cache untuk endpoint monitoring"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,105 @@
+"""
+Clarification session store - simpan klarifikasi CRUD yang tertunda per session id
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ClarificationStore:
+    """
+    In-memory store dengan TTL, opsional persist ke file JSON
+    - save() saat extract_ids minta klarifikasi
+    - pop() saat jawaban owner masuk, supaya graph lanjut langsung ke extract
+    """
+
+    def __init__(self, ttl_seconds: int = 600, persist_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.saved = 0
+        self.resumed = 0
+        self.expired = 0
+        self._load()
+        logger.info(f"✅ ClarificationStore initialized (ttl: {ttl_seconds}s, persist: {self.persist_path or 'memory only'})")
+
+    def save(self, session_id: str, data: Dict[str, Any]):
+        """Simpan klarifikasi tertunda (menimpa yang lama untuk session yang sama)"""
+        with self._lock:
+            self._sessions[session_id] = {**data, "expires_at": time.time() + self.ttl_seconds}
+            self.saved += 1
+            self._persist()
+        logger.info(f"💾 [SESSION] Pending clarification saved for '{session_id}'")
+
+    def has_pending(self, session_id: Optional[str]) -> bool:
+        """True jika session punya klarifikasi yang belum expired"""
+        if not session_id:
+            return False
+        with self._lock:
+            self._evict_expired()
+            return session_id in self._sessions
+
+    def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Ambil dan hapus klarifikasi tertunda (None jika tidak ada/expired)"""
+        with self._lock:
+            self._evict_expired()
+            data = self._sessions.pop(session_id, None)
+            if data is not None:
+                self.resumed += 1
+                self._persist()
+        return data
+
+    def discard(self, session_id: str):
+        """Batalkan klarifikasi tertunda"""
+        with self._lock:
+            if self._sessions.pop(session_id, None) is not None:
+                self._persist()
+
+    def stats(self) -> Dict[str, int]:
+        """Statistik session untuk endpoint monitoring"""
+        with self._lock:
+            self._evict_expired()
+            return {
+                "pending": len(self._sessions),
+                "saved": self.saved,
+                "resumed": self.resumed,
+                "expired": self.expired,
+            }
+
+    def _evict_expired(self):
+        now = time.time()
+        expired = [sid for sid, data in self._sessions.items() if data["expires_at"] <= now]
+        for sid in expired:
+            del self._sessions[sid]
+        if expired:
+            self.expired += len(expired)
+            self._persist()
+
+    def _persist(self):
+        if not self.persist_path:
+            return
+        try:
+            tmp_path = self.persist_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._sessions, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logger.warning(f"⚠️ [SESSION] Failed to persist sessions: {e}")
+
+    def _load(self):
+        if not self.persist_path or not self.persist_path.exists():
+            return
+        try:
+            self._sessions = json.loads(self.persist_path.read_text(encoding="utf-8"))
+            self._evict_expired()
+            logger.info(f"📂 [SESSION] Loaded {len(self._sessions)} pending sessions from disk")
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️ [SESSION] Failed to load sessions: {e}")
+            self._sessions = {}
@@ -0,0 +1,111 @@
+"""
+Structured output - parameter generate per node (JSON mode, max_tokens) dan
+parser untuk output routing / extract, dengan counter parse failure & fallback
+"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List
+
+# Parameter generate per node, di-bind ke LLM (llm.bind(**...)).
+# response_format hanya dipakai DeepSeek; provider lain mengabaikannya,
+# jadi prompt tetap harus meminta JSON secara eksplisit.
+JSON_MODE = {"type": "json_object"}
+ROUTE_GENERATION = {"max_tokens": 64, "response_format": JSON_MODE}
+EXTRACT_GENERATION = {"max_tokens": 128, "response_format": JSON_MODE}
+ANSWER_GENERATION = {"max_tokens": 1500}
+
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_LEGACY_EXTRACT = re.compile(r"(\d+(?:\s*,\s*\d+)*)\s*,\s*(true|false)", re.IGNORECASE)
+
+
+def parse_json_output(text: str) -> Any:
+    """
+    json.loads toleran: buang markdown fence dan teks di luar object/array
+    Raise ValueError jika tidak ada JSON valid
+    """
+    cleaned = _FENCE.sub("", text.strip()).strip()
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        pass
+
+    starts = [i for i in (cleaned.find("{"), cleaned.find("[")) if i != -1]
+    if not starts:
+        raise ValueError(f"No JSON in output: {text[:100]!r}")
+    start = min(starts)
+    end = cleaned.rfind("}" if cleaned[start] == "{" else "]")
+    try:
+        return json.loads(cleaned[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON output: {e}") from e
+
+
+def parse_route_output(text: str) -> List[str]:
+    """Output routing: {"categories": [...]} (JSON mode) atau array polos"""
+    data = parse_json_output(text)
+    if isinstance(data, dict):
+        data = data.get("categories")
+    if not isinstance(data, list) or not all(isinstance(c, str) for c in data):
+        raise ValueError(f"Expected list of categories, got: {text[:100]!r}")
+    return data
+
+
+def parse_extract_output(text: str) -> Dict[str, Any]:
+    """
+    Output extract: {"ids": [..], "available": bool} atau {"clarify": "..."}
+    Format lama ("1,2,false" / "CLARIFY:...") masih diterima untuk provider tanpa JSON mode
+    """
+    stripped = text.strip()
+    if stripped.startswith("CLARIFY:"):
+        return {"clarify": stripped[len("CLARIFY:"):].strip()}
+
+    try:
+        data = parse_json_output(stripped)
+    except ValueError:
+        match = _LEGACY_EXTRACT.search(stripped)
+        if not match:
+            raise
+        ids_str, status_str = match.groups()
+        return {"ids": [int(x) for x in ids_str.split(",")], "available": status_str.lower() == "true"}
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected JSON object, got: {text[:100]!r}")
+    if data.get("clarify"):
+        return {"clarify": str(data["clarify"]).strip()}
+
+    ids, available = data.get("ids"), data.get("available")
+    if not isinstance(ids, list) or not isinstance(available, bool):
+        raise ValueError(f"Missing ids/available: {text[:100]!r}")
+    try:
+        return {"ids": [int(x) for x in ids], "available": available}
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid ids: {ids!r}") from e
+
+
+class StructuredOutputStats:
+    """Per node: output valid, parse gagal, dan fallback (mis. routing → ["all"])"""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, node: str, parsed: bool, fallback: bool = False):
+        with self._lock:
+            counts = self._counts.setdefault(node, {"calls": 0, "parse_failures": 0, "fallbacks": 0})
+            counts["calls"] += 1
+            if not parsed:
+                counts["parse_failures"] += 1
+            if fallback:
+                counts["fallbacks"] += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                node: {
+                    **counts,
+                    "parse_failure_rate": round(counts["parse_failures"] / counts["calls"], 3) if counts["calls"] else 0.0,
+                }
+                for node, counts in self._counts.items()
+            }
@@ -0,0 +1,168 @@
+"""
+Token accounting per request - usage dari provider (atau estimasi lokal),
+dibawa lewat state LangGraph dan diagregasi per endpoint / node / provider
+"""
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Harga USD per 1M token (sesuaikan dengan pricing provider terbaru)
+PRICES_PER_1M = {
+    "deepseek": {"input": 0.28, "input_cache_hit": 0.028, "output": 0.42},
+    "perplexity": {"input": 0.0, "output": 0.0},  # Akun web (cookies), tidak ditagih per token
+    "labs": {"input": 0.0, "output": 0.0},  # Perplexity Labs (anonim), gratis
+}
+
+_current_scope: ContextVar[Optional["UsageScope"]] = ContextVar("token_usage_scope", default=None)
+
+
+class UsageScope:
+    """Kumpulan usage LLM untuk satu node (ikut ke task anak lewat contextvars)"""
+
+    def __init__(self, node: str):
+        self.node = node
+        self.entries: List[Dict[str, Any]] = []
+
+    def add(self, provider: str, prompt_tokens: int, completion_tokens: int, source: str, **extra):
+        self.entries.append({
+            "node": self.node,
+            "provider": provider,
+            "prompt_tokens": int(prompt_tokens),
+            "completion_tokens": int(completion_tokens),
+            "source": source,
+            **extra,
+        })
+
+    def state(self) -> Dict[str, Any]:
+        """Update state LangGraph (field di-reduce dengan operator.add)"""
+        return {
+            "token_usage": list(self.entries),
+            "llm_input_tokens": sum(e["prompt_tokens"] for e in self.entries),
+            "llm_output_tokens": sum(e["completion_tokens"] for e in self.entries),
+        }
+
+
+@contextmanager
+def track_usage(node: str):
+    """Catat semua record_usage() yang terjadi di dalam blok ini atas nama `node`"""
+    scope = UsageScope(node)
+    token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(token)
+
+
+def tracked_usage(node: str):
+    """Decorator node async: jalankan di dalam track_usage lalu gabungkan usage ke update state"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track_usage(node) as scope:
+                update = await func(*args, **kwargs)
+            return {**update, **scope.state()}
+        return wrapper
+    return decorator
+
+
+def record_usage(provider: str, prompt_tokens: int, completion_tokens: int, source: str = "provider", **extra):
+    """
+    Dipanggil oleh wrapper LLM setelah call sukses
+    source: "provider" (usage dari API) atau "estimate" (tokenizer lokal)
+    """
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.add(provider, prompt_tokens, completion_tokens, source, **extra)
+
+
+def combine_usage(*updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Gabungkan usage beberapa sub-step dalam satu node (mis. speculate = route + answer)"""
+    entries = [entry for update in updates for entry in update.get("token_usage", [])]
+    return {
+        "token_usage": entries,
+        "llm_input_tokens": sum(e["prompt_tokens"] for e in entries),
+        "llm_output_tokens": sum(e["completion_tokens"] for e in entries),
+    }
+
+
+def usage_cost(provider: str, prompt_tokens: int, completion_tokens: int, cache_hit_tokens: int = 0) -> float:
+    """Estimasi biaya USD; token prompt yang kena prefix cache pakai harga cache hit"""
+    prices = PRICES_PER_1M.get(provider, {"input": 0.0, "output": 0.0})
+    hit_price = prices.get("input_cache_hit", prices["input"])
+    return (
+        (prompt_tokens - cache_hit_tokens) * prices["input"]
+        + cache_hit_tokens * hit_price
+        + completion_tokens * prices["output"]
+    ) / 1_000_000
+
+
+def prefix_cache_stats(providers: Iterable[Tuple[str, Any]]) -> Dict[str, Any]:
+    """Hit rate prefix cache untuk provider yang melaporkannya (mis. DeepSeek)"""
+    return {name: llm.prefix_cache_stats() for name, llm in providers if hasattr(llm, "prefix_cache_stats")}
+
+
+class TokenLedger:
+    """Agregasi usage semua request per endpoint, node dan provider"""
+
+    def __init__(self):
+        self.requests = defaultdict(int)
+        self._totals = defaultdict(lambda: {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_calls": 0,
+            "cache_hit_tokens": 0, "cache_miss_tokens": 0,
+        })
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, entries: List[Dict[str, Any]]):
+        with self._lock:
+            self.requests[endpoint] += 1
+            for entry in entries:
+                totals = self._totals[(endpoint, entry["node"], entry["provider"])]
+                totals["calls"] += 1
+                totals["prompt_tokens"] += entry["prompt_tokens"]
+                totals["completion_tokens"] += entry["completion_tokens"]
+                totals["cache_hit_tokens"] += entry.get("cache_hit_tokens", 0)
+                totals["cache_miss_tokens"] += entry.get("cache_miss_tokens", 0)
+                if entry.get("source") != "provider":
+                    totals["estimated_calls"] += 1
+
+    @staticmethod
+    def _rollup(rows: List[tuple], key_index: int) -> Dict[str, Dict[str, Any]]:
+        grouped: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "cache_hit_tokens": 0, "cache_miss_tokens": 0, "cost_usd": 0.0,
+        })
+        for key, totals in rows:
+            group = grouped[key[key_index]]
+            for field in ("calls", "prompt_tokens", "completion_tokens", "cache_hit_tokens", "cache_miss_tokens"):
+                group[field] += totals[field]
+            group["cost_usd"] += usage_cost(
+                key[2], totals["prompt_tokens"], totals["completion_tokens"], totals["cache_hit_tokens"]
+            )
+        for group in grouped.values():
+            group["cost_usd"] = round(group["cost_usd"], 6)
+            # Hit rate hanya dari call yang melaporkan cache (provider tanpa cache tidak ikut dihitung)
+            reported = group["cache_hit_tokens"] + group["cache_miss_tokens"]
+            group["cache_hit_rate"] = round(group["cache_hit_tokens"] / reported, 3) if reported else None
+        return dict(grouped)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = [(key, dict(totals)) for key, totals in self._totals.items()]
+            requests = dict(self.requests)
+
+        by_endpoint = self._rollup(rows, 0)
+        for endpoint, group in by_endpoint.items():
+            count = requests.get(endpoint, 0)
+            group["requests"] = count
+            group["tokens_per_request"] = round((group["prompt_tokens"] + group["completion_tokens"]) / count, 1) if count else 0.0
+        return {
+            "by_endpoint": by_endpoint,
+            "by_node": self._rollup(rows, 1),
+            "by_provider": self._rollup(rows, 2),
+            "estimated_calls": sum(totals["estimated_calls"] for _, totals in rows),
+            "prices_per_1m": PRICES_PER_1M,
+        }
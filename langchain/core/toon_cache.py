@@ -0,0 +1,112 @@
+"""
+Memoized TOON fragments per category - dirender sekali per snapshot menu
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.utils import category_to_toon
+
+logger = logging.getLogger(__name__)
+
+
+def _fingerprint(items: List[dict]) -> Tuple:
+    """Fingerprint kategori: hanya field yang ikut dirender"""
+    return tuple(
+        (item.get("id"), item.get("name"), item.get("harga"), item.get("is_available", True))
+        for item in items
+    )
+
+
+class ToonFragmentCache:
+    """
+    Simpan fragment TOON per kategori + listing `id,name` untuk CRUD
+    - sync() hanya me-render ulang kategori yang berubah
+    - Full menu ("all") = join dari fragment yang sudah ada
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fingerprints: Dict[str, Tuple] = {}
+        self._toon: Dict[str, str] = {}
+        self._id_names: Dict[str, str] = {}
+        self._menu_toon: Optional[str] = None
+        self._all_id_names: Optional[str] = None
+        self.renders = 0
+
+    def sync(self, menu_data: Dict[str, List[dict]], on_commit: Optional[Callable[[], None]] = None) -> List[str]:
+        """
+        Sinkronkan dengan snapshot baru, return kategori yang di-render ulang
+        on_commit: dipanggil di dalam lock setelah fragment di-swap (mis. swap dict cache),
+        jadi fragment baru tidak pernah terlihat bersama snapshot lama
+        """
+        changed = []
+        with self._lock:
+            for category, items in menu_data.items():
+                fingerprint = _fingerprint(items)
+                if self._fingerprints.get(category) == fingerprint:
+                    continue
+
+                self._fingerprints[category] = fingerprint
+                self._toon[category] = category_to_toon(category, items)
+                self._id_names[category] = "\n".join(f"{item['id']},{item['name']}" for item in items)
+                changed.append(category)
+
+            removed = [c for c in self._fingerprints if c not in menu_data]
+            for category in removed:
+                self._fingerprints.pop(category, None)
+                self._toon.pop(category, None)
+                self._id_names.pop(category, None)
+
+            # Urutan kategori mengikuti snapshot
+            self._toon = {c: self._toon[c] for c in menu_data if c in self._toon}
+            self._id_names = {c: self._id_names[c] for c in menu_data if c in self._id_names}
+
+            if changed or removed:
+                self._menu_toon = None
+                self._all_id_names = None
+                self.renders += len(changed)
+
+            if on_commit is not None:
+                on_commit()
+
+        if changed or removed:
+            logger.info(f"🧩 [TOON-CACHE] Re-rendered {len(changed)} categories, removed {len(removed)}")
+        return changed
+
+    def category(self, category: str) -> Optional[str]:
+        """Fragment TOON satu kategori (None jika tidak ada)"""
+        with self._lock:
+            return self._toon.get(category)
+
+    def menu(self) -> str:
+        """Full menu TOON, identik dengan menu_to_toon()"""
+        with self._lock:
+            if self._menu_toon is None:
+                self._menu_toon = "\n".join(
+                    toon for category, toon in self._toon.items() if self._fingerprints.get(category)
+                )
+            return self._menu_toon
+
+    def categories(self, categories: Iterable[str]) -> str:
+        """
+        TOON beberapa kategori dalam urutan snapshot (bukan urutan dari routing)
+        Block yang sama → byte yang sama, jadi prefix prompt bisa di-cache provider
+        """
+        wanted = set(categories)
+        with self._lock:
+            return "\n".join(
+                toon for category, toon in self._toon.items()
+                if category in wanted and self._fingerprints.get(category)
+            )
+
+    def id_names(self, categories: Optional[Iterable[str]] = None) -> str:
+        """Listing `id,name` untuk kategori tertentu (None = semua), urutan snapshot"""
+        if categories is None:
+            with self._lock:
+                if self._all_id_names is None:
+                    self._all_id_names = "\n".join(text for text in self._id_names.values() if text)
+                return self._all_id_names
+        wanted = set(categories)
+        return "\n".join(text for c, text in self._id_names.items() if c in wanted and text)
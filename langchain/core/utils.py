@@ -4,13 +4,30 @@ Utility functions for TOON format and token estimation
 
 import json
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Kata / angka / tanda baca - unit dasar sebelum dipecah seperti BPE
+_TOKEN_PIECES = re.compile(r"[^\W\d_]+|\d+|[^\w\s]", re.UNICODE)
+
 
 def estimate_tokens(text: str) -> int:
-    """Rough token estimation"""
-    return len(text) // 3
+    """
+    Estimasi token lokal (fallback jika provider tidak mengirim usage)
+    Meniru BPE: kata ~4 huruf/token, angka ~3 digit/token, tanda baca 1 token
+    """
+    if not text:
+        return 0
+    count = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if piece[0].isdigit():
+            count += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            count += (len(piece) + 3) // 4
+        else:
+            count += 1
+    return count
 
 
 def menu_to_toon(menu_data: dict) -> str:
@@ -48,16 +65,14 @@ def category_to_toon(category_name: str, items: list) -> str:
 
 
 def extract_answer_from_response(resp):
-    """Extract answer from Perplexity API response"""
+    """Extract answer from Perplexity API response (raise ValueError jika tidak valid)"""
     logger.debug("🔍 Extracting answer from API response")
     
     if not resp:
-        logger.error("❌ No response from API")
-        return "Error: No response from API"
+        raise ValueError("No response from API")
     
     if 'text' not in resp:
-        logger.error(f"❌ Missing 'text' field. Keys: {list(resp.keys())}")
-        return f"Error: Missing 'text' field. Keys: {list(resp.keys())}"
+        raise ValueError(f"Missing 'text' field. Keys: {list(resp.keys())}")
     
     text_content = resp['text']
     
@@ -99,11 +114,12 @@ def extract_answer_from_response(resp):
                     return str(last_step['content'])
                 return str(last_step)
             
-            return "Error: Empty steps list"
+            raise ValueError("Empty steps list")
         
+        except ValueError:
+            raise
         except Exception as e:
-            logger.error(f"❌ Error parsing steps: {str(e)}")
-            return f"Error parsing steps: {str(e)}"
+            raise ValueError(f"Error parsing steps: {str(e)}") from e
     
     elif isinstance(text_content, str):
         logger.debug(f"✅ Direct string response: {text_content[:100]}...")
@@ -113,5 +129,4 @@ def extract_answer_from_response(resp):
         return str(text_content)
     
     else:
-        logger.error(f"❌ Unknown format: {type(text_content)}")
-        return f"Error: Unknown format"
+        raise ValueError(f"Unknown format: {type(text_content)}")
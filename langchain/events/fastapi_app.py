@@ -2,19 +2,33 @@
 FastAPI application for menu chatbot API
 """
 
+import asyncio
+import importlib
 import logging
 import os
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Security, Depends
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Security, Depends, Request
+from fastapi.responses import JSONResponse
 from fastapi.security import APIKeyHeader
 from pydantic import BaseModel, Field
 
-from config.cookies import perplexity_cookies
-from config.database import get_supabase_client, MenuCacheManager
-from core.agents import create_menu_agent, create_crud_agent 
-from core.llm import PerplexityCustomLLM
-from core.deepseek_llm import DeepSeekCustomLLM
-from perplexity_async import Client
+_import_start = time.perf_counter()
+
+# Modul ringan saja di level module; langchain/langgraph/openai/supabase/curl_cffi
+# di-import di background saat startup (RUNTIME_MODULES), jadi /health langsung hidup
+from config.database import MenuCacheManager, get_supabase_client
+from config.errors import ConfigError
+from core.routing import RoutingCache
+from core.retrieval import MenuRetriever
+from core.resolver import MenuResolver
+from core.sessions import ClarificationStore
+from core.metrics import SpeculationStats
+from core.structured import StructuredOutputStats
+from core.errors import LLMError, DeadlineExceededError
+from core.deadline import Deadline
+from core.token_usage import TokenLedger
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +36,70 @@ logger = logging.getLogger(__name__)
 cache_manager = None
 agent_graph = None
 crud_agent_graph = None 
+routing_cache = None
+retriever = None
+resolver = None
+session_store = None
+speculation_stats = None
+output_stats = None
+token_ledger = None
+perplexity_pool = None
+account_provisioner = None
+labs_clients = []
+llm = None
+routing_llm = None
+deepseek_llm = None
+init_task = None
+# Breakdown waktu startup (detik) untuk /ready dan log
+startup_report = {"imports_s": None, "phases": {}, "total_s": None, "ready": False, "error": None, "attempts": 0, "fatal": False}
+llm_reachable = False
+llm_checked_at = 0.0
 API_KEY = os.getenv("API_KEY", "default-insecure-key")
 API_DEEPSEEK = os.getenv("API_DEEPSEEK", "default-API-DEEPSEEK")
+# Override untuk load test lokal (python -m benchmarks.fake_servers)
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+PERPLEXITY_BASE_URL = os.getenv("PERPLEXITY_BASE_URL", "https://www.perplexity.ai")
+ADAPTIVE_ROUTING = os.getenv("ADAPTIVE_ROUTING", "false").lower() == "true"
+ADAPTIVE_THRESHOLD_TOKENS = int(os.getenv("ADAPTIVE_THRESHOLD_TOKENS", 1500))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 12))  # Maks item hasil retrieval di prompt answer (0 = tanpa batas)
+SPECULATIVE_ROUTING = os.getenv("SPECULATIVE_ROUTING", "false").lower() == "true"
+CLARIFY_SESSION_TTL = int(os.getenv("CLARIFY_SESSION_TTL", 600))
+CLARIFY_SESSION_PATH = os.getenv("CLARIFY_SESSION_PATH")  # Opsional: persist ke file JSON
+LLM_STRATEGY = os.getenv("LLM_STRATEGY", "deepseek").lower()  # deepseek | hedged | failover
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 90))
+ROUTING_LLM = os.getenv("ROUTING_LLM", "default").lower()  # default (= LLM_STRATEGY) | labs
+LABS_ROUTING_MODEL = os.getenv("LABS_ROUTING_MODEL", "sonar")
+LABS_TIMEOUT_SECONDS = float(os.getenv("LABS_TIMEOUT_SECONDS", 20))
+LABS_CONNECTIONS = int(os.getenv("LABS_CONNECTIONS", 3))  # Websocket Labs paralel (ask model sama serial per socket)
+PERPLEXITY_POOL_STRATEGY = os.getenv("PERPLEXITY_POOL_STRATEGY", "least_loaded")  # least_loaded | round_robin
+PERPLEXITY_REPROBE_SECONDS = float(os.getenv("PERPLEXITY_REPROBE_SECONDS", 600))
+# >0: siapkan akun Perplexity baru (Emailnator) di background sebagai cadangan kuota pro
+PERPLEXITY_WARM_ACCOUNTS = int(os.getenv("PERPLEXITY_WARM_ACCOUNTS", 0))
+# WA bot menyerah setelah 50s → selesaikan (atau batalkan) sebelum itu
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 45))
+DISCONNECT_POLL_SECONDS = 0.5
+READY_CHECK_TTL_SECONDS = float(os.getenv("READY_CHECK_TTL_SECONDS", 30))  # Cache hasil ping LLM untuk /ready
+# Init gagal di-retry dengan backoff; setelah habis (atau error konfigurasi) /health → 503 supaya di-restart
+INIT_MAX_ATTEMPTS = int(os.getenv("INIT_MAX_ATTEMPTS", 5))
+INIT_RETRY_BASE_SECONDS = float(os.getenv("INIT_RETRY_BASE_SECONDS", 2))
+INIT_RETRY_MAX_SECONDS = 60.0
+# Hanya error konfigurasi (env/credential kosong atau tidak valid) yang tidak di-retry;
+# ValueError/ImportError lain bisa transient (response aneh, dependency setengah ter-install)
+FATAL_INIT_ERRORS = (ConfigError,)
+LLM_STRATEGIES = ("deepseek", "hedged", "failover")
+ROUTING_LLMS = ("default", "labs")
+
+# Di-import di thread saat startup (urutan: paling berat dulu)
+RUNTIME_MODULES = (
+    "core.agents",
+    "core.deepseek_llm",
+    "core.llm",
+    "core.labs_llm",
+    "core.hedged_llm",
+    "core.provider_router",
+    "perplexity_async",
+    "supabase",
+)
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=True)
 
@@ -38,6 +114,9 @@ class AnswerResponse(BaseModel):
     question: str
     answer: str
     category: str
+    tokens_saved: int = 0
+    llm_input_tokens: int = 0
+    llm_output_tokens: int = 0
     success: bool = True
 
 
@@ -51,6 +130,7 @@ class RefreshResponse(BaseModel):
 class EditMenuRequest(BaseModel):
     """Request model for edit menu endpoint"""
     question: str = Field(..., min_length=1, max_length=200, description="Natural language edit command")
+    session_id: Optional[str] = Field(None, max_length=100, description="Conversation id, untuk melanjutkan klarifikasi")
 
 
 class EditMenuResponse(BaseModel):
@@ -58,6 +138,8 @@ class EditMenuResponse(BaseModel):
     question: str
     message: str
     success: bool
+    needs_clarification: bool = False
+    session_id: Optional[str] = None
 
 
 
@@ -69,51 +151,328 @@ def verify_api_key(api_key: str = Security(api_key_header)):
     return api_key
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan manager - startup and shutdown"""
-    global cache_manager, agent_graph, crud_agent_graph  
+async def run_until_disconnect(http_request: Request, coro):
+    """Jalankan graph, batalkan jika client sudah putus (499)"""
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logger.warning("🔌 Client disconnected, cancelling request")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def timed_phase(phase: str, awaitable):
+    """Jalankan satu fase startup, catat durasinya di startup_report"""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        startup_report["phases"][phase] = round(time.perf_counter() - start, 3)
+
+
+def import_runtime_modules():
+    """Import modul berat (dipanggil via asyncio.to_thread)"""
+    for name in RUNTIME_MODULES:
+        importlib.import_module(name)
+
+
+def load_menu_cache() -> MenuCacheManager:
+    """Supabase client + snapshot menu (sync, dipanggil via asyncio.to_thread)"""
+    manager = MenuCacheManager(get_supabase_client())
+    manager.initialize_cache()
+    manager.setup_realtime_listener()
+    return manager
+
+
+async def connect_labs():
+    """LabsCustomLLM untuk routing (ROUTING_LLM=labs), LABS_CONNECTIONS websocket paralel"""
+    global labs_clients
+    from core.labs_llm import LabsCustomLLM
+    from perplexity_async import LabsClient
     
-    logger.info("🚀 Starting Warung22 Menu API...")
+    pending = [LabsClient() for _ in range(max(LABS_CONNECTIONS, 1))]
+    try:
+        results = await asyncio.gather(*pending, return_exceptions=True)
+    except BaseException:
+        await close_all(pending)
+        raise
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        # Satu koneksi gagal → websocket/session yang sudah terbuka jangan dibiarkan jalan
+        await close_all(pending)
+        raise errors[0]
+    labs_clients = list(results)
+    return LabsCustomLLM(labs_clients, model=LABS_ROUTING_MODEL, timeout=LABS_TIMEOUT_SECONDS)
+
+
+async def close_all(clients):
+    """close() semua client (LabsClient), error per client hanya di-log"""
+    for client in clients:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Closing {type(client).__name__} failed: {e}")
+
+
+async def close_llm_clients():
+    """
+    Tutup resource LLM dari attempt init yang gagal (atau saat shutdown):
+    provisioner, session pool Perplexity, websocket Labs
+    """
+    global perplexity_pool, account_provisioner, labs_clients
+    if account_provisioner:
+        await account_provisioner.stop()
+        account_provisioner = None
+    if perplexity_pool:
+        await perplexity_pool.close()
+        perplexity_pool = None
+    if labs_clients:
+        await close_all(labs_clients)
+        labs_clients = []
+
+
+async def build_llms():
+    """DeepSeek (+ Perplexity pool / Labs sesuai env), return (llm, routing_llm)"""
+    global deepseek_llm
+    from core.deepseek_llm import DeepSeekCustomLLM
+    
+    if LLM_STRATEGY not in LLM_STRATEGIES:
+        raise ConfigError(f"Invalid LLM_STRATEGY={LLM_STRATEGY!r}, expected one of {', '.join(LLM_STRATEGIES)}")
+    if ROUTING_LLM not in ROUTING_LLMS:
+        raise ConfigError(f"Invalid ROUTING_LLM={ROUTING_LLM!r}, expected one of {', '.join(ROUTING_LLMS)}")
+    
+    deepseek_llm = llm = DeepSeekCustomLLM(api_key=API_DEEPSEEK, base_url=DEEPSEEK_BASE_URL)
+    labs_task = None
+    if ROUTING_LLM == "labs":
+        # Model Labs cepat khusus node routing, answer/extract tetap memakai llm
+        logger.info(f"🔌 Connecting Perplexity Labs ({LABS_ROUTING_MODEL}) for routing...")
+        labs_task = asyncio.create_task(connect_labs())
     
     try:
-        # Initialize Supabase
-        supabase = get_supabase_client()
-        
-        # Initialize cache manager
-        cache_manager = MenuCacheManager(supabase)
-        cache_manager.initialize_cache()
-        cache_manager.setup_realtime_listener()
+        llm = await build_answer_llm(llm)
+        routing = await labs_task if labs_task else None
+    except BaseException:
+        # Pool gagal → koneksi Labs yang masih berjalan dibatalkan (connect_labs menutup sisanya)
+        if labs_task and not labs_task.done():
+            labs_task.cancel()
+            await asyncio.gather(labs_task, return_exceptions=True)
+        raise
+    logger.info(f"🧭 Routing LLM: {routing._llm_type if routing else LLM_STRATEGY}")
+    return llm, routing
+
+
+async def build_answer_llm(llm):
+    """LLM_STRATEGY hedged/failover: bungkus DeepSeek dengan pool Perplexity"""
+    global perplexity_pool, account_provisioner
+    if LLM_STRATEGY in ("hedged", "failover"):
+        try:
+            from config.cookies import perplexity_cookies
+        except ImportError as e:
+            raise ConfigError(f"LLM_STRATEGY={LLM_STRATEGY} needs config/cookies/perplexity_cookies.py ({e})") from e
+        from core.llm import PerplexityCustomLLM
+        from core.hedged_llm import HedgedLLM
+        from core.provider_router import ProviderRouterLLM
+        from perplexity_async import AccountProvisioner, ClientPool
         
-        # Initialize Perplexity client
-        logger.info("🔌 Initializing Perplexity client...")
+        # Satu Client per akun; perplexity_cookie_sets (list) opsional di config/cookies
+        cookie_sets = getattr(perplexity_cookies, "perplexity_cookie_sets", None) or [perplexity_cookies.perplexity_cookies]
+        logger.info(f"🔌 Initializing Perplexity pool ({len(cookie_sets)} accounts)...")
+        emailnator_cookies = getattr(perplexity_cookies, "emailnator_cookies", None)
+        if PERPLEXITY_WARM_ACCOUNTS > 0 and emailnator_cookies:
+            account_provisioner = AccountProvisioner(
+                emailnator_cookies,
+                base_url=PERPLEXITY_BASE_URL,
+                warm_size=PERPLEXITY_WARM_ACCOUNTS
+            )
+            account_provisioner.start()
+        elif PERPLEXITY_WARM_ACCOUNTS > 0:
+            logger.warning("⚠️ PERPLEXITY_WARM_ACCOUNTS set but emailnator_cookies missing, provisioner disabled")
+        perplexity_pool = await ClientPool(
+            cookie_sets,
+            base_url=PERPLEXITY_BASE_URL,
+            strategy=PERPLEXITY_POOL_STRATEGY,
+            reprobe_seconds=PERPLEXITY_REPROBE_SECONDS,
+            provisioner=account_provisioner
+        )
+        perplexity_llm = PerplexityCustomLLM(client=perplexity_pool)
+        if LLM_STRATEGY == "hedged":
+            # Hedge ke Perplexity jika DeepSeek lambat
+            llm = HedgedLLM(
+                llm, perplexity_llm,
+                primary_name="deepseek",
+                secondary_name="perplexity",
+                hedge_percentile=HEDGE_PERCENTILE
+            )
+        else:
+            # Circuit breaker per provider, failover ke provider sehat
+            llm = ProviderRouterLLM([("deepseek", llm), ("perplexity", perplexity_llm)])
+    logger.info(f"🧠 LLM strategy: {LLM_STRATEGY}")
+    return llm
+
+
+async def initialize():
+    """
+    Startup di background: import modul berat, lalu snapshot menu (Supabase) dan
+    LLM client paralel, lalu agent. /ready 503 sampai selesai
+    """
+    global cache_manager, agent_graph, crud_agent_graph, routing_cache, retriever, resolver, session_store, speculation_stats, output_stats, llm, routing_llm, token_ledger
+    start = time.perf_counter()
+    
+    try:
+        await timed_phase("imports", asyncio.to_thread(import_runtime_modules))
+        from core.agents import create_menu_agent, create_crud_agent
         
-        # perplexity_cli = await Client(perplexity_cookies.perplexity_cookies)
-        logger.info("✅ Perplexity client initialized")
+        # DB snapshot dan LLM client tidak saling bergantung → paralel; tunggu keduanya
+        # selesai supaya fase yang masih jalan tidak mengisi global saat attempt berikutnya
+        menu_result, llm_result = await asyncio.gather(
+            timed_phase("menu_cache", asyncio.to_thread(load_menu_cache)),
+            timed_phase("llm_clients", build_llms()),
+            return_exceptions=True,
+        )
+        if isinstance(menu_result, BaseException):
+            raise menu_result
+        if isinstance(llm_result, BaseException):
+            menu_result.cleanup()
+            raise llm_result
+        cache_manager, (llm, routing_llm) = menu_result, llm_result
         
-        # Create LLM and agent
-        # llm = PerplexityCustomLLM(client=perplexity_cli)
-        llm = DeepSeekCustomLLM(api_key=API_DEEPSEEK)
+        agents_start = time.perf_counter()
+        # Routing cache dipakai bersama oleh kedua agent
+        routing_cache = RoutingCache()
+        # Retrieval item yang disebut untuk memperkecil prompt answer
+        retriever = MenuRetriever(cache_manager, top_k=RETRIEVAL_TOP_K or None)
+        # Resolver lokal nama → ID untuk CRUD (share index dengan retriever)
+        resolver = MenuResolver(cache_manager, retriever=retriever)
+        # Klarifikasi CRUD yang tertunda per session
+        session_store = ClarificationStore(ttl_seconds=CLARIFY_SESSION_TTL, persist_path=CLARIFY_SESSION_PATH)
+        speculation_stats = SpeculationStats()
+        token_ledger = TokenLedger()
+        # Parse failure / fallback output JSON routing & extract (dipakai bersama)
+        output_stats = StructuredOutputStats()
         # Menu Agent
-        agent_graph = create_menu_agent(llm, cache_manager)
+        agent_graph = create_menu_agent(
+            llm, cache_manager,
+            routing_cache=routing_cache,
+            adaptive=ADAPTIVE_ROUTING,
+            adaptive_threshold_tokens=ADAPTIVE_THRESHOLD_TOKENS,
+            retriever=retriever,
+            speculative=SPECULATIVE_ROUTING,
+            speculation_stats=speculation_stats,
+            output_stats=output_stats,
+            routing_llm=routing_llm
+        )
         # CRUD agent
-        crud_agent_graph = create_crud_agent(llm, cache_manager)
-        
-        logger.info("✅ API ready to serve requests")
+        crud_agent_graph = create_crud_agent(
+            llm, cache_manager,
+            routing_cache=routing_cache,
+            resolver=resolver,
+            session_store=session_store,
+            output_stats=output_stats,
+            routing_llm=routing_llm
+        )
+        startup_report["phases"]["agents"] = round(time.perf_counter() - agents_start, 3)
         
+        await timed_phase("llm_check", check_llm_reachable(force=True))
+        startup_report["ready"] = True
+        startup_report["error"] = None
     except Exception as e:
+        startup_report["error"] = f"{type(e).__name__}: {e}"
         logger.error(f"❌ Startup failed: {e}")
         raise
+    finally:
+        startup_report["total_s"] = round(time.perf_counter() - start, 3)
+        phases = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in startup_report["phases"].items())
+        logger.info(f"⏱️ [STARTUP] module import {startup_report['imports_s']:.2f}s | {phases} | total init {startup_report['total_s']:.2f}s")
+    
+    logger.info("✅ API ready to serve requests")
+
+
+async def initialize_with_retry():
+    """
+    initialize() dengan exponential backoff (INIT_MAX_ATTEMPTS kali)
+    Error konfigurasi atau attempt habis → startup_report["fatal"], /health 503
+    """
+    for attempt in range(1, INIT_MAX_ATTEMPTS + 1):
+        startup_report["attempts"] = attempt
+        try:
+            await initialize()
+            return
+        except FATAL_INIT_ERRORS as e:
+            logger.critical(f"💀 [STARTUP] Fatal configuration error, not retrying: {e}")
+            await close_llm_clients()
+            break
+        except Exception:
+            pass
+        
+        # Provisioner, session pool dan websocket Labs dari attempt gagal jangan dibiarkan jalan
+        await close_llm_clients()
+        if attempt < INIT_MAX_ATTEMPTS:
+            delay = min(INIT_RETRY_BASE_SECONDS * 2 ** (attempt - 1), INIT_RETRY_MAX_SECONDS)
+            logger.warning(f"🔁 [STARTUP] Attempt {attempt}/{INIT_MAX_ATTEMPTS} failed, retry in {delay:.0f}s")
+            await asyncio.sleep(delay)
+    
+    startup_report["fatal"] = True
+    logger.critical(f"💀 [STARTUP] Giving up after {startup_report['attempts']} attempt(s), /health now 503")
+
+
+async def check_llm_reachable(force: bool = False) -> bool:
+    """
+    DeepSeek /models (cache READY_CHECK_TTL_SECONDS); hedged/failover cukup
+    salah satu provider: pool Perplexity yang sudah terinisialisasi dianggap reachable
+    """
+    global llm_reachable, llm_checked_at
+    if deepseek_llm is None:
+        return False
+    now = time.monotonic()
+    if force or now - llm_checked_at >= READY_CHECK_TTL_SECONDS:
+        llm_checked_at = now
+        llm_reachable = await deepseek_llm.ping() or perplexity_pool is not None
+    return llm_reachable
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan manager - startup (background) and shutdown"""
+    global init_task
+    
+    logger.info("🚀 Starting Warung22 Menu API...")
+    # Server langsung menerima request (/health); endpoint lain menunggu /ready
+    init_task = asyncio.create_task(initialize_with_retry())
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down API...")
+    if not init_task.done():
+        init_task.cancel()
+        try:
+            await init_task
+        except (asyncio.CancelledError, Exception):
+            pass
+    await close_llm_clients()
     if cache_manager:
         cache_manager.cleanup()
     logger.info("✅ Shutdown complete")
 
 
+def require_ready():
+    """503 selama startup belum selesai (atau gagal)"""
+    if not startup_report["ready"]:
+        if startup_report["fatal"]:
+            detail = f"Startup failed: {startup_report['error']}"
+        elif startup_report["error"]:
+            detail = f"Startup attempt {startup_report['attempts']} failed ({startup_report['error']}), retrying"
+        else:
+            detail = "Service is starting, retry shortly"
+        raise HTTPException(status_code=503, detail=detail)
+
 app = FastAPI(
     title="Warung22 Menu API",
     description="AI-powered menu chatbot API using LangGraph and Perplexity",
@@ -136,9 +495,44 @@ async def root():
     }
 
 
-@app.post("/ask", response_model=AnswerResponse)
+@app.get("/health")
+async def health():
+    """
+    Liveness: proses hidup dan event loop merespons (tanpa cek dependency)
+    503 jika startup gagal permanen, supaya orchestrator me-restart proses
+    """
+    if startup_report["fatal"]:
+        return JSONResponse(status_code=503, content={"status": "failed", "error": startup_report["error"]})
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: startup selesai, cache menu termuat, LLM bisa dijangkau
+    503 selama starting / jika salah satu cek gagal; berisi breakdown waktu startup
+    """
+    checks = {
+        "initialized": startup_report["ready"],
+        "cache_loaded": bool(cache_manager and cache_manager.last_updated),
+        "llm_reachable": await check_llm_reachable() if startup_report["ready"] else False,
+    }
+    if all(checks.values()):
+        status = "ready"
+    elif startup_report["fatal"]:
+        status = "failed"
+    else:
+        status = "starting" if not startup_report["ready"] else "degraded"
+    return JSONResponse(
+        status_code=200 if status == "ready" else 503,
+        content={"status": status, "checks": checks, "startup": startup_report}
+    )
+
+
+@app.post("/ask", response_model=AnswerResponse, dependencies=[Depends(require_ready)])
 async def ask_question(
     request: QuestionRequest,
+    http_request: Request,
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -149,24 +543,43 @@ async def ask_question(
     logger.info(f"📥 API Request: '{request.question}'")
     
     try:
-        result = await agent_graph.ainvoke({"input": request.question})
+        result = await run_until_disconnect(http_request, agent_graph.ainvoke({
+            "input": request.question,
+            "deadline": Deadline(REQUEST_DEADLINE_SECONDS)
+        }))
         
-        logger.info(f"✅ API Response generated for: '{request.question}'")
+        token_ledger.record("/ask", result.get("token_usage", []))
+        logger.info(
+            f"✅ API Response generated for: '{request.question}' "
+            f"({result.get('llm_input_tokens', 0)} in / {result.get('llm_output_tokens', 0)} out tokens)"
+        )
         
         return AnswerResponse(
             question=request.question,
             answer=result["answer"],
             category=result.get("category", "unknown"),
+            tokens_saved=result.get("tokens_saved", 0),
+            llm_input_tokens=result.get("llm_input_tokens", 0),
+            llm_output_tokens=result.get("llm_output_tokens", 0),
             success=True
         )
     
+    except HTTPException:
+        raise
+    except DeadlineExceededError as e:
+        logger.error(f"⏰ {e}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except LLMError as e:
+        logger.error(f"❌ LLM unavailable: {e}")
+        raise HTTPException(status_code=503, detail=f"LLM unavailable: {str(e)}")
     except Exception as e:
         logger.error(f"❌ Error processing question: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
-@app.post("/edit-menu", response_model=EditMenuResponse)
+@app.post("/edit-menu", response_model=EditMenuResponse, dependencies=[Depends(require_ready)])
 async def edit_menu(
     request: EditMenuRequest,
+    http_request: Request,
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -177,13 +590,21 @@ async def edit_menu(
     - "jumbo semua ready"
     - "batagor habis"
     
+    Kirim session_id yang sama untuk menjawab pertanyaan klarifikasi
+    (mis. "ikan habis" → "❓ Ikan apa?" → "yang goreng")
+    
     Requires X-API-Key header for authentication
     """
     logger.info(f"📥 [EDIT-MENU] Question: '{request.question}'")
     
     try:
-        result = await crud_agent_graph.ainvoke({"input": request.question})
+        result = await run_until_disconnect(http_request, crud_agent_graph.ainvoke({
+            "input": request.question,
+            "session_id": request.session_id,
+            "deadline": Deadline(REQUEST_DEADLINE_SECONDS)
+        }))
         
+        token_ledger.record("/edit-menu", result.get("token_usage", []))
         message = result.get("result", "Unknown error")
         success = "✅" in message
         
@@ -192,15 +613,25 @@ async def edit_menu(
         return EditMenuResponse(
             question=request.question,
             message=message,
-            success=success
+            success=success,
+            needs_clarification=result.get("error") == "need_clarification",
+            session_id=request.session_id
         )
     
+    except HTTPException:
+        raise
+    except DeadlineExceededError as e:
+        logger.error(f"⏰ [EDIT-MENU] {e}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except LLMError as e:
+        logger.error(f"❌ [EDIT-MENU] LLM unavailable: {e}")
+        raise HTTPException(status_code=503, detail=f"LLM unavailable: {str(e)}")
     except Exception as e:
         logger.error(f"❌ [EDIT-MENU] Error: {e}")
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
     
 
-@app.post("/refresh", response_model=RefreshResponse)
+@app.post("/refresh", response_model=RefreshResponse, dependencies=[Depends(require_ready)])
 async def refresh_cache(api_key: str = Depends(verify_api_key)):
     """
     Manually refresh menu cache from database
@@ -228,7 +659,7 @@ async def refresh_cache(api_key: str = Depends(verify_api_key)):
         raise HTTPException(status_code=500, detail=f"Error refreshing cache: {str(e)}")
 
 
-@app.get("/cache/stats")
+@app.get("/cache/stats", dependencies=[Depends(require_ready)])
 async def cache_stats(api_key: str = Depends(verify_api_key)):
     """
     Get cache statistics
@@ -244,7 +675,44 @@ async def cache_stats(api_key: str = Depends(verify_api_key)):
         "last_updated": cache_manager.last_updated.isoformat() if cache_manager.last_updated else None,
         "items_by_category": {
             category: len(items) for category, items in cache_data.items()
-        }
+        },
+        "routing_cache": routing_cache.stats() if routing_cache else None,
+        "retrieval": retriever.stats() if retriever else None,
+        "resolver": resolver.stats() if resolver else None,
+        "clarification_sessions": session_store.stats() if session_store else None,
+        "speculation": speculation_stats.summary() if speculation_stats else None
     }
     
     return stats
+
+
+@app.get("/llm/stats")
+async def llm_stats(api_key: str = Depends(verify_api_key)):
+    """
+    Get LLM provider statistics (latency per provider, hedge count, circuit breaker state,
+    structured output parse failures / fallbacks per node, Perplexity account pool,
+    latency per Labs model when ROUTING_LLM=labs)
+    
+    Requires X-API-Key header for authentication
+    """
+    if hasattr(llm, "stats"):
+        stats = llm.stats()
+    else:
+        stats = {"strategy": LLM_STRATEGY, "provider": llm._llm_type if llm else None}
+    stats["structured_output"] = output_stats.summary() if output_stats else None
+    stats["perplexity_pool"] = perplexity_pool.stats() if perplexity_pool else None
+    stats["routing_llm"] = routing_llm.stats() if routing_llm else None
+    return stats
+
+
+@app.get("/tokens/stats", dependencies=[Depends(require_ready)])
+async def tokens_stats(api_key: str = Depends(verify_api_key)):
+    """
+    Get token usage aggregated per endpoint, node and provider (with estimated cost)
+    
+    Requires X-API-Key header for authentication
+    """
+    return token_ledger.summary()
+
+
+startup_report["imports_s"] = round(time.perf_counter() - _import_start, 3)
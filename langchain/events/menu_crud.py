@@ -83,8 +83,9 @@ class BulkAvailabilityUpdate(BaseModel):
 
 
 def get_cache_manager():
-    """Get cache_manager from fastapiapp"""
-    from events.fastapi_app import cache_manager
+    """Get cache_manager from fastapiapp (503 selama startup belum selesai)"""
+    from events.fastapi_app import cache_manager, require_ready
+    require_ready()
     return cache_manager
 
 
@@ -3,12 +3,14 @@ Warung22 Menu Agent - Main Entry Point
 Choose mode: CLI or API Server
 """
 
+import argparse
 import asyncio
 import logging
 import os
 import sys
+import threading
+import time
 from dotenv import load_dotenv
-from config.cookies.perplexity_cookies import perplexity_cookies
 from pathlib import Path
 
 # Load environment
@@ -32,33 +34,27 @@ def print_banner():
     print("🤖 WARUNG22 MENU AGENT")
     print("=" * 60)
     print("Mode Options:")
-    print("  1. CLI Mode - Interactive terminal chatbot")
+    print("  1. CLI Mode - Interactive terminal chatbot (--batch FILE for batch)")
     print("  2. API Mode - FastAPI REST server")
     print("=" * 60 + "\n")
 
 
-async def run_cli_mode():
-    """Run in CLI interactive mode"""
+async def build_cli_agents():
+    """Init cache + Perplexity client + agents untuk CLI (None jika gagal)"""
+    from config.cookies.perplexity_cookies import perplexity_cookies
     from config.database import get_supabase_client, MenuCacheManager
+    from config.errors import ConfigError
     from core.agents import create_menu_agent, create_crud_agent 
     from core.llm import PerplexityCustomLLM
+    from core.routing import RoutingCache
+    from core.sessions import ClarificationStore
     from perplexity_async import Client
     
-    print("\n🤖 AGEN MENU Warung22 - CLI MODE")
-    print("=" * 60)
-    print("Commands:")
-    print("  .menu - Show all menu")
-    print("  .edit <question> - Edit menu (e.g., .edit ikan habis)") 
-    print("  .refresh - Refresh cache from database")
-    print("  exit - Exit application")
-    print("=" * 60 + "\n")
-    
-    # Initialize
     try:
         supabase = get_supabase_client()
-    except ValueError as e:
+    except ConfigError as e:
         logger.error(f"❌ {e}")
-        return
+        return None
     
     cache_manager = MenuCacheManager(supabase)
     cache_manager.initialize_cache()
@@ -71,52 +67,104 @@ async def run_cli_mode():
         logger.info(f"Cookies:{perplexity_cli}\n")
     except Exception as e:
         logger.error(f"❌ Error init client: {e}")
-        return
+        cache_manager.cleanup()
+        return None
     
     # Create LLM and agent
     llm = PerplexityCustomLLM(client=perplexity_cli)
+    routing_cache = RoutingCache()
     # Agent Menu
-    agent_graph = create_menu_agent(llm, cache_manager)
+    agent_graph = create_menu_agent(llm, cache_manager, routing_cache=routing_cache)
     # Agent CRUD
-    crud_agent_graph = create_crud_agent(llm, cache_manager) 
+    crud_agent_graph = create_crud_agent(llm, cache_manager, routing_cache=routing_cache, session_store=ClarificationStore())
+    return cache_manager, agent_graph, crud_agent_graph
+
+
+async def ask_agents(agent_graph, crud_agent_graph, question: str, session_id: str) -> str:
+    """'.edit ...' → CRUD agent, selain itu → menu agent"""
+    if question.lower().startswith(".edit "):
+        result = await crud_agent_graph.ainvoke({"input": question[6:].strip(), "session_id": session_id})
+        return result.get("result", "Unknown error")
+    result = await agent_graph.ainvoke({"input": question})
+    return result["answer"]
+
+
+def start_stdin_reader(loop: asyncio.AbstractEventLoop) -> asyncio.Queue:
+    """
+    Daemon thread: baris stdin → asyncio.Queue (None = EOF)
+    Bukan asyncio.to_thread(input): thread executor yang blok di input() menahan
+    shutdown asyncio.run, jadi Ctrl-C tidak pernah selesai
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def read_lines():
+        while True:
+            line = sys.stdin.readline()
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, line.rstrip("\r\n") if line else None)
+            except RuntimeError:
+                return  # Event loop sudah ditutup
+            if not line:
+                return
+    
+    threading.Thread(target=read_lines, name="cli-stdin", daemon=True).start()
+    return queue
+
+
+async def read_input(lines: asyncio.Queue, prompt: str) -> str:
+    """Tampilkan prompt lalu tunggu baris berikutnya (EOFError di akhir stdin)"""
+    print(prompt, end="", flush=True)
+    line = await lines.get()
+    if line is None:
+        raise EOFError
+    return line
+
+
+async def run_cli_mode():
+    """Run in CLI interactive mode (stdin dibaca daemon thread, event loop tetap jalan)"""
+    print("\n🤖 AGEN MENU Warung22 - CLI MODE")
+    print("=" * 60)
+    print("Commands:")
+    print("  .menu - Show all menu")
+    print("  .edit <question> - Edit menu (e.g., .edit ikan habis)") 
+    print("  .refresh - Refresh cache from database")
+    print("  exit - Exit application")
+    print("=" * 60 + "\n")
+    
+    agents = await build_cli_agents()
+    if agents is None:
+        return
+    cache_manager, agent_graph, crud_agent_graph = agents
+    lines = start_stdin_reader(asyncio.get_running_loop())
 
     try:
         while True:
-            user_input = input("\n👤 Customer: ").strip()
+            try:
+                user_input = (await read_input(lines, "\n👤 Customer: ")).strip()
+            except EOFError:
+                user_input = "exit"
             
             if user_input.lower() == "exit":
                 print("\n👋 Terima kasih sudah berkunjung!\n")
                 break
             
             if user_input.lower() == ".refresh":
-                cache_manager.refresh_cache()
+                await asyncio.to_thread(cache_manager.refresh_cache)
                 print("✅ Cache updated from database")
                 continue
-
-            if user_input.lower().startswith(".edit "):
-                edit_question = user_input[6:].strip()
-                
-                try:
-                    print("\n🤖 Processing edit command...")
-                    result = await crud_agent_graph.ainvoke({"input": edit_question})
-                    
-                    message = result.get("result", "Unknown error")
-                    print(f"\n{message}")
-                
-                except Exception as e:
-                    logger.error(f"❌ Edit error: {e}")
-                    print(f"\n❌ Error: {e}")
-                
-                continue 
             
             if not user_input:
                 continue
             
+            is_edit = user_input.lower().startswith(".edit ")
+            if is_edit:
+                print("\n🤖 Processing edit command...")
+            
             try:
-                result = await agent_graph.ainvoke({"input": user_input})
-                print(f"\n🤖 Bot: {result['answer']}")
+                answer = await ask_agents(agent_graph, crud_agent_graph, user_input, session_id="cli")
+                print(f"\n{answer}" if is_edit else f"\n🤖 Bot: {answer}")
             except Exception as e:
-                logger.error(f"❌ Error: {e}")
+                logger.error(f"❌ {'Edit error' if is_edit else 'Error'}: {e}")
                 print(f"\n❌ Error: {e}\n")
     
     finally:
@@ -124,10 +172,79 @@ async def run_cli_mode():
         logger.info("🧹 Cleanup completed")
 
 
+def read_batch_questions(path: str) -> list:
+    """Satu pertanyaan per baris; baris kosong dan '#' diabaikan; '-' = stdin"""
+    text = sys.stdin.read() if path == "-" else Path(path).read_text(encoding="utf-8")
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.strip().startswith("#")]
+
+
+async def run_cli_batch(path: str, concurrency: int = 4):
+    """
+    Non-interaktif: jalankan semua pertanyaan di file secara paralel (maks concurrency),
+    cetak jawaban + latency per pertanyaan, lalu ringkasan percentile
+    """
+    from core.metrics import summarize
+    
+    questions = read_batch_questions(path)
+    if not questions:
+        print("❌ No questions in batch file")
+        return
+    
+    agents = await build_cli_agents()
+    if agents is None:
+        return
+    cache_manager, agent_graph, crud_agent_graph = agents
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    
+    async def run_one(index: int, question: str):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                # Session per baris: klarifikasi CRUD tidak bercampur antar pertanyaan
+                answer = await ask_agents(agent_graph, crud_agent_graph, question, session_id=f"batch-{index}")
+            except Exception as e:
+                errors += 1
+                answer = f"❌ Error: {e}"
+            elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        print(f"\n[{index}] ({elapsed:.2f}s) 👤 {question}\n🤖 {answer}", flush=True)
+    
+    logger.info(f"📄 Batch: {len(questions)} questions, concurrency {concurrency}")
+    wall_start = time.perf_counter()
+    try:
+        await asyncio.gather(*[run_one(i, q) for i, q in enumerate(questions, 1)])
+    finally:
+        cache_manager.cleanup()
+    wall = time.perf_counter() - wall_start
+    
+    stats = summarize(latencies)
+    print("\n" + "=" * 60)
+    print(f"📊 {len(questions)} questions | {errors} errors | concurrency {concurrency} | wall {wall:.2f}s | {len(questions) / wall:.2f} q/s")
+    print(f"⏱️ latency mean {stats['mean']:.2f}s | p50 {stats['p50']:.2f}s | p95 {stats['p95']:.2f}s | p99 {stats['p99']:.2f}s")
+    print("=" * 60 + "\n")
+
+
+def parse_cli_args(argv: list):
+    """Argumen mode cli: [--batch FILE] [--concurrency N]"""
+    parser = argparse.ArgumentParser(prog="main.py cli", description="Interactive chatbot, or batch mode with --batch")
+    parser.add_argument("--batch", metavar="FILE", help="File pertanyaan (satu per baris, '.edit ...' untuk CRUD, '-' = stdin)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maksimal pertanyaan paralel di batch mode")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be >= 1")
+    return args
+
+
 def run_api_mode():
     """Run in API server mode (production)"""
+    start = time.perf_counter()
     import uvicorn
     from events.fastapi_app import app
+    # Dependency berat (langchain, openai, supabase, curl_cffi) di-import saat startup di background
+    logger.info(f"⏱️ [STARTUP] uvicorn + app import {time.perf_counter() - start:.2f}s")
     
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", 8000))
@@ -163,6 +280,15 @@ def run_api_mode_reload():
 
 def main():
     """Main entry point"""
+    try:
+        run_main()
+    except KeyboardInterrupt:
+        print("\n👋 Dihentikan (Ctrl-C)\n")
+        sys.exit(130)
+
+
+def run_main():
+    """Pilih mode dari argv (atau tanya), lalu jalankan"""
     print_banner()
     
     if len(sys.argv) > 1:
@@ -171,7 +297,11 @@ def main():
         mode = input("Choose mode (cli/api): ").strip().lower()
     
     if mode == "cli":
-        asyncio.run(run_cli_mode())
+        args = parse_cli_args(sys.argv[2:])
+        if args.batch:
+            asyncio.run(run_cli_batch(args.batch, concurrency=args.concurrency))
+        else:
+            asyncio.run(run_cli_mode())
     elif mode == "api":
         if len(sys.argv) > 2 and sys.argv[2] == "--reload":
             run_api_mode_reload()
@@ -1,5 +1,9 @@
+from .attachments import Attachment
 from .client import Client
 from .emailnator import Emailnator
+from .history import ConversationHistory
 from .labs import LabsClient
+from .pool import ClientPool, PoolExhaustedError, is_quota_error
+from .provisioner import AccountProvisioner
 
-__all__ = ['Client', 'Emailnator', 'LabsClient']
\ No newline at end of file
+__all__ = ['AccountProvisioner', 'Attachment', 'Client', 'ClientPool', 'ConversationHistory', 'Emailnator', 'LabsClient', 'PoolExhaustedError', 'is_quota_error']
\ No newline at end of file
@@ -0,0 +1,158 @@
+import io
+import os
+import tempfile
+import mimetypes
+from pathlib import Path
+
+
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+# Ukuran chunk saat menyalin sisa file object (setelah seek) ke file sementara
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Signature beberapa format umum, untuk nama file tanpa ekstensi yang dikenal
+MAGIC_TYPES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'PK\x03\x04', 'application/zip'),
+)
+
+
+def sniff_content_type(head):
+    for magic, content_type in MAGIC_TYPES:
+        if head.startswith(magic):
+            return content_type
+    return None
+
+
+class Attachment:
+    '''
+    Satu file untuk di-upload, tanpa menyalin isi file ke memori jika bisa
+
+    Sumber yang diterima (value di `files` pada Client.search):
+    - str / bytes / bytearray / memoryview: isi file (perilaku lama)
+    - pathlib.Path (os.PathLike): file di disk, di-stream libcurl langsung dari disk
+    - file object (harus seekable): di-upload mulai dari posisi sekarang (f.tell()), lihat _from_file
+
+    size = jumlah byte sebenarnya (bukan sys.getsizeof)
+    close() menghapus file sementara (jika ada) setelah upload
+    '''
+    def __init__(self, filename, source):
+        self.filename = filename
+        self.local_path = None
+        self.data = None
+        self.temp_path = None
+
+        if isinstance(source, os.PathLike):
+            self.local_path = os.fspath(source)
+            self.size = os.path.getsize(self.local_path)
+        elif isinstance(source, str):
+            self.data = source.encode('utf-8')
+            self.size = len(self.data)
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            self.data = bytes(source)
+            self.size = len(self.data)
+        elif hasattr(source, 'read'):
+            self._from_file(source)
+        else:
+            raise TypeError(f'Unsupported attachment type for {filename}: {type(source).__name__}')
+
+        self.content_type = mimetypes.guess_type(filename)[0] or sniff_content_type(self._head()) or DEFAULT_CONTENT_TYPE
+
+    def _from_file(self, file):
+        '''
+        File object di-upload dari posisi sekarang, seperti requests/httpx:
+        - file di disk di posisi 0 → local_path (libcurl stream dari disk, tidak dibaca ke memori)
+        - file di disk setelah seek, atau fd tanpa nama → sisa file disalin per chunk ke file sementara
+        - in-memory (BytesIO, StringIO, dll) → sisa isi dibaca
+        Object tidak seekable (pipe, socket) ditolak: ukuran harus diketahui sebelum create_upload_url
+        '''
+        try:
+            seekable = file.seekable()
+        except (AttributeError, ValueError):
+            seekable = False
+        if not seekable:
+            raise TypeError(f'Attachment {self.filename}: file object must be seekable (read it into bytes first)')
+
+        position = file.tell()
+        path = self._file_path(file)
+        if path is not None and position == 0:
+            self.local_path = path
+            self.size = os.path.getsize(path)
+        elif path is not None or self._has_fileno(file):
+            self.local_path = self.temp_path = self._copy_rest(file)
+            self.size = os.path.getsize(self.temp_path)
+        else:
+            self.data = file.read()
+            if isinstance(self.data, str):
+                self.data = self.data.encode('utf-8')
+            self.size = len(self.data)
+
+    @staticmethod
+    def _file_path(file):
+        '''
+        Path di disk untuk file object: `name`, hanya jika masih menunjuk ke file yang sama dengan fd-nya
+        '''
+        name = getattr(file, 'name', None)
+        if not isinstance(name, (str, bytes, Path)) or not os.path.isfile(name):
+            return None
+        try:
+            if not os.path.samestat(os.fstat(file.fileno()), os.stat(name)):
+                return None
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return None
+        return os.fsdecode(name)
+
+    @staticmethod
+    def _has_fileno(file):
+        try:
+            file.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return False
+        return True
+
+    @staticmethod
+    def _copy_rest(file):
+        '''
+        Salin sisa file (dari posisi sekarang) per chunk ke file sementara, return path-nya
+        '''
+        fd, temp_path = tempfile.mkstemp(prefix='pplx-upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = file.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return temp_path
+
+    def close(self):
+        '''
+        Hapus file sementara (dari _copy_rest)
+        '''
+        if self.temp_path is not None:
+            try:
+                os.unlink(self.temp_path)
+            except OSError:
+                pass
+            self.temp_path = None
+
+    def _head(self, size=16):
+        if self.data is not None:
+            return self.data[:size]
+        with open(self.local_path, 'rb') as f:
+            return f.read(size)
+
+    def addpart(self, mp, name='file'):
+        '''
+        Tambahkan ke CurlMime: dari disk via local_path (libcurl membaca per chunk saat upload)
+        '''
+        if self.local_path is not None:
+            mp.addpart(name=name, content_type=self.content_type, filename=self.filename, local_path=self.local_path)
+        else:
+            mp.addpart(name=name, content_type=self.content_type, filename=self.filename, data=self.data)
@@ -1,16 +1,53 @@
 import re
-import sys
 import json
 import random
 import asyncio
-import mimetypes
 from uuid import uuid4
-from curl_cffi import requests, CurlMime
+from curl_cffi import requests, CurlMime, CurlHttpVersion
 
+try:
+    # Decoder lebih cepat jika tersedia (opsional)
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
+
+from .attachments import Attachment
 from .emailnator import Emailnator
 
 
+MESSAGE_PREFIX = b'event: message\r\n'
+DATA_PREFIX = b'event: message\r\ndata: '
+END_OF_STREAM_PREFIX = b'event: end_of_stream\r\n'
+
+
+def decode_message(frame):
+    '''
+    Decode satu frame `event: message` (bytes) + field `text` yang berisi JSON string
+    '''
+    content_json = json_loads(frame[len(DATA_PREFIX):])
+    try:
+        if content_json.get('text'):
+            content_json['text'] = json_loads(content_json['text'])
+    except (ValueError, TypeError):
+        pass
+    return content_json
+
+
+async def read_final_message(lines):
+    '''
+    Non-stream: simpan hanya frame mentah terakhir, decode sekali di akhir
+    Return None jika stream terputus sebelum end_of_stream
+    '''
+    last_frame = None
+    async for chunk in lines:
+        if chunk.startswith(MESSAGE_PREFIX):
+            last_frame = chunk
+        elif chunk.startswith(END_OF_STREAM_PREFIX):
+            return decode_message(last_frame) if last_frame is not None else {}
+    return None
+
+
 
 class AsyncMixin:
     def __init__(self, *args, **kwargs):
@@ -35,7 +72,8 @@ class Client(AsyncMixin):
     '''
     A client for interacting with the Perplexity AI API.
     '''
-    async def __ainit__(self, cookies={}):
+    async def __ainit__(self, cookies={}, base_url='https://www.perplexity.ai'):
+        self.base_url = base_url.rstrip('/')
         self.session = requests.AsyncSession(headers={
             'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
             'accept-language': 'en-US,en;q=0.9',
@@ -57,23 +95,27 @@ class Client(AsyncMixin):
             'sec-fetch-user': '?1',
             'upgrade-insecure-requests': '1',
             'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36',
-        }, cookies=cookies, impersonate='chrome')
+        }, cookies=cookies, impersonate='chrome',
+            # Plain http (fake server lokal): jangan minta upgrade h2c, body POST bisa hilang
+            http_version=CurlHttpVersion.V1_1 if self.base_url.startswith('http://') else None)
         self.own = bool(cookies)
         self.copilot = 0 if not cookies else float('inf')
         self.file_upload = 0 if not cookies else float('inf')
         self.signin_regex = re.compile(r'"(https://www\.perplexity\.ai/api/auth/callback/email\?callbackUrl=.*?)"')
         self.timestamp = format(random.getrandbits(32), '08x')
-        await self.session.get('https://www.perplexity.ai/api/auth/session')
+        await self.session.get(f'{self.base_url}/api/auth/session')
     
-    async def create_account(self, cookies):
+    async def create_account(self, cookies, max_attempts=3, email_timeout=20):
         '''
         Function to create a new account
+        Maksimal max_attempts percobaan (email baru tiap percobaan), raise jika semua gagal
         '''
-        while True:
+        last_error = None
+        for attempt in range(max_attempts):
             try:
                 emailnator_cli = await Emailnator(cookies)
                 
-                resp = await self.session.post('https://www.perplexity.ai/api/auth/signin/email', data={
+                resp = await self.session.post(f'{self.base_url}/api/auth/signin/email', data={
                     'email': emailnator_cli.email,
                     'csrfToken': self.session.cookies.get_dict()['next-auth.csrf-token'].split('%')[0],
                     'callbackUrl': 'https://www.perplexity.ai/',
@@ -81,15 +123,23 @@ class Client(AsyncMixin):
                 })
                 
                 if resp.ok:
-                    new_msgs = await emailnator_cli.reload(wait_for=lambda x: x['subject'] == 'Sign in to Perplexity', timeout=20)
+                    new_msgs = await emailnator_cli.reload(wait_for=lambda x: x['subject'] == 'Sign in to Perplexity', timeout=email_timeout)
                     
                     if new_msgs:
                         break
+                    last_error = TimeoutError(f'No sign-in email within {email_timeout}s')
                 else:
-                    print('Perplexity account creating error:', resp)
+                    last_error = Exception(f'Perplexity account creating error: {resp.status_code}')
             
-            except Exception:
-                pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                last_error = error
+            
+            if attempt + 1 < max_attempts:
+                await asyncio.sleep(min(2 ** attempt, 10))
+        else:
+            raise Exception(f'Perplexity account creation failed after {max_attempts} attempts: {last_error}')
         
         msg = emailnator_cli.get(func=lambda x: x['subject'] == 'Sign in to Perplexity')
         new_account_link = self.signin_regex.search(await emailnator_cli.open(msg['messageID'])).group(1)
@@ -101,9 +151,102 @@ class Client(AsyncMixin):
         
         return True
     
-    async def search(self, query, mode='auto', model=None, sources=['web'], files={}, stream=False, language='en-US', follow_up=None, incognito=False):
+    async def upload_file(self, filename, file, timeout=None):
+        '''
+        Upload satu file: minta upload URL lalu POST multipart ke S3, return URL attachment
+        file: isi (str/bytes), pathlib.Path, atau file object (lihat Attachment)
+        '''
+        if not isinstance(file, Attachment):
+            attachment = Attachment(filename, file)
+            try:
+                return await self.upload_file(filename, attachment, timeout=timeout)
+            finally:
+                attachment.close()
+        attachment = file
+        file_upload_info = (await self.session.post(
+            f'{self.base_url}/rest/uploads/create_upload_url?version=2.18&source=default',
+            json={
+                'content_type': attachment.content_type,
+                'file_size': attachment.size,
+                'filename': filename,
+                'force_image': False,
+                'source': 'default',
+            },
+            timeout=timeout
+        )).json()
+
+        mp = CurlMime()
+        try:
+            for key, value in file_upload_info['fields'].items():
+                mp.addpart(name=key, data=value)
+            attachment.addpart(mp)
+
+            upload_resp = await self.session.post(file_upload_info['s3_bucket_url'], multipart=mp, timeout=timeout)
+        finally:
+            mp.close()
+
+        if not upload_resp.ok:
+            raise Exception('File upload error', upload_resp)
+
+        if 'image/upload' in file_upload_info['s3_object_url']:
+            return re.sub(
+                r'/private/s--.*?--/v\d+/user_uploads/',
+                '/private/user_uploads/',
+                upload_resp.json()['secure_url']
+            )
+        return file_upload_info['s3_object_url']
+
+    async def _upload_files(self, files, timeout=None, concurrency=4):
+        '''
+        Upload paralel (maksimal `concurrency` sekaligus), urutan hasil = urutan `files`
+        Upload pertama yang gagal membatalkan sisanya dan error-nya di-raise
+        '''
+        # Validasi + ukuran semua file dulu, sebelum ada request upload
+        attachments = {}
+        try:
+            for filename, file in files.items():
+                attachments[filename] = Attachment(filename, file)
+            return await self._upload_attachments(attachments, timeout=timeout, concurrency=concurrency)
+        finally:
+            for attachment in attachments.values():
+                attachment.close()
+
+    async def _upload_attachments(self, attachments, timeout=None, concurrency=4):
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def bounded(filename, file):
+            async with semaphore:
+                return await self.upload_file(filename, file, timeout=timeout)
+
+        tasks = [asyncio.create_task(bounded(filename, attachment)) for filename, attachment in attachments.items()]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            # Tunggu upload berhenti sebelum file sementara dihapus
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        if pending:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception():
+                raise task.exception()
+        return [task.result() for task in tasks]
+
+    async def search(self, query, mode='auto', model=None, sources=['web'], files={}, stream=False, language='en-US', follow_up=None, incognito=False, timeout=None, upload_concurrency=4):
         '''
         Query function
+
+        timeout: batas waktu (detik) per HTTP request, None = tanpa batas
+        files: {filename: isi str/bytes | pathlib.Path | file object}; path & file di disk
+               di-stream langsung dari disk, tidak dibaca ke memori; file object di-upload
+               dari posisi sekarang (f.tell()) dan harus seekable
+        upload_concurrency: jumlah upload file yang berjalan bersamaan
         '''
         assert mode in ['auto', 'pro', 'reasoning', 'deep research'], 'Search modes -> ["auto", "pro", "reasoning", "deep research"]'
         assert model in {
@@ -125,41 +268,7 @@ class Client(AsyncMixin):
         self.copilot = self.copilot - 1 if mode in ['pro', 'reasoning', 'deep research'] else self.copilot
         self.file_upload = self.file_upload - len(files) if files else self.file_upload
 
-        uploaded_files = []
-
-        for filename, file in files.items():
-            file_type = mimetypes.guess_type(filename)[0]
-            file_upload_info = (await self.session.post(
-                'https://www.perplexity.ai/rest/uploads/create_upload_url?version=2.18&source=default',
-                json={
-                    'content_type': file_type,
-                    'file_size': sys.getsizeof(file),
-                    'filename': filename,
-                    'force_image': False,
-                    'source': 'default',
-                }
-            )).json()
-
-            mp = CurlMime()
-            for key, value in file_upload_info['fields'].items():
-                mp.addpart(name=key, data=value)
-            mp.addpart(name='file', content_type=file_type, filename=filename, data=file)
-
-            upload_resp = await self.session.post(file_upload_info['s3_bucket_url'], multipart=mp)
-
-            if not upload_resp.ok:
-                raise Exception('File upload error', upload_resp)
-
-            if 'image/upload' in file_upload_info['s3_object_url']:
-                uploaded_url = re.sub(
-                    r'/private/s--.*?--/v\d+/user_uploads/',
-                    '/private/user_uploads/',
-                    upload_resp.json()['secure_url']
-                )
-            else:
-                uploaded_url = file_upload_info['s3_object_url']
-
-            uploaded_files.append(uploaded_url)
+        uploaded_files = await self._upload_files(files, timeout=timeout, concurrency=upload_concurrency) if files else []
 
         json_data = {
             'query_str': query,
@@ -201,43 +310,17 @@ class Client(AsyncMixin):
                 }
             }
 
-        resp = await self.session.post('https://www.perplexity.ai/rest/sse/perplexity_ask', json=json_data, stream=True)
-        chunks = []
+        resp = await self.session.post(f'{self.base_url}/rest/sse/perplexity_ask', json=json_data, stream=True, timeout=timeout)
 
         async def stream_response(resp):
             async for chunk in resp.aiter_lines(delimiter=b'\r\n\r\n'):
-                content = chunk.decode('utf-8')
-
-                if content.startswith('event: message\r\n'):
-                    content_json = json.loads(content[len('event: message\r\ndata: '):])
-                    try:
-                        if content_json.get('text'):
-                            content_json['text'] = json.loads(content_json['text'])
-                    except (json.JSONDecodeError, TypeError):
-                        pass
-                    
-                    chunks.append(content_json)
-                    yield chunks[-1]
+                if chunk.startswith(MESSAGE_PREFIX):
+                    yield decode_message(chunk)
 
-                elif content.startswith('event: end_of_stream\r\n'):
+                elif chunk.startswith(END_OF_STREAM_PREFIX):
                     return
 
         if stream:
             return stream_response(resp)
 
-        async for chunk in resp.aiter_lines(delimiter=b'\r\n\r\n'):
-            content = chunk.decode('utf-8')
-
-            if content.startswith('event: message\r\n'):
-                content_json = json.loads(content[len('event: message\r\ndata: '):])
-
-                try:
-                    if content_json.get('text'):
-                        content_json['text'] = json.loads(content_json['text'])
-                except (json.JSONDecodeError, TypeError):
-                    pass
-                
-                chunks.append(content_json)
-
-            elif content.startswith('event: end_of_stream\r\n'):
-                return chunks[-1] if chunks else {}
+        return await read_final_message(resp.aiter_lines(delimiter=b'\r\n\r\n'))
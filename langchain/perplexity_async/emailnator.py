@@ -25,9 +25,11 @@ class AsyncMixin:
         return self.__initobj().__await__()
 
 class Emailnator(AsyncMixin):
-    async def __ainit__(self, cookies, headers={}, domain=False, plus=False, dot=False, google_mail=True):
+    async def __ainit__(self, cookies, headers={}, domain=False, plus=False, dot=False, google_mail=True, max_attempts=5):
         self.inbox = []
-        self.inbox_ads = []
+        # messageID yang sudah dilihat (iklan + inbox), untuk dedup O(1)
+        self.inbox_ads = set()
+        self.seen_ids = set()
         
         if not headers:
             headers = {
@@ -68,38 +70,54 @@ class Emailnator(AsyncMixin):
         if google_mail:
             data['email'].append('googleMail')
         
-        while True:
+        for attempt in range(max_attempts):
             resp = (await self.s.post('https://www.emailnator.com/generate-email', json=data)).json()
             
             if 'email' in resp:
                 break
+            
+            await asyncio.sleep(min(0.5 * 2 ** attempt, 5))
+        else:
+            raise Exception(f'Emailnator could not generate an email after {max_attempts} attempts')
         
         self.email = resp['email'][0]
         
         for ads in (await self.s.post('https://www.emailnator.com/message-list', json={'email': self.email})).json()['messageData']:
-            self.inbox_ads.append(ads['messageID'])
+            self.inbox_ads.add(ads['messageID'])
     
-    async def reload(self, wait=False, retry=5, timeout=30, wait_for=None):
+    async def reload(self, wait=False, retry=5, timeout=30, wait_for=None, initial_interval=0.5, backoff=1.5):
+        '''
+        Ambil pesan baru; dengan wait/wait_for, polling adaptif sampai timeout:
+        interval mulai dari initial_interval, dikali backoff, maksimal `retry` detik
+        '''
         self.new_msgs = []
         start = time.time()
         wait_for_found = False
+        interval = initial_interval
         
         while True:
             for msg in (await self.s.post('https://www.emailnator.com/message-list', json={'email': self.email})).json()['messageData']:
-                if msg['messageID'] not in self.inbox_ads and msg not in self.inbox:
-                    self.new_msgs.append(msg)
-                    
-                    if wait_for(msg):
-                        wait_for_found = True
+                msg_id = msg['messageID']
+                if msg_id in self.inbox_ads or msg_id in self.seen_ids:
+                    continue
+                
+                self.seen_ids.add(msg_id)
+                self.new_msgs.append(msg)
+                
+                if wait_for and wait_for(msg):
+                    wait_for_found = True
             
             if (wait and not self.new_msgs) or wait_for:
                 if wait_for_found:
                     break
                 
-                if time.time() - start > timeout:
+                remaining = timeout - (time.time() - start)
+                if remaining <= 0:
+                    self.inbox += self.new_msgs
                     return
                 
-                await asyncio.sleep(retry)
+                await asyncio.sleep(min(interval, remaining))
+                interval = min(interval * backoff, retry)
             else:
                 break
         
@@ -0,0 +1,95 @@
+import inspect
+import logging
+from collections import deque
+
+from core.utils import estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationHistory:
+    '''
+    Riwayat satu percakapan LabsClient, dibatasi jumlah turn dan budget token
+
+    - Satu turn = pesan user + jawaban assistant; hanya turn yang selesai disimpan
+    - Melebihi max_turns / max_tokens → turn paling lama dibuang
+    - summarizer (opsional): callable(turns_dibuang, ringkasan_lama) -> str (boleh async);
+      ringkasannya dikirim sebagai pesan pertama. Tanpa summarizer = truncation saja
+    - Satu objek per user/percakapan: LabsClient.conversation() atau ask(..., history=...)
+    '''
+    def __init__(self, max_turns=10, max_tokens=4000, summarizer=None, count_tokens=estimate_tokens):
+        assert max_turns > 0, 'max_turns must be positive'
+
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summarizer = summarizer
+        self.count_tokens = count_tokens
+        self.turns = deque()
+        self.summary = None
+        self.dropped_turns = 0
+        self.summaries = 0
+
+    def __len__(self):
+        return len(self.turns)
+
+    def messages(self, query=None):
+        '''
+        Pesan untuk payload Labs: [ringkasan] + turn tersimpan (+ pertanyaan baru)
+        '''
+        messages = []
+        if self.summary:
+            messages.append({'role': 'system', 'content': f'Summary of the earlier conversation: {self.summary}'})
+        for user, assistant in self.turns:
+            messages.append({'role': 'user', 'content': user})
+            messages.append({'role': 'assistant', 'content': assistant, 'priority': 0})
+        if query is not None:
+            messages.append({'role': 'user', 'content': query})
+        return messages
+
+    def tokens(self):
+        total = self.count_tokens(self.summary) if self.summary else 0
+        return total + sum(self.count_tokens(user) + self.count_tokens(assistant) for user, assistant in self.turns)
+
+    def _over_budget(self):
+        if len(self.turns) > self.max_turns:
+            return True
+        return self.max_tokens is not None and len(self.turns) > 1 and self.tokens() > self.max_tokens
+
+    async def add_turn(self, query, answer):
+        self.turns.append((query, answer))
+
+        evicted = []
+        while self._over_budget():
+            evicted.append(self.turns.popleft())
+        if not evicted:
+            return
+
+        self.dropped_turns += len(evicted)
+        if self.summarizer is None:
+            return
+
+        try:
+            summary = self.summarizer(evicted, self.summary)
+            if inspect.isawaitable(summary):
+                summary = await summary
+        except Exception as error:
+            logger.warning(f'⚠️ [HISTORY] Summarizer failed ({error}), old turns truncated')
+            return
+
+        self.summary = summary or self.summary
+        self.summaries += 1
+
+    def clear(self):
+        self.turns.clear()
+        self.summary = None
+
+    def stats(self):
+        return {
+            'turns': len(self.turns),
+            'tokens': self.tokens(),
+            'max_turns': self.max_turns,
+            'max_tokens': self.max_tokens,
+            'dropped_turns': self.dropped_turns,
+            'summaries': self.summaries,
+        }
@@ -3,10 +3,20 @@ import json
 import socket
 import random
 import asyncio
+import logging
+from collections import deque
 from threading import Thread
 from curl_cffi import requests
 from websocket import WebSocketApp
 
+from .history import ConversationHistory
+
+
+logger = logging.getLogger(__name__)
+
+# Batas waktu menunggu frame final dari request yang sudah ditinggalkan (detik)
+DRAIN_TIMEOUT = 60
+
 
 class AsyncMixin:
     def __init__(self, *args, **kwargs):
@@ -26,11 +36,32 @@ class AsyncMixin:
     def __await__(self):
         return self.__initobj().__await__()
 
+class AbandonedRequest:
+    '''
+    Pengganti antrian request yang di-cancel/timeout sebelum jawaban final
+    Frame sisa jawaban dibuang dan lock model baru dilepas setelah frame final,
+    supaya tidak bocor ke ask berikutnya dengan model yang sama
+    '''
+    def __init__(self, lock):
+        self.lock = lock
+        self.dropped = 0
+        self.done = False
+    
+    def put_nowait(self, item):
+        self.dropped += 1
+        if isinstance(item, Exception) or item['final']:
+            self.finish()
+    
+    def finish(self):
+        if not self.done:
+            self.done = True
+            self.lock.release()
+
 class LabsClient(AsyncMixin):
     '''
     A client for interacting with the Perplexity AI Labs API.
     '''
-    async def __ainit__(self):
+    async def __ainit__(self, max_turns=10, max_tokens=4000, summarizer=None):
         self.session = requests.AsyncSession(headers={
             'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
             'accept-language': 'en-US,en;q=0.9',
@@ -55,8 +86,7 @@ class LabsClient(AsyncMixin):
         }, impersonate='chrome')
         self.timestamp = format(random.getrandbits(32), '08x')
         self.sid = json.loads((await self.session.get(f'https://www.perplexity.ai/socket.io/?EIO=4&transport=polling&t={self.timestamp}')).text[1:])['sid']
-        self.last_answer = None
-        self.history = []
+        self._setup_dispatch(max_turns=max_turns, max_tokens=max_tokens, summarizer=summarizer)
         
         assert (await self.session.post(f'https://www.perplexity.ai/socket.io/?EIO=4&transport=polling&t={self.timestamp}&sid={self.sid}', data='40{"jwt":"anonymous-ask-user"}')).text == 'OK'
         
@@ -68,75 +98,249 @@ class LabsClient(AsyncMixin):
             url=f'wss://www.perplexity.ai/socket.io/?EIO=4&transport=websocket&sid={self.sid}',
             header={'User-Agent': self.session.headers['User-Agent']},
             cookie='; '.join([f'{key}={value}' for key, value in self.session.cookies.get_dict().items()]),
-            on_open=lambda ws: (ws.send('2probe'), ws.send('5')),
+            on_open=self._on_open,
             on_message=self._on_message,
-            on_error=lambda ws, error: print(f'Websocket Error: {error}'),
+            on_error=self._on_error,
+            on_close=lambda ws, status, reason: self._on_error(ws, ConnectionError(f'Websocket closed: {status} {reason}')),
             socket=self.sock
         )
         
         Thread(target=self.ws.run_forever, daemon=True).start()
         
-        while not (self.ws.sock and self.ws.sock.connected):
-            await asyncio.sleep(0.01)
+        await self._connected
+    
+    def _setup_dispatch(self, **history_options):
+        '''
+        State untuk request yang sedang berjalan (juga dipakai benchmarks.labs_dispatch)
+        '''
+        # Default batas history; history bawaan dipakai ask tanpa history=..., per user pakai conversation()
+        self.history_options = history_options
+        self.history = ConversationHistory(**history_options)
+        # Dipanggil dari thread websocket lewat call_soon_threadsafe, tidak ada polling
+        self.loop = asyncio.get_running_loop()
+        self._connected = self.loop.create_future()
+        # model -> antrian request yang menunggu jawaban (FIFO), dan lock per model
+        self._pending = {}
+        self._model_locks = {}
+        # model -> jumlah ask yang masih menunggu lock (untuk memilih koneksi paling longgar)
+        self._queued = {}
+        self.drain_timeout = DRAIN_TIMEOUT
+        self.closing = False
+    
+    def _on_open(self, ws):
+        ws.send('2probe')
+        ws.send('5')
+        self.loop.call_soon_threadsafe(self._set_connected, None)
+    
+    def _set_connected(self, error):
+        if self._connected.done():
+            return
+        if error is None:
+            self._connected.set_result(True)
+        else:
+            self._connected.set_exception(error)
+    
+    def _on_error(self, ws, error):
+        '''
+        Websocket error/close (thread websocket): gagalkan semua request yang menunggu
+        '''
+        if self.closing:
+            logger.info(f'🔌 [LABS] Websocket closed: {error}')
+        else:
+            logger.error(f'❌ [LABS] Websocket error: {error}')
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self._fail_all, error if isinstance(error, Exception) else ConnectionError(str(error)))
     
     def _on_message(self, ws, message):
         '''
-        Websocket message handler
+        Websocket message handler (thread websocket)
         '''
         if message == '2':
             ws.send('3')
             
         if message.startswith('42'):
-            response = json.loads(message[2:])[1]
+            event, response = json.loads(message[2:])[:2]
             
-            if 'final' in response:
-                self.last_answer = response
+            if isinstance(response, dict) and 'final' in response:
+                self.loop.call_soon_threadsafe(self._dispatch, event, response)
+    
+    def _dispatch(self, event, response):
+        '''
+        Di event loop: kirim update ke request yang sedang menunggu model ini
+        Event jawaban: "<model>_query_progress"
+        '''
+        model = response.get('model') or event.removesuffix('_query_progress')
+        waiting = self._pending.get(model)
+        if not waiting:
+            logger.warning(f'⚠️ [LABS] Frame for {model} without waiting request, dropped')
+            return
+        
+        queue = waiting[0]
+        if response['final']:
+            waiting.popleft()
+            if not waiting:
+                del self._pending[model]
+        queue.put_nowait(response)
+    
+    def _fail_all(self, error):
+        self._set_connected(error)
+        for waiting in self._pending.values():
+            for queue in waiting:
+                queue.put_nowait(error)
+            waiting.clear()
+        self._pending.clear()
+    
+    async def close(self):
+        '''
+        Tutup websocket (thread run_forever ikut selesai) dan session HTTP
+        Aman untuk client yang __ainit__-nya gagal di tengah jalan
+        '''
+        self.closing = True
+        ws = getattr(self, 'ws', None)
+        sock = getattr(self, 'sock', None)
+        try:
+            if ws is not None:
+                # close() mengirim close frame (blocking) → thread
+                await asyncio.to_thread(ws.close)
+            elif sock is not None:
+                sock.close()
+        except Exception as e:
+            logger.warning(f'⚠️ [LABS] Closing websocket failed: {e}')
+        session = getattr(self, 'session', None)
+        if session is not None:
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f'⚠️ [LABS] Closing session failed: {e}')
+    
+    def conversation(self, **options):
+        '''
+        History baru untuk satu user/percakapan (default batas dari client)
+        '''
+        return ConversationHistory(**{**self.history_options, **options})
+    
+    def load(self, model):
+        '''
+        Jumlah ask untuk model ini yang sedang berjalan/menunggu di koneksi ini
+        '''
+        lock = self._model_locks.get(model)
+        return self._queued.get(model, 0) + (1 if lock is not None and lock.locked() else 0)
     
-    async def ask(self, query, model='r1-1776', stream=False):
+    async def ask(self, query, model='r1-1776', stream=False, history=None, timeout=None):
         '''
         Query function
+        Beberapa ask boleh berjalan bersamaan: tiap request punya antrian sendiri.
+        Jawaban server hanya ditandai nama model, jadi ask dengan model yang sama
+        diantrikan, model berbeda berjalan paralel di websocket yang sama.
+        history: ConversationHistory percakapan ini (default self.history);
+        turn disimpan setelah jawaban final
+        timeout: batas waktu jawaban (detik), dihitung setelah lock model didapat
+        (waktu antri di belakang ask lain tidak ikut dihitung) → asyncio.TimeoutError
         '''
         assert model in ['r1-1776', 'sonar-pro', 'sonar', 'sonar-reasoning-pro', 'sonar-reasoning'], 'Search models -> ["r1-1776", "sonar-pro", "sonar", "sonar-reasoning-pro", "sonar-reasoning"]'
         
-        self.last_answer = None
-        self.history.append({'role': 'user', 'content': query})
+        lock = self._model_locks.setdefault(model, asyncio.Lock())
+        self._queued[model] = self._queued.get(model, 0) + 1
+        try:
+            await lock.acquire()
+        finally:
+            self._queued[model] -= 1
+        
+        deadline = None if timeout is None else self.loop.time() + timeout
+        queue = asyncio.Queue()
+        self._pending.setdefault(model, deque()).append(queue)
+        history = self.history if history is None else history
+        
+        try:
+            self.ws.send('42' + json.dumps([
+                'perplexity_labs',
+                {
+                    'messages': history.messages(query),
+                    'model': model,
+                    'source': 'default',
+                    'version': '2.18',
+                }
+            ]))
+        except BaseException:
+            # Belum terkirim: tidak ada frame yang perlu dibuang
+            self._release(model, queue, lock, drain=False)
+            raise
         
-        self.ws.send('42' + json.dumps([
-            'perplexity_labs',
-            {
-                'messages': self.history,
-                'model': model,
-                'source': 'default',
-                'version': '2.18',
-            }
-        ]))
+        try:
+            first = await self._next(queue, deadline)
+        except BaseException:
+            self._release(model, queue, lock)
+            raise
         
         async def stream_response(self):
-            answer = None
-            
-            while True:
-                if self.last_answer != answer:
-                    answer = self.last_answer
+            answer = first
+            try:
+                while True:
                     yield answer
-                
-                if self.last_answer['final']:
-                    answer = self.last_answer
-                    self.last_answer = None
-                    self.history.append({'role': 'assistant', 'content': answer['output'], 'priority': 0})
                     
-                    return
-                
-                await asyncio.sleep(0.01)
+                    if answer['final']:
+                        await history.add_turn(query, answer['output'])
+                        return
+                    
+                    answer = await self._next(queue, deadline)
+            finally:
+                self._release(model, queue, lock)
         
-        while True:
-            if self.last_answer and stream:
-                return stream_response(self)
-            
-            elif self.last_answer and self.last_answer['final']:
-                answer = self.last_answer
-                self.last_answer = None
-                self.history.append({'role': 'assistant', 'content': answer['output'], 'priority': 0})
-                
-                return answer
-            
-            await asyncio.sleep(0.01)
\ No newline at end of file
+        if stream:
+            return stream_response(self)
+        
+        try:
+            answer = first
+            while not answer['final']:
+                answer = await self._next(queue, deadline)
+        finally:
+            self._release(model, queue, lock)
+        
+        await history.add_turn(query, answer['output'])
+        return answer
+    
+    async def _next(self, queue, deadline=None):
+        if deadline is None:
+            item = await queue.get()
+        else:
+            item = await asyncio.wait_for(queue.get(), max(deadline - self.loop.time(), 0))
+        if isinstance(item, Exception):
+            raise item
+        return item
+    
+    def _release(self, model, queue, lock, drain=True):
+        '''
+        Selesai/ditinggalkan: jika jawaban final belum datang (cancel/timeout),
+        antrian diganti AbandonedRequest yang memegang lock sampai frame final
+        '''
+        waiting = self._pending.get(model)
+        if not waiting or queue not in waiting:
+            lock.release()
+            return
+        
+        if not drain:
+            waiting.remove(queue)
+            if not waiting:
+                del self._pending[model]
+            lock.release()
+            return
+        
+        sink = AbandonedRequest(lock)
+        waiting[waiting.index(queue)] = sink
+        self.loop.call_later(self.drain_timeout, self._expire, model, sink)
+        logger.info(f'🧹 [LABS] {model} request abandoned, draining until final frame')
+    
+    def _expire(self, model, sink):
+        '''
+        Frame final request yang ditinggalkan tidak pernah datang: lepas lock model
+        '''
+        if sink.done:
+            return
+        waiting = self._pending.get(model)
+        if waiting and sink in waiting:
+            waiting.remove(sink)
+            if not waiting:
+                del self._pending[model]
+        logger.warning(f'⚠️ [LABS] {model} final frame not received in {self.drain_timeout}s, releasing model')
+        sink.finish()
\ No newline at end of file
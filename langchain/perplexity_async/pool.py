@@ -0,0 +1,231 @@
+import re
+import time
+import asyncio
+import logging
+import itertools
+
+from .client import AsyncMixin, Client
+
+
+logger = logging.getLogger(__name__)
+
+PRO_MODES = ('pro', 'reasoning', 'deep research')
+QUOTA_ERROR = re.compile(r'enhanced|quota|rate.?limit|limit reached|too many requests|\b429\b', re.IGNORECASE)
+
+
+class PoolExhaustedError(Exception):
+    '''
+    Tidak ada akun di pool yang bisa melayani mode ini
+    '''
+
+
+def is_quota_error(error):
+    '''
+    Kuota akun habis (assert kuota di Client.search atau error rate/quota dari server)
+    '''
+    if isinstance(error, AssertionError) and 'queries' in str(error):
+        return True
+    return bool(QUOTA_ERROR.search(str(error)))
+
+
+async def close_clients(clients):
+    '''
+    Tutup session HTTP client, termasuk yang __ainit__-nya gagal di tengah jalan
+    '''
+    for client in clients:
+        session = getattr(client, 'session', None)
+        if session is not None:
+            try:
+                await session.close()
+            except Exception as e:
+                logger.warning(f'⚠️ [POOL] Closing session failed: {e}')
+
+
+class PoolMember:
+    '''
+    Satu akun (Client) di pool + state dispatch-nya
+    '''
+    def __init__(self, name, client):
+        self.name = name
+        self.client = client
+        self.inflight = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.pro_requests = 0
+        self.evictions = 0
+        # Waktu (monotonic) kapan akun / kuota pro boleh dicoba lagi
+        self.evicted_until = 0.0
+        self.pro_blocked_until = 0.0
+
+    def available(self, mode, now):
+        if now < self.evicted_until:
+            return False
+        if mode in PRO_MODES:
+            return now >= self.pro_blocked_until and self.client.copilot > 0
+        return True
+
+    def stats(self, now):
+        return {
+            'inflight': self.inflight,
+            'requests': self.requests,
+            'errors': self.errors,
+            'pro_requests': self.pro_requests,
+            'evictions': self.evictions,
+            'evicted_for_s': round(max(self.evicted_until - now, 0.0), 1),
+            'pro_blocked_for_s': round(max(self.pro_blocked_until - now, 0.0), 1),
+        }
+
+
+class ClientPool(AsyncMixin):
+    '''
+    Pool Client Perplexity (satu per akun/cookie set) dengan interface search() yang sama
+
+    - strategy: 'least_loaded' (in-flight paling sedikit) atau 'round_robin'
+    - Kuota pro habis → akun tidak dipakai untuk mode pro selama reprobe_seconds,
+      lalu request pro berikutnya menjadi probe
+    - Error beruntun (max_consecutive_errors) → akun di-evict dari semua mode
+    - Pemilihan akun + reservasi slot tanpa await di antaranya, jadi atomic di event loop
+    - provisioner (opsional, AccountProvisioner): saat tidak ada akun yang bisa pro,
+      akun baru yang sudah disiapkan di background langsung dipakai; akun sementara
+      yang kuotanya habis dibuang dari pool
+    '''
+    async def __ainit__(self, cookie_sets, base_url='https://www.perplexity.ai', strategy='least_loaded', reprobe_seconds=600, max_consecutive_errors=3, provisioner=None):
+        assert strategy in ('least_loaded', 'round_robin'), 'Strategy -> ["least_loaded", "round_robin"]'
+        assert cookie_sets, 'ClientPool needs at least one cookie set'
+
+        self.strategy = strategy
+        self.reprobe_seconds = reprobe_seconds
+        self.max_consecutive_errors = max_consecutive_errors
+        self._rotation = itertools.count()
+        self.provisioner = provisioner
+        self._provisioned_index = itertools.count()
+        self.adopted = 0
+        self.retired = 0
+
+        # Init semua session paralel; satu akun gagal → session yang sudah terbuka ditutup lagi
+        pending = [Client(cookies, base_url=base_url) for cookies in cookie_sets]
+        try:
+            clients = await asyncio.gather(*pending, return_exceptions=True)
+        except BaseException:
+            await close_clients(pending)
+            raise
+        errors = [result for result in clients if isinstance(result, BaseException)]
+        if errors:
+            await close_clients(pending)
+            raise errors[0]
+        self.members = [PoolMember(f'account-{index}', client) for index, client in enumerate(clients)]
+        logger.info(f'✅ Perplexity pool ready ({len(self.members)} accounts, {strategy})')
+
+    async def close(self):
+        '''
+        Tutup session semua akun di pool (shutdown / init attempt yang gagal)
+        '''
+        await close_clients([member.client for member in self.members])
+        self.members = []
+
+    def pro_available(self):
+        '''
+        True jika minimal satu akun masih punya kuota pro
+        '''
+        now = time.monotonic()
+        if any(member.available('pro', now) for member in self.members):
+            return True
+        return bool(self.provisioner and self.provisioner.ready())
+
+    def _adopt_provisioned(self):
+        '''
+        Ganti akun sementara yang kuota pro-nya habis dengan akun dari provisioner
+        '''
+        client = self.provisioner.take_nowait() if self.provisioner else None
+        if client is None:
+            return None
+
+        retired = [m for m in self.members if not m.client.own and m.client.copilot <= 0 and m.inflight == 0]
+        for member in retired:
+            self.members.remove(member)
+            asyncio.ensure_future(member.client.session.close())
+        self.retired += len(retired)
+
+        member = PoolMember(f'provisioned-{next(self._provisioned_index)}', client)
+        self.members.append(member)
+        self.adopted += 1
+        logger.info(f'✅ [POOL] Adopted {member.name} from provisioner ({len(retired)} exhausted retired)')
+        return member
+
+    def _pick(self, mode, exclude=()):
+        now = time.monotonic()
+        candidates = [m for m in self.members if m not in exclude and m.available(mode, now)]
+        if not candidates and mode in PRO_MODES:
+            adopted = self._adopt_provisioned()
+            if adopted is not None:
+                candidates = [adopted]
+        if not candidates:
+            raise PoolExhaustedError(f'No Perplexity account available for {mode} mode')
+
+        if self.strategy == 'round_robin':
+            member = candidates[next(self._rotation) % len(candidates)]
+        else:
+            member = min(candidates, key=lambda m: (m.inflight, m.requests))
+
+        member.inflight += 1
+        member.requests += 1
+        if mode in PRO_MODES:
+            member.pro_requests += 1
+        return member
+
+    def _record_failure(self, member, mode, error):
+        member.errors += 1
+        now = time.monotonic()
+
+        if is_quota_error(error):
+            if mode in PRO_MODES:
+                member.pro_blocked_until = now + self.reprobe_seconds
+                logger.warning(f'⚠️ [POOL] {member.name} pro quota exhausted, re-probe in {self.reprobe_seconds}s')
+            else:
+                member.evicted_until = now + self.reprobe_seconds
+                member.evictions += 1
+                logger.warning(f'⚠️ [POOL] {member.name} rate limited, evicted for {self.reprobe_seconds}s')
+            return
+
+        member.consecutive_errors += 1
+        if member.consecutive_errors >= self.max_consecutive_errors:
+            member.evicted_until = now + self.reprobe_seconds
+            member.evictions += 1
+            member.consecutive_errors = 0
+            logger.warning(f'🔴 [POOL] {member.name} evicted after {self.max_consecutive_errors} errors, re-probe in {self.reprobe_seconds}s')
+
+    async def search(self, query, mode='auto', **kwargs):
+        '''
+        Sama seperti Client.search; kuota habis di satu akun → coba akun berikutnya
+        '''
+        tried = []
+        while True:
+            member = self._pick(mode, exclude=tried)
+            tried.append(member)
+            try:
+                resp = await member.client.search(query, mode=mode, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self._record_failure(member, mode, error)
+                if is_quota_error(error):
+                    continue
+                raise
+            finally:
+                member.inflight -= 1
+
+            member.consecutive_errors = 0
+            return resp
+
+    def stats(self):
+        now = time.monotonic()
+        return {
+            'strategy': self.strategy,
+            'accounts': len(self.members),
+            'pro_available': self.pro_available(),
+            'adopted': self.adopted,
+            'retired': self.retired,
+            'provisioner': self.provisioner.stats() if self.provisioner else None,
+            'members': {member.name: member.stats(now) for member in self.members},
+        }
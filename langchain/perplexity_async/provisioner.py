@@ -0,0 +1,151 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+from .client import Client
+
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class AccountProvisioner:
+    '''
+    Siapkan akun Perplexity baru (Emailnator) di background, jadi request tidak
+    pernah menunggu pembuatan akun (~puluhan detik) di hot path
+
+    - warm_size: jumlah akun siap pakai yang dijaga
+    - Gagal beruntun → jeda refill dengan backoff (maksimal max_backoff detik)
+    - take_nowait(): ambil akun siap tanpa menunggu (None jika kosong)
+    - acquire(timeout): tunggu akun berikutnya
+    '''
+    def __init__(self, emailnator_cookies, base_url='https://www.perplexity.ai', warm_size=2, max_attempts=3, max_backoff=300, history=100):
+        assert warm_size > 0, 'warm_size must be positive'
+
+        self.emailnator_cookies = emailnator_cookies
+        self.base_url = base_url
+        self.warm_size = warm_size
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+
+        self._ready = deque()
+        self._available = asyncio.Condition()
+        self._task = None
+        self._durations = deque(maxlen=history)
+        self.provisioned = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.taken = 0
+        self.last_error = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refill_loop())
+            logger.info(f'✅ Perplexity account provisioner started (warm_size={self.warm_size})')
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._ready:
+            await self._ready.popleft().session.close()
+
+    async def _provision_one(self):
+        start = time.monotonic()
+        client = await Client(base_url=self.base_url)
+        try:
+            await client.create_account(self.emailnator_cookies, max_attempts=self.max_attempts)
+        except BaseException:
+            await client.session.close()
+            raise
+        self._durations.append(time.monotonic() - start)
+        return client
+
+    async def _refill_loop(self):
+        while True:
+            if len(self._ready) >= self.warm_size:
+                async with self._available:
+                    await self._available.wait_for(lambda: len(self._ready) < self.warm_size)
+                continue
+
+            try:
+                client = await self._provision_one()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = str(error)[:200]
+                delay = min(2 ** self.consecutive_failures, self.max_backoff)
+                logger.warning(f'⚠️ [PROVISIONER] Account creation failed ({error}), retry in {delay}s')
+                await asyncio.sleep(delay)
+                continue
+
+            self.provisioned += 1
+            self.consecutive_failures = 0
+            async with self._available:
+                self._ready.append(client)
+                self._available.notify_all()
+            logger.info(f'✅ [PROVISIONER] Account ready in {self._durations[-1]:.1f}s ({len(self._ready)}/{self.warm_size} warm)')
+
+    def ready(self):
+        return len(self._ready)
+
+    def take_nowait(self):
+        '''
+        Akun siap pakai atau None; refill loop dibangunkan untuk mengganti
+        '''
+        if not self._ready:
+            return None
+        client = self._ready.popleft()
+        self.taken += 1
+        asyncio.ensure_future(self._wake())
+        return client
+
+    async def _wake(self):
+        async with self._available:
+            self._available.notify_all()
+
+    async def acquire(self, timeout=None):
+        '''
+        Tunggu sampai ada akun siap (raise asyncio.TimeoutError setelah timeout)
+        '''
+        async def wait_ready():
+            async with self._available:
+                await self._available.wait_for(lambda: self._ready)
+
+        while True:
+            client = self.take_nowait()
+            if client is not None:
+                return client
+            await asyncio.wait_for(wait_ready(), timeout)
+
+    def stats(self):
+        durations = list(self._durations)
+        return {
+            'warm_size': self.warm_size,
+            'ready': len(self._ready),
+            'running': self._task is not None and not self._task.done(),
+            'provisioned': self.provisioned,
+            'taken': self.taken,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+            'provision_time_s': {
+                'p50': round(_percentile(durations, 0.5), 2),
+                'p95': round(_percentile(durations, 0.95), 2),
+                'max': round(max(durations), 2) if durations else 0.0,
+            },
+        }
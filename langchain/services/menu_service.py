@@ -3,21 +3,32 @@
 Menu Service Layer - Simplified
 Uses existing MenuCacheManager from config/database.py
 """
+import asyncio
 import logging
-from typing import List, Dict
+from typing import TYPE_CHECKING, List, Dict
 from datetime import datetime
-from supabase import Client as SupabaseClient
+
+if TYPE_CHECKING:
+    from supabase import Client as SupabaseClient
 
 logger = logging.getLogger(__name__)
 
 class MenuService:
     """Service layer for menu operations"""
     
-    def __init__(self, supabase: SupabaseClient, cache_manager=None):
+    def __init__(self, supabase: "SupabaseClient", cache_manager=None):
         self.supabase = supabase
         self.table = "menu_items"
         self.cache_manager = cache_manager  # MenuCacheManager instance
     
+    async def _execute(self, query):
+        """Jalankan query supabase (sync) di thread supaya bisa di-timeout/cancel dari event loop"""
+        return await asyncio.to_thread(query.execute)
+    
+    async def _refresh_cache(self):
+        """Refresh cache (sync) di thread"""
+        await asyncio.to_thread(self.cache_manager.refresh_cache)
+    
     async def create_item(self, item_data: Dict) -> Dict:
         """
         Create new menu item
@@ -34,7 +45,7 @@ class MenuService:
                 item_data['is_available'] = True
             
             # Insert to database
-            response = self.supabase.table(self.table).insert(item_data).execute()
+            response = await self._execute(self.supabase.table(self.table).insert(item_data))
             
             if response.data:
                 created_item = response.data[0]
@@ -42,7 +53,7 @@ class MenuService:
                 
                 # Refresh cache menggunakan method yang sudah ada
                 if self.cache_manager:
-                    self.cache_manager.refresh_cache()
+                    await self._refresh_cache()
                     logger.info("🔄 Cache auto-refreshed after create")
                 
                 return created_item
@@ -79,15 +90,16 @@ class MenuService:
             
             # 🔄 Cache miss - query database
             logger.info("📊 Cache MISS: Querying database...")
-            response = self.supabase.table(self.table)\
-                .select("*")\
-                .order("category")\
-                .order("name")\
-                .execute()
+            response = await self._execute(
+                self.supabase.table(self.table)
+                .select("*")
+                .order("category")
+                .order("name")
+            )
             
             # Refresh cache jika ada data
             if self.cache_manager and response.data:
-                self.cache_manager.refresh_cache()
+                await self._refresh_cache()
                 logger.info("🔄 Cache refreshed from database")
             
             logger.info(f"📋 Retrieved {len(response.data)} items from database")
@@ -112,10 +124,11 @@ class MenuService:
             }
             
             # Update database
-            response = self.supabase.table(self.table)\
-                .update(update_data)\
-                .eq("id", item_id)\
-                .execute()
+            response = await self._execute(
+                self.supabase.table(self.table)
+                .update(update_data)
+                .eq("id", item_id)
+            )
             
             if response.data:
                 updated_item = response.data[0]
@@ -124,7 +137,7 @@ class MenuService:
                 
                 # Refresh cache menggunakan method yang sudah ada
                 if self.cache_manager:
-                    self.cache_manager.refresh_cache()
+                    await self._refresh_cache()
                     logger.info("🔄 Cache auto-refreshed after update")
                 
                 return updated_item
@@ -154,10 +167,11 @@ class MenuService:
             }
             
             # Update all items in database
-            response = self.supabase.table(self.table)\
-                .update(update_data)\
-                .in_("id", item_ids)\
-                .execute()
+            response = await self._execute(
+                self.supabase.table(self.table)
+                .update(update_data)
+                .in_("id", item_ids)
+            )
             
             if response.data:
                 status = "AVAILABLE ✅" if is_available else "SOLD OUT ❌"
@@ -166,7 +180,7 @@ class MenuService:
                 
                 # Refresh cache after bulk update
                 if self.cache_manager:
-                    self.cache_manager.refresh_cache()
+                    await self._refresh_cache()
                     logger.info("🔄 Cache auto-refreshed after bulk update")
                 
                 return response.data
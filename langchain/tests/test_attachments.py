@@ -0,0 +1,67 @@
+"""Attachment: file object di-upload dari posisi sekarang, tanpa /proc/self/fd"""
+
+import io
+import os
+import tempfile
+
+import pytest
+
+from perplexity_async import Attachment
+
+
+@pytest.fixture
+def menu_file(tmp_path):
+    path = tmp_path / "menu.txt"
+    path.write_bytes(b"HEADER\n" + b"nasi goreng,15000\n" * 100)
+    return path
+
+
+def test_file_at_start_streams_from_disk(menu_file):
+    with open(menu_file, "rb") as f:
+        attachment = Attachment("menu.txt", f)
+    assert attachment.local_path == str(menu_file)
+    assert attachment.temp_path is None and attachment.data is None
+    assert attachment.size == menu_file.stat().st_size
+
+
+def test_file_after_seek_uploads_rest_only(menu_file):
+    with open(menu_file, "rb") as f:
+        f.readline()
+        attachment = Attachment("menu.txt", f)
+    try:
+        assert attachment.local_path == attachment.temp_path != str(menu_file)
+        assert attachment.size == menu_file.stat().st_size - len(b"HEADER\n")
+        with open(attachment.local_path, "rb") as copy:
+            assert copy.read() == menu_file.read_bytes()[len(b"HEADER\n"):]
+    finally:
+        attachment.close()
+    assert not os.path.exists(attachment.local_path)
+
+
+def test_nameless_file_is_copied_not_read_by_path():
+    with tempfile.TemporaryFile() as f:
+        f.write(b"%PDF-1.4 isi")
+        f.seek(0)
+        attachment = Attachment("scan", f)
+    try:
+        assert attachment.temp_path is not None
+        assert attachment.size == len(b"%PDF-1.4 isi")
+        assert attachment.content_type == "application/pdf"
+    finally:
+        attachment.close()
+
+
+def test_bytesio_uses_current_position():
+    buffer = io.BytesIO(b"skip:payload")
+    buffer.seek(5)
+    attachment = Attachment("data.bin", buffer)
+    assert attachment.data == b"payload"
+    assert attachment.size == 7
+
+
+def test_non_seekable_object_is_rejected():
+    read_fd, write_fd = os.pipe()
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as pipe:
+        with pytest.raises(TypeError, match="seekable"):
+            Attachment("stdin.txt", pipe)
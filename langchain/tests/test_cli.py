@@ -0,0 +1,67 @@
+"""CLI interaktif: Ctrl-C saat menunggu input langsung keluar (tidak tertahan thread stdin)"""
+
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCRIPT = textwrap.dedent("""
+    import sys
+    import main
+
+    class FakeCache:
+        def cleanup(self):
+            print("CLEANUP", flush=True)
+
+    class FakeGraph:
+        async def ainvoke(self, state):
+            return {"answer": "jawaban " + state["input"], "result": "ok"}
+
+    async def build_cli_agents():
+        return FakeCache(), FakeGraph(), FakeGraph()
+
+    main.build_cli_agents = build_cli_agents
+    sys.argv = ["main.py", "cli"]
+    main.main()
+""")
+
+
+def start_cli():
+    return subprocess.Popen(
+        [sys.executable, "-c", SCRIPT],
+        cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+
+
+def read_until(proc, marker, timeout=10.0):
+    output = ""
+    deadline = time.monotonic() + timeout
+    while marker not in output and time.monotonic() < deadline:
+        output += proc.stdout.read(1)
+    assert marker in output, output
+    return output
+
+
+def test_answers_then_exits_on_eof():
+    proc = start_cli()
+    out, _ = proc.communicate("ayam ada?\n", timeout=10)
+    assert "🤖 Bot: jawaban ayam ada?" in out
+    assert "CLEANUP" in out
+    assert proc.returncode == 0
+
+
+def test_ctrl_c_while_waiting_for_input_exits():
+    proc = start_cli()
+    try:
+        read_until(proc, "👤 Customer:")
+        proc.send_signal(signal.SIGINT)
+        proc.wait(timeout=5)
+    finally:
+        proc.kill()
+    out = proc.stdout.read()
+    assert proc.returncode == 130
+    assert "CLEANUP" in out
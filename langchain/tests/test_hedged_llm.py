@@ -0,0 +1,55 @@
+"""HedgedLLM: latency request yang dibatalkan tetap tercatat, tidak ada task yatim"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fixtures import ScriptedLLM
+from core.hedged_llm import HedgedLLM
+
+
+def test_cancelled_primary_records_elapsed_latency():
+    primary = ScriptedLLM(base_latency=1.0, latency_per_1k_tokens=0, jitter=0)
+    secondary = ScriptedLLM(base_latency=0.02, latency_per_1k_tokens=0, jitter=0)
+    llm = HedgedLLM(primary, secondary, "slow", "fast", default_hedge_delay=0.1)
+
+    async def run():
+        await llm.ainvoke("halo")
+        await asyncio.sleep(0)  # biarkan task primary memproses cancel
+
+    asyncio.run(run())
+    stats = llm.provider_stats["slow"]
+    assert stats.cancelled == 1
+    samples = stats.latency.samples()
+    assert len(samples) == 1 and samples[0] >= 0.1
+
+
+def test_hedge_delay_does_not_drift_below_cancelled_latency():
+    primary = ScriptedLLM(base_latency=1.0, latency_per_1k_tokens=0, jitter=0)
+    secondary = ScriptedLLM(base_latency=0.01, latency_per_1k_tokens=0, jitter=0)
+    llm = HedgedLLM(primary, secondary, "slow", "fast", default_hedge_delay=0.05, min_hedge_delay=0.0, min_samples=3)
+    for _ in range(3):
+        llm.provider_stats["slow"].latency.record(0.05)
+
+    async def run():
+        for _ in range(5):
+            await llm.ainvoke("halo")
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert llm.hedge_delay() >= 0.05
+
+
+def test_caller_cancel_during_hedge_delay_cancels_primary():
+    primary = ScriptedLLM(base_latency=0.3, latency_per_1k_tokens=0, jitter=0)
+    secondary = ScriptedLLM(base_latency=0.3, latency_per_1k_tokens=0, jitter=0)
+    llm = HedgedLLM(primary, secondary, "slow", "fast", default_hedge_delay=1.0)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(llm.ainvoke("halo"), 0.05)
+        await asyncio.sleep(0.4)  # primary yang yatim akan selesai di sini
+
+    asyncio.run(run())
+    assert llm.provider_stats["slow"].cancelled == 1
+    assert primary.calls == 0
@@ -0,0 +1,77 @@
+"""LabsClient dispatch: jawaban request yang ditinggalkan tidak bocor ke request berikutnya"""
+
+import asyncio
+
+from benchmarks.labs_dispatch import FakeSocket
+from perplexity_async.labs import LabsClient
+
+
+def make_client(latency=0.3, chunks=5):
+    client = LabsClient.__new__(LabsClient)
+    client._setup_dispatch(max_turns=1)
+    client.ws = FakeSocket(client, latency, chunks)
+    return client
+
+
+def test_cancel_then_ask_same_model():
+    async def run():
+        client = make_client()
+        try:
+            await asyncio.wait_for(client.ask("Q1", "sonar"), 0.15)
+        except asyncio.TimeoutError:
+            pass
+        answer = await client.ask("Q2", "sonar")
+        return client, answer
+
+    client, answer = asyncio.run(run())
+    assert answer["output"] == "Q2 → 5"
+    assert not client._pending
+    assert not client._model_locks["sonar"].locked()
+
+
+def test_abandoned_stream_is_drained():
+    async def run():
+        client = make_client(latency=0.2, chunks=4)
+        stream = await client.ask("Q1", "sonar", stream=True)
+        await stream.__anext__()
+        await stream.aclose()
+        return await client.ask("Q2", "sonar")
+
+    assert asyncio.run(run())["output"] == "Q2 → 4"
+
+
+def test_frames_for_other_model_are_not_misrouted():
+    async def run():
+        client = make_client(latency=0.1, chunks=2)
+        asked = asyncio.create_task(client.ask("Q1", "sonar"))
+        await asyncio.sleep(0.01)
+        client._dispatch("sonar-pro_query_progress", {"output": "stray", "final": True, "model": "sonar-pro"})
+        return await asked
+
+    assert asyncio.run(run())["output"] == "Q1 → 2"
+
+
+def test_drain_timeout_releases_model():
+    async def run():
+        client = make_client(latency=5.0, chunks=1)
+        client.drain_timeout = 0.05
+        try:
+            await asyncio.wait_for(client.ask("Q1", "sonar"), 0.05)
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.1)
+        return client
+
+    client = asyncio.run(run())
+    assert not client._pending
+    assert not client._model_locks["sonar"].locked()
+
+
+def test_concurrent_models_stay_correlated():
+    async def run():
+        client = make_client(latency=0.1, chunks=3)
+        models = ["sonar", "sonar-pro", "r1-1776"]
+        return await asyncio.gather(*[client.ask(f"q-{m}", m) for m in models])
+
+    answers = asyncio.run(run())
+    assert [a["output"] for a in answers] == ["q-sonar → 3", "q-sonar-pro → 3", "q-r1-1776 → 3"]
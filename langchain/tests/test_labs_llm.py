@@ -0,0 +1,51 @@
+"""LabsCustomLLM: timeout setelah lock model, beberapa koneksi Labs"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.labs_dispatch import FakeSocket
+from core.errors import LLMTimeoutError
+from core.labs_llm import LabsCustomLLM
+from perplexity_async.labs import LabsClient
+
+
+def make_client(latency, chunks=1):
+    client = LabsClient.__new__(LabsClient)
+    client._setup_dispatch(max_turns=1)
+    client.ws = FakeSocket(client, latency, chunks)
+    return client
+
+
+def test_timeout_excludes_wait_for_model_lock():
+    async def run():
+        llm = LabsCustomLLM(make_client(0.2), timeout=0.3)
+        # Call kedua antri ~0.2s di belakang call pertama, tapi jawabannya sendiri < timeout
+        return await asyncio.gather(llm.ainvoke("q1"), llm.ainvoke("q2"))
+
+    assert asyncio.run(run()) == ["q1 → 1", "q2 → 1"]
+
+
+def test_timeout_still_applies_to_answer():
+    async def run():
+        llm = LabsCustomLLM(make_client(0.3), timeout=0.1)
+        with pytest.raises(LLMTimeoutError):
+            await llm.ainvoke("q1")
+        await asyncio.sleep(0.3)  # frame final request yang ditinggalkan di-drain
+        return llm
+
+    assert asyncio.run(run()).stats()["models"]["sonar"]["errors"] == 1
+
+
+def test_calls_spread_across_connections():
+    async def run():
+        clients = [make_client(0.2) for _ in range(3)]
+        llm = LabsCustomLLM(clients, timeout=1.0)
+        start = asyncio.get_running_loop().time()
+        answers = await asyncio.gather(*[llm.ainvoke(f"q{i}") for i in range(3)])
+        return clients, answers, asyncio.get_running_loop().time() - start
+
+    clients, answers, elapsed = asyncio.run(run())
+    assert answers == ["q0 → 1", "q1 → 1", "q2 → 1"]
+    assert [client.ws.sends for client in clients] == [1, 1, 1]
+    assert elapsed < 0.4
@@ -0,0 +1,120 @@
+"""CircuitBreaker state machine + ProviderRouterLLM failover"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fixtures import ScriptedLLM
+from core.deadline import Deadline, run_with_deadline
+from core.errors import LLMTimeoutError
+from core.provider_router import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ProviderRouterLLM
+
+
+def make_breaker(**kwargs):
+    options = dict(window=4, min_calls=4, error_rate_threshold=0.5, open_seconds=0.05)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_on_error_rate():
+    breaker = make_breaker()
+    for _ in range(2):
+        breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker.opened_at -= 1
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()  # hanya satu probe
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker.opened_at -= 1
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_step_timeout_cancellation_counts_as_failure():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_cancelled(True, 1.0)
+    assert breaker.state == OPEN
+
+
+def test_other_cancellation_only_releases_probe():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_cancelled(False, 30.0)
+    assert breaker.state == CLOSED
+    assert breaker.status()["window_calls"] == 0
+
+
+def make_router():
+    hung = ScriptedLLM(base_latency=5.0, latency_per_1k_tokens=0, jitter=0)
+    backup = ScriptedLLM(base_latency=0.0, latency_per_1k_tokens=0, jitter=0)
+    return ProviderRouterLLM([("deepseek", hung), ("perplexity", backup)], window=4, min_calls=4)
+
+
+def test_step_timeout_on_hung_provider_opens_breaker():
+    router = make_router()
+
+    async def run():
+        for _ in range(4):
+            with pytest.raises(LLMTimeoutError):
+                await run_with_deadline(lambda: router.ainvoke("halo"), Deadline(10), "answer", share=0.01, retries=0)
+
+    asyncio.run(run())
+    assert router.breakers["deepseek"].state == OPEN
+    # Request berikutnya langsung failover ke provider sehat
+    assert asyncio.run(router.ainvoke("halo")) is not None
+    assert router.failovers == 1
+
+
+def test_external_cancel_does_not_trip_breaker():
+    """Speculation miss / client disconnect: cancel dari luar, bukan step timeout"""
+    router = make_router()
+
+    async def run():
+        for _ in range(4):
+            task = asyncio.create_task(router.ainvoke("halo"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        # Cancel dari luar step run_with_deadline juga bukan timeout
+        for _ in range(4):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(run_with_deadline(lambda: router.ainvoke("halo"), Deadline(10), "answer"), 0.05)
+
+    asyncio.run(run())
+    assert router.breakers["deepseek"].state == CLOSED
+    assert router.breakers["deepseek"].status()["window_calls"] == 0
+
+
+class DownLLM(ScriptedLLM):
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        raise ConnectionError("provider down")
+
+
+def test_crud_route_surfaces_provider_outage():
+    """Semua provider gagal → LLMUnavailableError, bukan fallback ke 'all' + extract kedua"""
+    from benchmarks.fixtures import FixtureCacheManager
+    from core.agents.crud_agent import CRUDAgent
+    from core.errors import LLMUnavailableError
+
+    router = ProviderRouterLLM([("deepseek", DownLLM()), ("perplexity", DownLLM())])
+    agent = CRUDAgent(router, FixtureCacheManager())
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(agent.route_categories({"input": "ayam habis", "deadline": None}))
@@ -0,0 +1,50 @@
+"""MenuResolver: perintah CRUD jelas di-resolve lokal, yang ambigu ke LLM"""
+
+import pytest
+
+from benchmarks.fixtures import FixtureCacheManager
+from core.resolver import MenuResolver, detect_status
+
+
+@pytest.fixture(scope="module")
+def resolver():
+    return MenuResolver(FixtureCacheManager())
+
+
+def resolved_names(resolver, command):
+    result = resolver.resolve(command, record=False)
+    if result["ids"] is None:
+        return None, result
+    items = resolver.retriever.index.items
+    return [items[i]["name"] for i in result["ids"]], result
+
+
+def test_detect_status():
+    assert detect_status("batagor habis") is False
+    assert detect_status("batagor ready lagi") is True
+    assert detect_status("es teh ga ada") is False
+    assert detect_status("ayam habis tapi ada") is None
+
+
+def test_single_and_multiple_items(resolver):
+    names, result = resolved_names(resolver, "batagor habis")
+    assert names == ["Batagor"] and result["status"] is False
+
+    names, result = resolved_names(resolver, "batagor sama pempek ready")
+    assert names == ["Batagor", "Pempek Kapal Selam"] and result["status"] is True
+
+
+def test_all_words_within_one_category(resolver):
+    names, _ = resolved_names(resolver, "semua jumbo habis")
+    assert names == ["Ayam Geprek Jumbo", "Ayam Crispy Jumbo"]
+
+
+def test_ambiguous_goes_to_llm_with_candidates(resolver):
+    names, result = resolved_names(resolver, "ikan habis")
+    assert names is None
+    assert result["candidates"]
+
+
+def test_conflicting_status_goes_to_llm(resolver):
+    names, result = resolved_names(resolver, "ayam habis tapi ada")
+    assert names is None and result["reason"] == "status tidak jelas"
@@ -0,0 +1,57 @@
+"""MenuRetriever: hanya kategori hasil routing, item yang disebut (maks top_k) tetap ikut"""
+
+import pytest
+
+from benchmarks.fixtures import FixtureCacheManager
+from core.retrieval import MenuRetriever
+
+
+@pytest.fixture
+def retriever():
+    return MenuRetriever(FixtureCacheManager())
+
+
+def names(items):
+    return {item["name"] for item in items}
+
+
+def test_keeps_every_mentioned_item(retriever):
+    items = retriever.retrieve("batagor sama pempek ada kak", ["karbo"])
+    assert {"Batagor", "Pempek Kapal Selam"} <= names(items)
+
+
+def test_negated_attribute_falls_back_to_full_category(retriever):
+    assert retriever.retrieve("ada ayam yang ga pedas?", ["protein_ayam"]) == []
+
+
+def test_only_routed_categories(retriever):
+    assert retriever.retrieve("makaroni pedas", ["protein_ayam"]) == []
+    assert names(retriever.retrieve("makaroni pedas", ["jajanan"])) == {"Makaroni Pedas"}
+
+
+def test_multi_category_question_keeps_all_matches(retriever):
+    items = retriever.retrieve("ada es teh sama kopi?", ["minum_cold", "minum_hot"])
+    assert {"Es Teh Manis", "Teh Hangat", "Es Kopi Susu", "Kopi Tubruk"} <= names(items)
+    assert {item["category"] for item in items} <= {"minum_cold", "minum_hot"}
+
+
+def test_generic_term_is_not_narrowing(retriever):
+    assert retriever.retrieve("ayamnya ada?", ["protein_ayam"]) == []
+
+
+def test_ranked_by_matched_terms(retriever):
+    items = retriever.retrieve("ayam geprek jumbo", ["protein_ayam"])
+    assert items[0]["name"] == "Ayam Geprek Jumbo"
+
+
+def test_render_header_is_emitted_row_count(retriever):
+    items = retriever.retrieve("kopi tubruk", ["minum_hot"])
+    toon = retriever.render(items)
+    assert toon.splitlines()[0].startswith(f"minum_hot[{len(items)}]")
+    assert len(toon.splitlines()) == len(items) + 1
+
+
+def test_top_k_keeps_most_relevant():
+    retriever = MenuRetriever(FixtureCacheManager(), top_k=1)
+    items = retriever.retrieve("ayam geprek jumbo", ["protein_ayam"])
+    assert names(items) == {"Ayam Geprek Jumbo"}
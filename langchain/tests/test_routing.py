@@ -0,0 +1,38 @@
+"""Normalisasi query + routing cache"""
+
+from core.routing import RoutingCache, guess_categories, normalize_query
+
+
+def test_variants_share_one_key():
+    variants = ["Es teh ada kak??", "ada es teh ga kak", "ES TEH 🔥🔥", "esteh dong"]
+    assert {normalize_query(q) for q in variants} == {"esteh"}
+
+
+def test_slang_reduplication_and_order():
+    assert normalize_query("ayem gprek jumbo2 ready?") == "ayam geprek jumbo"
+    assert normalize_query("jumbo geprek ayam") == normalize_query("ayam geprek jumbo")
+
+
+def test_guess_categories():
+    assert guess_categories("ada es teh sama kopi?") == ["minum_cold"]
+    assert guess_categories("batagor sama pempek ada kak") == ["karbo"]
+    assert guess_categories("menu") == ["all"]
+    assert guess_categories("halo kak") == []
+
+
+def test_routing_cache_hit_on_variant():
+    cache = RoutingCache(max_size=2)
+    cache.set("Ayam geprek ada?", ["protein_ayam"])
+    assert cache.get("ada ayem gprek kak") == ["protein_ayam"]
+    assert cache.get("es teh") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_routing_cache_evicts_least_recent():
+    cache = RoutingCache(max_size=2)
+    cache.set("ayam", ["protein_ayam"])
+    cache.set("ikan", ["protein_ikan"])
+    cache.get("ayam")
+    cache.set("tahu", ["protein_ringan"])
+    assert cache.get("ikan") is None
+    assert cache.get("ayam") == ["protein_ayam"]
@@ -0,0 +1,62 @@
+"""Speculative menu agent: latency yang dihemat dan answer spekulatif yang dibatalkan"""
+
+import asyncio
+import gc
+from typing import Any, List, Optional
+
+from benchmarks.fixtures import FixtureCacheManager, ScriptedLLM
+from core.agents.menu_agent import MenuAgent
+from core.metrics import SpeculationStats
+
+
+def fixed(latency):
+    return ScriptedLLM(base_latency=latency, latency_per_1k_tokens=0, jitter=0)
+
+
+class RouteTo(ScriptedLLM):
+    """Routing lambat yang selalu menjawab kategori tertentu"""
+    output: str = ""
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> str:
+        await asyncio.sleep(self.base_latency)
+        return self.output
+
+
+def make_agent(llm, routing_llm):
+    stats = SpeculationStats()
+    agent = MenuAgent(llm, FixtureCacheManager(), routing_llm=routing_llm, speculation_stats=stats, speculative=True)
+    return agent, stats
+
+
+def test_saved_latency_is_overlap_not_routing_time():
+    agent, stats = make_agent(fixed(0.2), fixed(1.0))
+    result = asyncio.run(agent.speculate({"input": "ayam geprek ada?", "deadline": None}))
+    assert result["categories"] == ["protein_ayam"]
+    saved = stats.summary()["latency_saved_p50_s"]
+    assert 0.15 <= saved <= 0.5
+
+
+def test_discard_retrieves_failed_speculative_answer():
+    unretrieved = []
+
+    async def fail():
+        raise RuntimeError("answer gagal")
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+        task = asyncio.create_task(fail())
+        await asyncio.sleep(0.01)  # answer spekulatif sudah gagal sebelum routing selesai
+        await MenuAgent._discard(task)
+        del task
+        gc.collect()
+
+    asyncio.run(run())
+    assert unretrieved == []
+
+
+def test_miss_regenerates_with_routed_categories():
+    routing = RouteTo(base_latency=0.1, output='{"categories": ["minum_cold"]}')
+    agent, stats = make_agent(fixed(0.05), routing)
+    result = asyncio.run(agent.speculate({"input": "ayam geprek ada?", "deadline": None}))
+    assert result["categories"] == ["minum_cold"]
+    assert stats.summary()["misses"] == 1
@@ -0,0 +1,163 @@
+"""Startup di background: retry dengan backoff, /health 503 jika gagal permanen"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import perplexity_async
+from config.errors import ConfigError
+from events import fastapi_app
+from perplexity_async import pool
+
+
+@pytest.fixture
+def app_state(monkeypatch):
+    report = {"imports_s": 0.0, "phases": {}, "total_s": None, "ready": False, "error": None, "attempts": 0, "fatal": False}
+    monkeypatch.setattr(fastapi_app, "startup_report", report)
+    monkeypatch.setattr(fastapi_app, "INIT_RETRY_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(fastapi_app, "INIT_MAX_ATTEMPTS", 3)
+    return report
+
+
+def fake_initialize(failures, error=RuntimeError):
+    calls = []
+
+    async def initialize():
+        calls.append(1)
+        if len(calls) <= failures:
+            fastapi_app.startup_report["error"] = "boom"
+            raise error("boom")
+        fastapi_app.startup_report["ready"] = True
+        fastapi_app.startup_report["error"] = None
+
+    return initialize, calls
+
+
+async def wait_for_init():
+    await fastapi_app.init_task
+
+
+def test_transient_failure_is_retried(app_state, monkeypatch):
+    initialize, calls = fake_initialize(failures=2)
+    monkeypatch.setattr(fastapi_app, "initialize", initialize)
+    with TestClient(fastapi_app.app) as client:
+        client.portal.call(wait_for_init)
+        assert client.get("/health").status_code == 200
+    assert len(calls) == 3
+    assert app_state["ready"] and not app_state["fatal"]
+
+
+def test_health_fails_after_attempts_exhausted(app_state, monkeypatch):
+    initialize, calls = fake_initialize(failures=10)
+    monkeypatch.setattr(fastapi_app, "initialize", initialize)
+    with TestClient(fastapi_app.app) as client:
+        client.portal.call(wait_for_init)
+        assert client.get("/health").status_code == 503
+        assert client.get("/ready").json()["status"] == "failed"
+    assert len(calls) == 3
+
+
+def test_configuration_error_is_not_retried(app_state, monkeypatch):
+    initialize, calls = fake_initialize(failures=10, error=ConfigError)
+    monkeypatch.setattr(fastapi_app, "initialize", initialize)
+    with TestClient(fastapi_app.app) as client:
+        client.portal.call(wait_for_init)
+        assert client.get("/health").status_code == 503
+    assert len(calls) == 1
+
+
+def test_other_value_error_is_retried(app_state, monkeypatch):
+    initialize, calls = fake_initialize(failures=1, error=ValueError)
+    monkeypatch.setattr(fastapi_app, "initialize", initialize)
+    with TestClient(fastapi_app.app) as client:
+        client.portal.call(wait_for_init)
+        assert client.get("/health").status_code == 200
+    assert len(calls) == 2
+
+
+def fake_labs_client(delays, failures=()):
+    created = []
+
+    class FakeLabsClient:
+        def __init__(self):
+            self.index = len(created)
+            self.closed = False
+            created.append(self)
+
+        def __await__(self):
+            return self.connect().__await__()
+
+        async def connect(self):
+            await asyncio.sleep(delays[self.index])
+            if self.index in failures:
+                raise ConnectionError("labs down")
+            return self
+
+        async def close(self):
+            self.closed = True
+
+    return FakeLabsClient, created
+
+
+def test_partial_labs_connect_closes_opened_clients(monkeypatch):
+    labs_client, created = fake_labs_client(delays=[0.0, 0.01, 0.02], failures={1})
+    monkeypatch.setattr(perplexity_async, "LabsClient", labs_client)
+    monkeypatch.setattr(fastapi_app, "LABS_CONNECTIONS", 3)
+    monkeypatch.setattr(fastapi_app, "labs_clients", [])
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(fastapi_app.connect_labs())
+    assert len(created) == 3 and all(client.closed for client in created)
+    assert fastapi_app.labs_clients == []
+
+
+def test_pool_failure_cancels_labs_connect(monkeypatch):
+    labs_client, created = fake_labs_client(delays=[5.0, 5.0])
+    monkeypatch.setattr(perplexity_async, "LabsClient", labs_client)
+    monkeypatch.setattr(fastapi_app, "LABS_CONNECTIONS", 2)
+    monkeypatch.setattr(fastapi_app, "ROUTING_LLM", "labs")
+    monkeypatch.setattr(fastapi_app, "labs_clients", [])
+
+    async def failing_pool(llm):
+        await asyncio.sleep(0.01)
+        raise ConnectionError("pool down")
+
+    monkeypatch.setattr(fastapi_app, "build_answer_llm", failing_pool)
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(fastapi_app.build_llms(), 1.0)
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
+    assert len(created) == 2 and all(client.closed for client in created)
+
+
+def test_partial_pool_init_closes_sessions(monkeypatch):
+    sessions = []
+
+    class FakeSession:
+        def __init__(self):
+            self.closed = False
+            sessions.append(self)
+
+        async def close(self):
+            self.closed = True
+
+    class FakeClient(pool.AsyncMixin):
+        async def __ainit__(self, cookies, base_url=None):
+            self.session = FakeSession()
+            await asyncio.sleep(cookies["delay"])
+            if cookies.get("fail"):
+                raise ConnectionError("account down")
+
+    monkeypatch.setattr(pool, "Client", FakeClient)
+    cookie_sets = [{"delay": 0.0}, {"delay": 0.01, "fail": True}, {"delay": 0.02}]
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await pool.ClientPool(cookie_sets)
+
+    asyncio.run(run())
+    assert len(sessions) == 3 and all(session.closed for session in sessions)
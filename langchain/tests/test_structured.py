@@ -0,0 +1,36 @@
+"""Parser output routing / extract (JSON mode dan format lama)"""
+
+import pytest
+
+from core.structured import StructuredOutputStats, parse_extract_output, parse_json_output, parse_route_output
+
+
+def test_json_with_fence_and_prose():
+    assert parse_json_output('```json\n{"categories": ["karbo"]}\n```') == {"categories": ["karbo"]}
+    assert parse_json_output('Berikut hasilnya: ["karbo", "jajanan"] ya') == ["karbo", "jajanan"]
+    with pytest.raises(ValueError):
+        parse_json_output("tidak ada json")
+
+
+def test_route_output():
+    assert parse_route_output('{"categories": ["minum_cold", "minum_hot"]}') == ["minum_cold", "minum_hot"]
+    assert parse_route_output('["all"]') == ["all"]
+    with pytest.raises(ValueError):
+        parse_route_output('{"categories": "karbo"}')
+
+
+def test_extract_output_json_and_legacy():
+    assert parse_extract_output('{"ids": [3, "4"], "available": false}') == {"ids": [3, 4], "available": False}
+    assert parse_extract_output('{"clarify": "Ayam yang mana?"}') == {"clarify": "Ayam yang mana?"}
+    assert parse_extract_output("1,2,true") == {"ids": [1, 2], "available": True}
+    assert parse_extract_output("CLARIFY: Ikan yang mana?") == {"clarify": "Ikan yang mana?"}
+    with pytest.raises(ValueError):
+        parse_extract_output('{"ids": [1], "available": "yes"}')
+
+
+def test_stats_summary():
+    stats = StructuredOutputStats()
+    stats.record("route", parsed=True)
+    stats.record("route", parsed=False, fallback=True)
+    summary = stats.summary()["route"]
+    assert summary["calls"] == 2 and summary["parse_failures"] == 1 and summary["fallbacks"] == 1
@@ -0,0 +1,34 @@
+"""Snapshot menu dan fragment TOON di-swap bersamaan"""
+
+from benchmarks.fixtures import FixtureCacheManager
+
+
+def test_fragments_and_cache_swap_under_same_lock():
+    cache_manager = FixtureCacheManager()
+    seen = []
+    original_commit = cache_manager._commit_snapshot
+
+    def commit(snapshot):
+        # Dipanggil di dalam lock ToonFragmentCache: reader fragment sedang diblok
+        seen.append(cache_manager.toon._lock.locked())
+        original_commit(snapshot)
+
+    cache_manager._commit_snapshot = commit
+    cache_manager.supabase.rows[0]["name"] = "Ayam Geprek Mega"
+    version = cache_manager.version
+    cache_manager.refresh_cache()
+
+    assert seen == [True]
+    assert cache_manager.version == version + 1
+    assert "Ayam Geprek Mega" in cache_manager.get_menu_toon()
+    assert any(item["name"] == "Ayam Geprek Mega" for items in cache_manager.get_menu_data().values() for item in items)
+
+
+def test_cache_and_toon_agree_after_refresh():
+    cache_manager = FixtureCacheManager()
+    cache_manager.refresh_cache()
+    for category, items in cache_manager.get_menu_data().items():
+        toon = cache_manager.get_category_toon(category)
+        assert toon.startswith(f"{category}[{len(items)}]")
+        for item in items:
+            assert f"{item['id']},{item['name']}," in toon
@@ -0,0 +1,75 @@
+"""Client._upload_files terhadap fake Perplexity (benchmarks.fake_servers): concurrency, urutan, streaming"""
+
+import asyncio
+import socket
+import threading
+import time
+import tracemalloc
+
+import httpx
+import pytest
+import uvicorn
+
+from benchmarks.fake_servers import FaultInjector, create_perplexity_app
+from perplexity_async import Client
+
+
+@pytest.fixture(scope="module")
+def fake_perplexity():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    app = create_perplexity_app(FaultInjector("uniform:0.05,0.15"))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+    server.should_exit = True
+    thread.join(5)
+
+
+def upload_stats(base_url):
+    return httpx.get(f"{base_url}/uploads/stats").json()
+
+
+def upload(base_url, files, concurrency):
+    async def run():
+        client = await Client(base_url=base_url)
+        try:
+            return await client._upload_files(files, concurrency=concurrency)
+        finally:
+            await client.session.close()
+
+    return asyncio.run(run())
+
+
+def test_concurrency_limit_and_order(fake_perplexity):
+    files = {f"file-{index}.txt": f"isi {index}" for index in range(8)}
+    before = upload_stats(fake_perplexity)["requests"]
+    urls = upload(fake_perplexity, files, concurrency=3)
+
+    stats = upload_stats(fake_perplexity)
+    assert stats["requests"] - before == 8
+    assert 1 < stats["max_inflight"] <= 3
+    # Hasil mengikuti urutan `files`, bukan urutan selesai
+    assert [url.rsplit("/", 1)[1] for url in urls] == list(files)
+
+
+def test_large_file_is_streamed_not_read(fake_perplexity, tmp_path):
+    size = 64 * 1024 * 1024
+    path = tmp_path / "big.bin"
+    with open(path, "wb") as f:
+        f.truncate(size)
+    before = upload_stats(fake_perplexity)["bytes"]
+
+    tracemalloc.start()
+    try:
+        with open(path, "rb") as f:
+            upload(fake_perplexity, {"big.bin": f}, concurrency=1)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert upload_stats(fake_perplexity)["bytes"] - before >= size
+    assert peak < size // 8
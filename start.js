@@ -63,9 +63,9 @@ import {
   }
   
   // Call Edit Menu API
-  async function editMenuAPI(question) {
+  async function editMenuAPI(question, sessionId) {
     try {
-      const res = await axios.post(`${API_URL}/edit-menu`, { question }, {
+      const res = await axios.post(`${API_URL}/edit-menu`, { question, session_id: sessionId }, {
         headers: { 'X-API-Key': API_KEY, 'Content-Type': 'application/json' },
         timeout: 50000
       });
@@ -220,10 +220,17 @@ import {
           });
           
           // Call Edit Menu API
-          const result = await editMenuAPI(question);
+          // Session per chat, supaya jawaban klarifikasi (.e yang goreng) nyambung
+          const result = await editMenuAPI(question, chatJid);
           
           // Edit pesan .e jadi response final
-          if (result) {
+          if (result?.needs_clarification) {
+            await sock.sendMessage(chatJid, {
+              text: `❓ *Perlu Klarifikasi*\n\n${result.message}\n\nBalas dengan: .e <jawaban>`,
+              edit: message.key
+            });
+            console.log('❓ Edit menu needs clarification\n');
+          } else if (result) {
             await sock.sendMessage(chatJid, {
               text: `✅ *Menu Updated*\n\n${result.message || 'Perubahan berhasil diterapkan'}`,
               edit: message.key